@@ -0,0 +1,192 @@
+# backup.py
+import datetime
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from config import BACKUP_PAGES_PER_STEP, BACKUP_CHECK_MINUTES, BACKUP_RETENTION, BACKUP_COMPRESS
+
+# Intervalo mínimo entre duas cópias de cada geração
+GENERATION_PERIODS = {
+    "hourly": datetime.timedelta(hours=1),
+    "daily": datetime.timedelta(days=1),
+    "weekly": datetime.timedelta(weeks=1),
+}
+
+class BackupError(Exception):
+    """Cópia de segurança que falhou na verificação."""
+
+class BackupCancelled(Exception):
+    pass
+
+class _TooManyRestarts(Exception):
+    pass
+
+class BackupService:
+    """
+    Cópia de segurança do banco com a API de backup do SQLite
+    (Connection.backup), copiando pages_per_step páginas por vez: a cópia é
+    consistente mesmo com a aplicação gravando, e o banco não fica travado
+    durante todo o processo.
+
+    A cópia é gravada em "<destino>.part", verificada com PRAGMA
+    integrity_check, opcionalmente compactada com gzip e só então renomeada
+    para o destino. Se outras conexões gravarem o tempo todo e a cópia em
+    passos recomeçar mais de MAX_RESTARTS vezes, ela é refeita de uma vez só.
+    """
+    MAX_RESTARTS = 3
+
+    def __init__(self, db_file, pages_per_step=BACKUP_PAGES_PER_STEP):
+        self.db_file = db_file
+        self.pages_per_step = pages_per_step
+
+    def backup_to(self, dest, compress=False, progress=None, cancel=None):
+        """
+        Gera o backup em dest (roda em uma thread de trabalho). progress(páginas
+        copiadas, total) é chamado a cada passo; cancel é um threading.Event opcional.
+        """
+        t0 = time.perf_counter()
+        partial = dest + ".part"
+        raw = partial + ".db" if compress else partial
+
+        restarts = {"count": 0, "remaining": None}
+
+        def step(status, remaining, total):
+            if cancel is not None and cancel.is_set():
+                raise BackupCancelled()
+            if restarts["remaining"] is not None and remaining > restarts["remaining"]:
+                # Outra conexão gravou no banco entre dois passos e o SQLite recomeçou a cópia
+                restarts["count"] += 1
+                if restarts["count"] > self.MAX_RESTARTS:
+                    raise _TooManyRestarts()
+            restarts["remaining"] = remaining
+            if progress:
+                progress(total - remaining, total)
+
+        try:
+            source = sqlite3.connect(self.db_file)
+            target = sqlite3.connect(raw)
+            try:
+                try:
+                    source.backup(target, pages=self.pages_per_step, progress=step, sleep=0.005)
+                except _TooManyRestarts:
+                    # Com gravações frequentes a cópia em passos nunca termina: copia
+                    # tudo de uma vez, a partir de um instantâneo de leitura (em WAL
+                    # isso não bloqueia quem grava).
+                    source.backup(target, pages=-1)
+                target.execute("PRAGMA journal_mode = DELETE")  # cópia em um único arquivo
+                result = target.execute("PRAGMA integrity_check").fetchall()
+            finally:
+                target.close()
+                source.close()
+            if result != [("ok",)]:
+                raise BackupError("Falha na verificação da cópia: " + "; ".join(r[0] for r in result[:5]))
+
+            if compress:
+                with open(raw, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.remove(raw)
+            os.replace(partial, dest)
+        except BaseException:
+            for path in {raw, partial}:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        return {"path": dest, "bytes": os.path.getsize(dest), "elapsed_s": round(time.perf_counter() - t0, 2)}
+
+class BackupScheduler:
+    """
+    Backups automáticos em gerações (horária, diária e semanal), guardando as
+    BACKUP_RETENTION cópias mais recentes de cada uma em backup_dir.
+
+    A cada BACKUP_CHECK_MINUTES verifica quais gerações estão vencidas; se o
+    PRAGMA data_version mostra que nada mudou desde o último backup, a rodada
+    é pulada. Uma única cópia é feita em segundo plano e reaproveitada pelas
+    demais gerações vencidas.
+    """
+    def __init__(self, root, service, data_version, backup_dir, retention=None,
+                 compress=BACKUP_COMPRESS, check_minutes=BACKUP_CHECK_MINUTES):
+        self.root = root
+        self.service = service
+        self.data_version = data_version
+        self.backup_dir = backup_dir
+        self.retention = retention or BACKUP_RETENTION
+        self.compress = compress
+        self.check_ms = int(check_minutes * 60 * 1000)
+        self._after_id = None
+        self._worker = None
+        self._cancel = threading.Event()
+        self._last_version = None
+        self.last_result = None
+
+    def start(self, delay_ms=60 * 1000):
+        """Agenda a primeira verificação (por padrão, um minuto após abrir o programa)."""
+        self._after_id = self.root.after(delay_ms, self._tick)
+
+    def stop(self):
+        self._cancel.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _files(self, generation):
+        ext = ".db.gz" if self.compress else ".db"
+        pattern = os.path.join(self.backup_dir, f"contacts_{generation}_*{ext}")
+        return sorted(glob.glob(pattern))  # o nome leva a data, então a ordem é cronológica
+
+    def due_generations(self, now=None):
+        now = now or datetime.datetime.now()
+        due = []
+        for generation, period in GENERATION_PERIODS.items():
+            if not self.retention.get(generation):
+                continue
+            files = self._files(generation)
+            if not files:
+                due.append(generation)
+                continue
+            newest = datetime.datetime.fromtimestamp(os.path.getmtime(files[-1]))
+            if now - newest >= period:
+                due.append(generation)
+        return due
+
+    def _tick(self):
+        self._after_id = self.root.after(self.check_ms, self._tick)
+        if self._worker is not None and self._worker.is_alive():
+            return
+        due = self.due_generations()
+        if not due:
+            return
+        version = self.data_version()
+        if version == self._last_version:
+            return  # nada mudou no banco desde o último backup
+        self._worker = threading.Thread(target=self._run, args=(due, version), daemon=True)
+        self._worker.start()
+
+    def _run(self, due, version):
+        try:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            stamp = datetime.datetime.now().strftime("%Y-%m-%d_%H%M%S")
+            ext = ".db.gz" if self.compress else ".db"
+            first = os.path.join(self.backup_dir, f"contacts_{due[0]}_{stamp}{ext}")
+            result = self.service.backup_to(first, compress=self.compress, cancel=self._cancel)
+            for generation in due[1:]:
+                shutil.copyfile(first, os.path.join(self.backup_dir, f"contacts_{generation}_{stamp}{ext}"))
+            for generation in due:
+                self._prune(generation)
+            self._last_version = version
+            self.last_result = {"ok": True, "generations": due, **result}
+        except BackupCancelled:
+            pass
+        except Exception as e:
+            self.last_result = {"ok": False, "generations": due, "error": str(e)}
+
+    def _prune(self, generation):
+        files = self._files(generation)
+        for path in files[:max(0, len(files) - self.retention[generation])]:
+            os.remove(path)
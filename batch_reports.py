@@ -0,0 +1,155 @@
+# batch_reports.py
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import DB_FILE, REPORT_BATCH_DPI
+
+# Dados e gerador de cada processo de trabalho (preenchidos por _init_worker)
+_worker = {}
+# Além dos períodos do painel: "all" = todo o histórico até hoje
+ALL_PERIOD = "all"
+
+def _slug(text):
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_").lower() or "sem_nome"
+
+def _init_worker(df, style):
+    """Roda uma vez por processo: guarda o resumo diário recebido e prepara o matplotlib (Agg)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.style
+    from reports import ReportGenerator
+    matplotlib.style.use(style)
+    _worker["df"] = df
+    _worker["generator"] = ReportGenerator()
+
+def render_pack(attendant, period, out_dir, formats, dpi=REPORT_BATCH_DPI):
+    """
+    Gera o pacote de um atendente em um período: os quatro gráficos do painel
+    em uma página, salva em cada formato pedido (png, pdf). Devolve (caminhos,
+    segundos de filtro/cálculo, segundos de desenho e gravação).
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    generator = _worker["generator"]
+
+    t0 = time.perf_counter()
+    df = generator.get_filtered_data(_worker["df"], period, "", "", attendant, "Todos")
+    inputs = generator.compute_chart_inputs(df)
+    start, end = generator.resolve_period(period, "", "")
+    t1 = time.perf_counter()
+
+    fig = Figure(figsize=(12, 8.5))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(2, 2)
+    # As mesmas funções de desenho do painel; as entradas são calculadas uma vez para os quatro gráficos
+    generator.draw_visits_enrollments(axes[0][0], inputs)
+    generator.draw_status_distribution(axes[0][1], inputs)
+    generator.draw_lead_source(axes[1][0], inputs)
+    generator.draw_top_courses(axes[1][1], inputs)
+    since = start.strftime("%d/%m/%Y") if start is not None else "início"
+    fig.suptitle(f"{attendant} — {since} a {end.strftime('%d/%m/%Y')}", fontsize=14, fontweight="bold")
+    fig.tight_layout(rect=(0, 0, 1, 0.95))
+
+    folder = os.path.join(out_dir, _slug(attendant))
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(folder, f"{period}.{fmt}")
+        fig.savefig(path, dpi=dpi, format=fmt)
+        paths.append(path)
+    return paths, t1 - t0, time.perf_counter() - t1
+
+class BatchReportRunner:
+    """
+    Gera, sem Tk, os relatórios do painel para cada combinação atendente ×
+    período, em out_dir/<atendente>/<período>.<formato>.
+
+    O resumo diário é lido do banco uma única vez e enviado a cada processo do
+    ProcessPoolExecutor no initializer (uma cópia por processo, não por
+    tarefa); as tarefas só levam o atendente e o período.
+    """
+    def __init__(self, db_manager, out_dir, periods=None, attendants=None, formats=("png", "pdf"),
+                 workers=None, style="seaborn-v0_8-pastel"):
+        from reports import PERIOD_OPTIONS
+        known = [value for _, value in PERIOD_OPTIONS]
+        unknown = [p for p in periods or [] if p not in known + [ALL_PERIOD]]
+        if unknown:
+            raise ValueError(f"Período inválido: {', '.join(unknown)} (use {', '.join(known)} ou {ALL_PERIOD})")
+        self.db_manager = db_manager
+        self.out_dir = out_dir
+        self.periods = list(periods or known)
+        self.attendants = attendants
+        self.formats = tuple(formats)
+        self.workers = workers or os.cpu_count() or 1
+        self.style = style
+
+    def run(self, progress=None):
+        """Gera todos os pacotes; progress(feitos, total) a cada um. Devolve o resumo com a vazão."""
+        t0 = time.perf_counter()
+        df = self.db_manager.get_rollup_dataframe()
+        attendants = self.attendants or ["Todos"] + self.db_manager.get_distinct_values("attended_by")
+        jobs = [(att, period) for att in attendants for period in self.periods]
+        load_s = time.perf_counter() - t0
+
+        files, compute_s, draw_s, failures = 0, 0.0, 0.0, []
+        t1 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(df, self.style)) as pool:
+            futures = {pool.submit(render_pack, att, period, self.out_dir, self.formats): (att, period)
+                       for att, period in jobs}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    paths, compute, draw = future.result()
+                except Exception as e:
+                    failures.append((*futures[future], str(e)))
+                else:
+                    files += len(paths)
+                    compute_s += compute
+                    draw_s += draw
+                if progress:
+                    progress(done, len(jobs))
+        render_s = time.perf_counter() - t1
+        packs = len(jobs) - len(failures)
+        return {
+            "packs": packs,
+            "files": files,
+            "attendants": len(attendants),
+            "periods": len(self.periods),
+            "workers": self.workers,
+            "dataset_rows": len(df),
+            "load_s": round(load_s, 2),
+            "render_s": round(render_s, 2),
+            "packs_per_s": round(packs / render_s, 2) if render_s else 0,
+            "files_per_s": round(files / render_s, 2) if render_s else 0,
+            "avg_compute_ms": round(compute_s / packs * 1000, 1) if packs else 0,
+            "avg_draw_ms": round(draw_s / packs * 1000, 1) if packs else 0,
+            "failures": failures,
+        }
+
+def run_batch_reports(out_dir, periods=None, attendants=None, formats=("png", "pdf"), workers=None):
+    """Entrada de main.py --batch-reports: gera os pacotes e mostra a vazão."""
+    from database import DatabaseManager, init_db
+    init_db()
+    db_manager = DatabaseManager(DB_FILE)
+    try:
+        try:
+            runner = BatchReportRunner(db_manager, out_dir, periods, attendants, formats, workers)
+        except ValueError as e:
+            print(e)
+            return None
+        summary = runner.run(progress=lambda done, total: print(f"\r{done}/{total} pacotes", end="", flush=True))
+    finally:
+        db_manager.close()
+    print()
+    print(f"{summary['packs']} pacotes ({summary['files']} arquivos) de {summary['attendants']} atendentes "
+          f"× {summary['periods']} períodos em {out_dir}")
+    print(f"  resumo diário: {summary['dataset_rows']} linhas lidas em {summary['load_s']} s")
+    print(f"  geração: {summary['render_s']} s com {summary['workers']} processos — "
+          f"{summary['packs_per_s']} pacotes/s, {summary['files_per_s']} arquivos/s")
+    print(f"  por pacote: {summary['avg_compute_ms']} ms de filtro/cálculo, {summary['avg_draw_ms']} ms de desenho e gravação")
+    for att, period, error in summary["failures"]:
+        print(f"  falhou: {att} / {period}: {error}")
+    return summary
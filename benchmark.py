@@ -0,0 +1,221 @@
+# benchmark.py
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import tempfile
+import time
+from config import DB_FILE
+
+# Versão do formato do JSON de resultados (mude se os nomes/campos mudarem)
+RESULTS_FORMAT = 1
+
+class BenchmarkSuite:
+    """
+    Mede, sem janela, os caminhos mais usados da aplicação sobre um banco
+    (de preferência um gerado por synthetic_data.py):
+
+    - get_contacts com cada filtro de build_filters (e sem filtro);
+    - get_data_as_dataframe com o cache vazio e já preenchido;
+    - o resumo diário, ReportGenerator.get_filtered_data em cada período e
+      get_chart_inputs sem e com cache;
+    - cada gráfico do painel (update_*_chart + desenho no Agg);
+    - o verificador de duplicados (leitura e DedupeEngine.find_clusters);
+    - a exportação CSV do banco inteiro.
+
+    Cada medida roda repeat vezes; o resultado guarda mínimo, mediana e
+    máximo em ms, para comparar execuções (compare_results).
+    """
+    def __init__(self, db_file=DB_FILE, repeat=5):
+        self.db_file = db_file
+        self.repeat = repeat
+        self.results = {}
+
+    def measure(self, name, func, repeat=None, **info):
+        """Roda func() repeat vezes e guarda os tempos; o último retorno (se dict) entra no resultado."""
+        times, extra = [], None
+        for _ in range(repeat or self.repeat):
+            t0 = time.perf_counter()
+            extra = func()
+            times.append((time.perf_counter() - t0) * 1000)
+        result = {
+            "runs": len(times),
+            "min_ms": round(min(times), 3),
+            "median_ms": round(statistics.median(times), 3),
+            "max_ms": round(max(times), 3),
+            **info,
+        }
+        if isinstance(extra, dict):
+            result.update(extra)
+        self.results[name] = result
+        return result
+
+    def _sample_criteria(self, db_manager):
+        """Valores de filtro tirados do próprio banco, para que cada predicado encontre linhas."""
+        with db_manager.pool.reader() as con:
+            cur = con.cursor()
+            name, digits, last_visit = cur.execute(
+                "SELECT name, phone_digits, (SELECT max(visit_date_iso) FROM contacts) FROM contacts "
+                "WHERE phone_digits <> '' ORDER BY id LIMIT 1"
+            ).fetchone()
+            popular = {}
+            for col in ("attended_by", "course", "status"):
+                popular[col] = cur.execute(
+                    f"SELECT {col} FROM contacts WHERE {col} <> '' GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1"
+                ).fetchone()[0]
+        last = datetime.date.fromisoformat(last_visit)
+        month = {"visit_from": (last - datetime.timedelta(days=30)).isoformat(), "visit_to": last.isoformat()}
+        return {
+            "none": {},
+            "text": {"text": name.split()[-1]},
+            "phone": {"phone": digits[-4:]},
+            "phone_short": {"phone": digits[-2:]},
+            "attended_by": {"attended_by": popular["attended_by"]},
+            "course": {"course": popular["course"]},
+            "status": {"status": popular["status"]},
+            "visit_range": month,
+            "combined": {"attended_by": popular["attended_by"], "status": popular["status"], **month},
+        }
+
+    def _bench_contacts(self, db_manager):
+        for key, criteria in self._sample_criteria(db_manager).items():
+            filters = db_manager.build_filters(criteria)
+            self.measure(f"get_contacts[{key}]", lambda: {"rows": len(db_manager.get_contacts(filters))},
+                         criteria=criteria)
+
+    def _bench_dataframe(self, db_manager):
+        from database import DatabaseManager
+
+        def cold():
+            fresh = DatabaseManager(self.db_file)
+            try:
+                return {"rows": len(fresh.get_data_as_dataframe())}
+            finally:
+                fresh.close()
+        self.measure("get_data_as_dataframe[cold]", cold)
+        db_manager.get_data_as_dataframe()
+        self.measure("get_data_as_dataframe[warm]", lambda: {"rows": len(db_manager.get_data_as_dataframe())})
+
+    def _bench_reports(self, db_manager):
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from reports import ReportGenerator, PERIOD_OPTIONS
+        generator = ReportGenerator()
+
+        self.measure("get_rollup_dataframe", lambda: {"rows": len(db_manager.get_rollup_dataframe())})
+        rollup = db_manager.get_rollup_dataframe()
+        for _, period in PERIOD_OPTIONS + [("", "all")]:
+            self.measure(f"get_filtered_data[{period}]",
+                         lambda: {"rows": len(generator.get_filtered_data(rollup, period, "", "", "Todos", "Todos"))})
+        attendant = rollup["attended_by"].mode().iloc[0] if len(rollup) else "Todos"
+        self.measure("get_filtered_data[90_days,attendant]",
+                     lambda: {"rows": len(generator.get_filtered_data(rollup, "90_days", "", "", attendant, "Todos"))})
+        self.measure("compute_chart_inputs[all]", lambda: generator.compute_chart_inputs(rollup) and None)
+
+        # Painel: filtro novo (resumo + pandas) e filtro já visto (cache de get_chart_inputs)
+        version = db_manager.data_version()
+        chart_inputs = lambda g: g.get_chart_inputs(db_manager.get_rollup_dataframe, version, "90_days", "", "", "Todos", "Todos")
+        self.measure("get_chart_inputs[90_days,miss]", lambda: chart_inputs(ReportGenerator()) and None)
+        chart_inputs(generator)
+        self.measure("get_chart_inputs[90_days,hit]", lambda: chart_inputs(generator) and None)
+
+        # Cada gráfico como o painel o chama (contagens + desenho), mais a renderização que o Tk faria depois
+        for chart in ("visits_enrollments", "status_distribution", "lead_source", "top_courses"):
+            update = getattr(generator, f"update_{chart}_chart")
+            fig = Figure(figsize=(6, 4))
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
+
+            def draw():
+                update(ax, fig, rollup)
+                fig.canvas.draw()
+            self.measure(f"chart[{chart}]", draw)
+
+    def _bench_dedupe(self, db_manager):
+        from dedupe import DedupeEngine
+        repeat = min(self.repeat, 3)  # a etapa mais lenta em bancos grandes
+        self.measure("dedupe.get_dedupe_rows", lambda: {"rows": len(db_manager.get_dedupe_rows())}, repeat)
+        rows = db_manager.get_dedupe_rows()
+        engine = DedupeEngine()
+        self.measure("dedupe.find_clusters", lambda: {"clusters": len(engine.find_clusters(rows))}, repeat)
+
+    def _bench_export(self, db_manager):
+        from exporter import ContactExporter
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "contatos.csv")
+
+            def export():
+                rows = ContactExporter(db_manager, path).run()["rows"]
+                return {"rows": rows, "bytes": os.path.getsize(path)}
+            self.measure("export_csv", export, min(self.repeat, 3))
+
+    def run(self, progress=None):
+        """Roda todos os grupos; progress(nome do grupo) antes de cada um. Devolve o resultado completo."""
+        from database import DatabaseManager
+        from migrations import schema_version
+        db_manager = DatabaseManager(self.db_file)
+        try:
+            with db_manager.pool.reader() as con:
+                rows = con.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+                version = schema_version(con)
+            groups = [("contatos", self._bench_contacts), ("dataframe", self._bench_dataframe),
+                      ("relatórios", self._bench_reports), ("duplicados", self._bench_dedupe),
+                      ("exportação", self._bench_export)]
+            t0 = time.perf_counter()
+            for label, bench in groups:
+                if progress:
+                    progress(label)
+                bench(db_manager)
+        finally:
+            db_manager.close()
+        return {
+            "format": RESULTS_FORMAT,
+            "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "elapsed_s": round(time.perf_counter() - t0, 2),
+            "environment": {
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "dataset": {"db_file": os.path.abspath(self.db_file), "rows": rows, "schema_version": version},
+            "repeat": self.repeat,
+            "results": self.results,
+        }
+
+def compare_results(previous, current):
+    """Linhas (nome, mediana anterior, mediana atual, razão atual/anterior) das medidas presentes nos dois."""
+    lines = []
+    for name, result in current["results"].items():
+        before = previous.get("results", {}).get(name)
+        if before:
+            ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else None
+            lines.append((name, before["median_ms"], result["median_ms"], ratio))
+    return lines
+
+def run_benchmarks(db_file=DB_FILE, repeat=5, output=None, baseline=None):
+    """Entrada de main.py --benchmark: roda a suíte, grava/mostra o JSON e compara com uma execução anterior."""
+    if not os.path.exists(db_file):
+        print(f"{db_file} não existe (gere um banco com --generate-data)")
+        return None
+    suite = BenchmarkSuite(db_file, repeat)
+    report = suite.run(progress=lambda label: print(f"medindo {label}...", flush=True))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Resultados em {output}")
+    else:
+        print(text)
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            previous = json.load(f)
+        print(f"Comparação com {baseline} (mediana em ms):")
+        for name, before, after, ratio in compare_results(previous, report):
+            change = f"{ratio:6.2f}x" if ratio is not None else "     -"
+            print(f"  {name:<40} {before:10.1f} {after:10.1f}  {change}")
+    return report
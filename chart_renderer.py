@@ -0,0 +1,201 @@
+# chart_renderer.py
+import math
+import queue
+import threading
+import time
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from diagnostics import diagnostics
+
+class LockedFigureCanvasTkAgg(FigureCanvasTkAgg):
+    """
+    FigureCanvasTkAgg com um lock de renderização, para que um redesenho pedido
+    pelo Tk (ex.: redimensionar a janela) não rode ao mesmo tempo que a
+    renderização Agg feita em segundo plano pelo ChartRenderer.
+    """
+    def __init__(self, figure, master=None):
+        self.render_lock = threading.RLock()
+        super().__init__(figure, master=master)
+
+    def draw(self):
+        with self.render_lock:
+            super().draw()
+
+class ChartRenderer:
+    """
+    Atualiza os quatro gráficos do painel reaproveitando os artistas existentes
+    (alturas das barras, ângulos das fatias e textos) sempre que as categorias
+    não mudaram; caso contrário, redesenha o gráfico com as funções draw_* do
+    ReportGenerator.
+
+    Com threaded=True, a renderização Agg (a parte cara) roda em uma thread e o
+    buffer pronto é copiado (blit) para o widget na thread do Tk, com o mesmo
+    lock de renderização do canvas. Sem thread, usa draw_idle(). Os tempos de
+    cada gráfico ficam em last_timings (ms).
+    """
+    POLL_MS = 15
+
+    def __init__(self, report_generator, root, threaded=True):
+        self.report_generator = report_generator
+        self.root = root
+        self.threaded = threaded
+        self._state = {}  # ax -> (estrutura, artistas)
+        self._done = queue.Queue()
+        self._poll_id = None
+        self._pending = 0
+        self.last_timings = {}
+
+        self._updaters = {
+            "visits_enrollments": (report_generator.draw_visits_enrollments, self._update_visits_enrollments),
+            "status": (report_generator.draw_status_distribution, self._update_status_distribution),
+            "lead_source": (report_generator.draw_lead_source, self._update_bars),
+            "top_courses": (report_generator.draw_top_courses, self._update_bars),
+        }
+
+    def render(self, panels, inputs):
+        """panels: lista de (nome do gráfico, ax, fig) com nomes de _updaters."""
+        self.last_timings = {}
+        canvases = []
+        for name, ax, fig in panels:
+            canvas = fig.canvas
+            lock = getattr(canvas, "render_lock", None) or threading.RLock()
+            t0 = time.perf_counter()
+            with lock:
+                mode = self._apply(name, ax, inputs)
+            self.last_timings[name] = {"mode": mode, "update_ms": round((time.perf_counter() - t0) * 1000, 2)}
+            canvases.append((name, canvas, lock))
+
+        if not self.threaded:
+            for name, canvas, _ in canvases:
+                canvas.draw_idle()
+            return
+
+        self._pending += 1
+        worker = threading.Thread(target=self._render_agg, args=(canvases,), daemon=True)
+        worker.start()
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.POLL_MS, self._poll)
+
+    def _render_agg(self, canvases):
+        for name, canvas, lock in canvases:
+            t0 = time.perf_counter()
+            with lock:
+                FigureCanvasAgg.draw(canvas)  # só o Agg, sem tocar no Tk
+            self._done.put((name, canvas, lock, time.perf_counter() - t0))
+        self._done.put(None)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                item = self._done.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._pending -= 1
+                continue
+            name, canvas, lock, agg_s = item
+            # O blit lê o buffer do Agg: não pode rodar durante um FigureCanvasAgg.draw em outra
+            # thread. Se o lock está ocupado, uma renderização mais nova está em andamento e fará
+            # o próprio blit ao terminar.
+            if not lock.acquire(blocking=False):
+                continue
+            t0 = time.perf_counter()
+            try:
+                canvas.blit()
+            except Exception:
+                continue  # janela fechada durante a renderização
+            finally:
+                lock.release()
+            timing = self.last_timings.setdefault(name, {})
+            timing["agg_ms"] = round(agg_s * 1000, 2)
+            timing["blit_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            diagnostics.record("ui", f"gráfico {name}", timing["agg_ms"] + timing["blit_ms"], **timing)
+        if self._pending > 0:
+            self._poll_id = self.root.after(self.POLL_MS, self._poll)
+
+    def close(self):
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+
+    # --- Atualização dos artistas ---
+    def _apply(self, name, ax, inputs):
+        draw, update = self._updaters[name]
+        structure = self._structure(name, inputs)
+        previous = self._state.get(ax)
+        if previous is not None and previous[0] == structure and previous[1]:
+            update(ax, previous[1], inputs, name)
+            return "in_place"
+        handles = draw(ax, inputs)
+        self._state[ax] = (structure, handles)
+        return "rebuilt"
+
+    def _series(self, name, inputs):
+        return {
+            "status": inputs["status_counts"],
+            "lead_source": inputs["source_counts"],
+            "top_courses": inputs["course_counts"],
+        }.get(name)
+
+    def _structure(self, name, inputs):
+        """O que precisa ser igual para que o gráfico possa ser atualizado no lugar."""
+        if inputs["empty"]:
+            return ("empty",)
+        series = self._series(name, inputs)
+        if series is None:
+            return ("bars",)
+        if series.empty:
+            return ("empty",)
+        return tuple(series.index)
+
+    def _update_visits_enrollments(self, ax, handles, inputs, name):
+        total_visitas = inputs["total_visits"]
+        values = [total_visitas, inputs["total_enrollments"]]
+        for rect, label, v in zip(handles["bars"], handles["labels"], values):
+            rect.set_height(v)
+            label.set_y(v + (total_visitas * 0.02))
+            label.set_text(str(v))
+        ax.set_autoscaley_on(True)  # set_ylim(bottom=0) desliga o autoescalonamento
+        ax.relim()
+        ax.autoscale_view()
+        ax.set_ylim(bottom=0)
+
+    def _update_bars(self, ax, handles, inputs, name):
+        series = self._series(name, inputs)
+        horizontal = name == "lead_source"
+        peak = series.max()
+        for i, (rect, label, v) in enumerate(zip(handles["bars"], handles["labels"], series)):
+            if horizontal:
+                rect.set_width(v)
+                label.set_x(v)
+                label.set_text(f" {v}")
+            else:
+                rect.set_height(v)
+                label.set_y(v + (peak * 0.02))
+                label.set_text(str(v))
+        ax.relim()
+        ax.autoscale_view()
+
+    def _update_status_distribution(self, ax, handles, inputs, name):
+        # Mesma geometria do ax.pie(startangle=90, sentido anti-horário, raio 1)
+        counts = inputs["status_counts"]
+        total = float(counts.sum())
+        theta1 = 90.0 / 360.0  # ângulos em frações de volta, como no matplotlib
+        for wedge, label, pct, v in zip(handles["wedges"], handles["labels"], handles["pcts"], counts):
+            frac = v / total
+            theta2 = theta1 + frac
+            wedge.set_theta1(360.0 * theta1)
+            wedge.set_theta2(360.0 * theta2)
+            mid = math.pi * (theta1 + theta2)
+            x, y = math.cos(mid), math.sin(mid)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment("left" if x > 0 else "right")
+            pct.set_position((0.6 * x, 0.6 * y))
+            pct.set_text(f"{100 * frac:1.1f}%")
+            theta1 = theta2
+        ax.relim()
+        ax.autoscale_view()
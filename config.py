@@ -38,4 +38,51 @@ HOW_FOUND_LIST = [
 COURSE_FOR_LIST = ["Próprio", "Filho(a)", "Neto(a)", "Sobrinho(a)", "Parceiro(a)", "Outro"]
 
 # Configurações da UI
-NOTES_DEFAULT_HEIGHT = 8
\ No newline at end of file
+NOTES_DEFAULT_HEIGHT = 8
+
+# Ajustes de desempenho do SQLite (aplicados em todas as conexões do pool)
+SQLITE_READER_POOL_SIZE = 3          # conexões de leitura mantidas abertas
+SQLITE_READER_WAIT = 30.0            # segundos aguardando uma conexão de leitura livre antes de falhar
+SQLITE_BUSY_TIMEOUT = 5.0            # segundos aguardando um lock antes de falhar
+SQLITE_CACHE_SIZE = -16000           # negativo = KiB (aprox. 16 MB por conexão)
+SQLITE_MMAP_SIZE = 64 * 1024 * 1024  # bytes mapeados em memória (0 desativa)
+SQLITE_TEMP_STORE = "MEMORY"         # DEFAULT, FILE ou MEMORY
+SQLITE_SYNCHRONOUS = "NORMAL"        # OFF, NORMAL, FULL ou EXTRA (NORMAL é seguro com WAL)
+MIGRATION_BATCH_SIZE = 10000         # linhas por transação nos preenchimentos das migrações
+
+# Busca enquanto digita: espera (ms) após a última tecla antes de consultar o banco
+SEARCH_DEBOUNCE_MS = 250
+# Resultados da tabela até este tamanho são carregados e ordenados em memória;
+# acima dele, a tabela lê páginas do banco (COUNT(*) + LIMIT/OFFSET)
+TABLE_MEMORY_MAX_ROWS = 50000
+
+# Backups (API de backup do SQLite)
+BACKUP_PAGES_PER_STEP = 1024        # páginas copiadas por passo (entre passos o banco fica livre)
+BACKUP_DIR = "backups"              # pasta dos backups automáticos, ao lado do banco
+BACKUP_CHECK_MINUTES = 15           # intervalo entre verificações do agendador
+BACKUP_RETENTION = {"hourly": 24, "daily": 7, "weekly": 4}  # cópias guardadas por geração (0 desativa)
+BACKUP_COMPRESS = True              # compacta os backups automáticos com gzip
+
+# Fila de retornos (followup_date gravado como "AAAA-MM-DD HH:MM")
+FOLLOWUP_DEFAULT_TIME = "09:00"                                # hora usada quando só a data é informada
+FOLLOWUP_CLOSED_STATUSES = ("Fechou matrícula", "Sem interesse")  # status que saem da fila
+
+# Servidor HTTP local (main.py --server) e cliente remoto (main.py --remote URL)
+SERVER_HOST = "127.0.0.1"   # só este computador; outros endereços exigem SERVER_TOKEN (ou --token)
+SERVER_PORT = 8765
+SERVER_TOKEN = ""           # senha da API (cabeçalho Authorization: Bearer); vazio = sem senha
+SERVER_MAX_BODY = 1024 * 1024  # bytes aceitos no corpo de uma requisição (acima disso, 413)
+SERVER_WRITE_BATCH = 100    # gravações pendentes confirmadas juntas em uma transação
+SERVER_FETCH_SIZE = 2000    # linhas por bloco nas respostas em fluxo
+REMOTE_TIMEOUT = 30.0       # segundos aguardando o servidor
+REMOTE_CACHE_ENTRIES = 32   # respostas guardadas pelo cliente para revalidar com ETag
+
+# Relatórios em lote (main.py --batch-reports)
+REPORT_BATCH_DPI = 100      # resolução dos PNGs (e das imagens embutidas nos PDFs)
+REPORT_CACHE_ENTRIES = 16   # combinações de período/atendente/curso guardadas pelo painel de relatórios
+
+# Diagnóstico de desempenho (janela oculta: Ctrl+Shift+D)
+DIAGNOSTICS_ENABLED = False # True registra comandos SQL, chamadas ao banco e callbacks da interface
+DIAG_EVENT_BUFFER = 5000    # eventos guardados em memória (os mais antigos saem)
+DIAG_SLOW_QUERY_MS = 250    # comandos acima disso vão para o log de lentas, com EXPLAIN QUERY PLAN
+DIAG_SLOW_LOG_SIZE = 200    # consultas lentas guardadas
@@ -1,82 +1,809 @@
 # database.py
+import datetime
+import re
 import sqlite3
-import pandas as pd
-from config import DB_FILE, DATE_FMT
-from utils import _only_digits
+import threading
+import queue
+from contextlib import contextmanager
+from config import (DB_FILE, DATE_FMT, COLUMNS, SQLITE_READER_POOL_SIZE, SQLITE_READER_WAIT, SQLITE_BUSY_TIMEOUT,
+                    SQLITE_CACHE_SIZE, SQLITE_MMAP_SIZE, SQLITE_TEMP_STORE, SQLITE_SYNCHRONOUS,
+                    FOLLOWUP_CLOSED_STATUSES)
+from utils import _only_digits, ddmmyyyy_to_iso, money_to_cents
+from table_model import table_order_by
+from diagnostics import connection_factory, instrument_methods
 
-def init_db():
-    with sqlite3.connect(DB_FILE) as con:
-        cur = con.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS contacts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL, phone TEXT, email TEXT, course TEXT,
-                visit_date TEXT, status TEXT, followup_date TEXT, notes TEXT
-            )
-            """
+def init_db(progress=None, db_file=DB_FILE):
+    """
+    Cria/atualiza o esquema do banco pelas migrações de migrations.py.
+    progress(descrição, fração) acompanha as migrações pendentes.
+    """
+    from migrations import migrate
+    con = sqlite3.connect(db_file, isolation_level=None)
+    try:
+        migrate(con, progress)
+    finally:
+        con.close()
+
+def schema_is_current(db_file=DB_FILE):
+    """True se o banco já está na última versão do esquema (uma única leitura de PRAGMA)."""
+    from migrations import schema_version, LATEST_VERSION
+    con = sqlite3.connect(db_file)
+    try:
+        return schema_version(con) >= LATEST_VERSION
+    finally:
+        con.close()
+
+def _run_script(cur, script):
+    """
+    Executa um script SQL comando a comando. Diferente do executescript, não
+    faz COMMIT antes: o script roda dentro da transação já aberta.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            cur.execute(statement)
+            statement = ""
+    if statement.strip():
+        cur.execute(statement)
+
+ROLLUP_KEYS = ("day", "attended_by", "course", "status", "how_found")
+
+def _rollup_key_values(prefix):
+    """Valores da chave do resumo a partir de new./old. (vazio no lugar de NULL)."""
+    cols = ("visit_date_iso", "attended_by", "course", "status", "how_found")
+    return ", ".join(f"coalesce({prefix}.{c}, '')" for c in cols)
+
+def _rollup_key_match(prefix):
+    cols = ("visit_date_iso", "attended_by", "course", "status", "how_found")
+    return " AND ".join(f"{k} = coalesce({prefix}.{c}, '')" for k, c in zip(ROLLUP_KEYS, cols))
+
+def _create_rollups(cur):
+    """
+    Resumo diário para o painel de relatórios: quantidade de visitas por
+    dia × atendente × curso × status × origem, mantido por triggers em contacts.
+    """
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'contacts_daily_rollup'")
+    exists = cur.fetchone() is not None
+    _run_script(cur,
+        f"""
+        CREATE TABLE IF NOT EXISTS contacts_daily_rollup (
+            day TEXT NOT NULL, attended_by TEXT NOT NULL, course TEXT NOT NULL,
+            status TEXT NOT NULL, how_found TEXT NOT NULL, visits INTEGER NOT NULL,
+            PRIMARY KEY (day, attended_by, course, status, how_found)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS contacts_rollup_ai AFTER INSERT ON contacts BEGIN
+            INSERT INTO contacts_daily_rollup VALUES ({_rollup_key_values('new')}, 1)
+            ON CONFLICT (day, attended_by, course, status, how_found) DO UPDATE SET visits = visits + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_rollup_ad AFTER DELETE ON contacts BEGIN
+            UPDATE contacts_daily_rollup SET visits = visits - 1 WHERE {_rollup_key_match('old')};
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_rollup_au
+        AFTER UPDATE OF visit_date_iso, attended_by, course, status, how_found ON contacts BEGIN
+            UPDATE contacts_daily_rollup SET visits = visits - 1 WHERE {_rollup_key_match('old')};
+            INSERT INTO contacts_daily_rollup VALUES ({_rollup_key_values('new')}, 1)
+            ON CONFLICT (day, attended_by, course, status, how_found) DO UPDATE SET visits = visits + 1;
+        END;
+        """
+    )
+    if not exists:
+        _rebuild_rollups(cur)
+
+def _rebuild_rollups(cur):
+    cur.execute("DELETE FROM contacts_daily_rollup")
+    cur.execute(
+        """
+        INSERT INTO contacts_daily_rollup (day, attended_by, course, status, how_found, visits)
+        SELECT coalesce(visit_date_iso, ''), coalesce(attended_by, ''), coalesce(course, ''),
+               coalesce(status, ''), coalesce(how_found, ''), COUNT(*)
+          FROM contacts
+         GROUP BY 1, 2, 3, 4, 5
+        """
+    )
+
+def _create_change_tracking(cur):
+    """
+    Numeração das alterações em contacts: cada inserção/atualização grava em
+    row_version o valor seguinte de um contador global, e cada exclusão fica
+    registrada em contacts_deleted. Assim os caches em memória releem só o que
+    mudou desde a última leitura.
+    """
+    _run_script(cur,
+        """
+        CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        INSERT OR IGNORE INTO sync_state (key, value) VALUES ('contacts_version', 0);
+        CREATE TABLE IF NOT EXISTS contacts_deleted (id INTEGER PRIMARY KEY, row_version INTEGER NOT NULL);
+        CREATE INDEX IF NOT EXISTS idx_contacts_row_version ON contacts(row_version);
+
+        CREATE TRIGGER IF NOT EXISTS contacts_version_ai AFTER INSERT ON contacts BEGIN
+            UPDATE sync_state SET value = value + 1 WHERE key = 'contacts_version';
+            UPDATE contacts SET row_version = (SELECT value FROM sync_state WHERE key = 'contacts_version')
+             WHERE id = new.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_version_au AFTER UPDATE ON contacts
+        WHEN new.row_version IS old.row_version BEGIN
+            UPDATE sync_state SET value = value + 1 WHERE key = 'contacts_version';
+            UPDATE contacts SET row_version = (SELECT value FROM sync_state WHERE key = 'contacts_version')
+             WHERE id = new.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_version_ad AFTER DELETE ON contacts BEGIN
+            UPDATE sync_state SET value = value + 1 WHERE key = 'contacts_version';
+            INSERT OR REPLACE INTO contacts_deleted (id, row_version)
+            VALUES (old.id, (SELECT value FROM sync_state WHERE key = 'contacts_version'));
+        END;
+        """
+    )
+
+def _create_import_checkpoints(cur):
+    """Progresso das importações de planilhas, gravado junto com cada lote para retomar após uma falha."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source TEXT PRIMARY KEY,
+            rows_done INTEGER NOT NULL,
+            imported INTEGER NOT NULL,
+            rejected INTEGER NOT NULL,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
         )
-        cur.execute("PRAGMA table_info(contacts)")
-        cols = {row[1] for row in cur.fetchall()}
-        
-        def add_col(col_name, col_type="TEXT"):
-            cur.execute(f"ALTER TABLE contacts ADD COLUMN {col_name} {col_type}")
-        
-        for col in ["monthly_fee", "how_found", "course_for", "attended_by"]:
-            if col not in cols:
-                add_col(col)
-        con.commit()
+        """
+    )
+
+def _create_phone_index(cur):
+    """
+    Índice de trigramas (FTS5) sobre phone_digits para buscas por qualquer trecho
+    do telefone. Se o SQLite não tiver FTS5/trigram, a busca cai no LIKE comum.
+    Devolve True quando o índice existe (criado agora ou antes); os triggers são
+    recriados se faltarem.
+    """
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'contacts_phone_fts'")
+    if not cur.fetchone():
+        try:
+            cur.execute(
+                """CREATE VIRTUAL TABLE contacts_phone_fts USING fts5(
+                       phone_digits, content='contacts', content_rowid='id', tokenize='trigram')"""
+            )
+        except sqlite3.OperationalError:
+            return False
+    _run_script(cur,
+        """
+        CREATE TRIGGER IF NOT EXISTS contacts_phone_fts_ai AFTER INSERT ON contacts BEGIN
+            INSERT INTO contacts_phone_fts(rowid, phone_digits) VALUES (new.id, new.phone_digits);
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_phone_fts_ad AFTER DELETE ON contacts BEGIN
+            INSERT INTO contacts_phone_fts(contacts_phone_fts, rowid, phone_digits) VALUES ('delete', old.id, old.phone_digits);
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_phone_fts_au AFTER UPDATE OF phone_digits ON contacts BEGIN
+            INSERT INTO contacts_phone_fts(contacts_phone_fts, rowid, phone_digits) VALUES ('delete', old.id, old.phone_digits);
+            INSERT INTO contacts_phone_fts(rowid, phone_digits) VALUES (new.id, new.phone_digits);
+        END;
+        """
+    )
+    return True
+
+def _create_text_index(cur):
+    """
+    Índice de texto completo (FTS5) sobre nome, email e observações, sem
+    diferenciar acentos ("Joao" encontra "João"). Devolve True quando o índice
+    existe (criado agora ou antes); os triggers são recriados se faltarem.
+    """
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'contacts_fts'")
+    if not cur.fetchone():
+        try:
+            cur.execute(
+                """CREATE VIRTUAL TABLE contacts_fts USING fts5(
+                       name, email, notes, content='contacts', content_rowid='id',
+                       tokenize='unicode61 remove_diacritics 2', prefix='2 3')"""
+            )
+        except sqlite3.OperationalError:
+            return False
+    _run_script(cur,
+        """
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+            INSERT INTO contacts_fts(rowid, name, email, notes) VALUES (new.id, new.name, new.email, new.notes);
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+            INSERT INTO contacts_fts(contacts_fts, rowid, name, email, notes) VALUES ('delete', old.id, old.name, old.email, old.notes);
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF name, email, notes ON contacts BEGIN
+            INSERT INTO contacts_fts(contacts_fts, rowid, name, email, notes) VALUES ('delete', old.id, old.name, old.email, old.notes);
+            INSERT INTO contacts_fts(rowid, name, email, notes) VALUES (new.id, new.name, new.email, new.notes);
+        END;
+        """
+    )
+    return True
+
+# Status das matrículas fechadas (base dos indicadores de receita)
+ENROLLED_STATUS = "Fechou matrícula"
+
+# Expressões de ordenação da tabela; as demais colunas ordenam como texto
+SORT_EXPRESSIONS = {
+    "id": "id",
+    "visit_date": "visit_date_iso",
+    "phone": "phone_digits",
+    "monthly_fee": "monthly_fee_cents",
+}
+
+def sort_expression(order=None):
+    """Normaliza (coluna, decrescente) em (expressão SQL, decrescente)."""
+    col, descending = order or ("id", True)
+    if col not in {c for c, _ in COLUMNS}:
+        col, descending = "id", True
+    return SORT_EXPRESSIONS.get(col, f"{col} COLLATE NOCASE"), descending
+
+def order_clause(order=None):
+    """
+    Monta o ORDER BY a partir de (coluna, decrescente), com o id como desempate
+    na mesma direção, para que um índice na coluna sirva aos dois sentidos.
+    """
+    expr, descending = sort_expression(order)
+    direction = "DESC" if descending else "ASC"
+    if expr == "id":
+        return f" ORDER BY id {direction}"
+    return f" ORDER BY {expr} {direction}, id {direction}"
+
+# Critérios aceitos por DatabaseManager.build_filters (datas da visita em AAAA-MM-DD)
+FILTER_FIELDS = ("text", "phone", "attended_by", "course", "status", "visit_from", "visit_to")
+
+def _and_clause(filters, condition):
+    """Acrescenta uma condição ao WHERE dos filtros da tabela."""
+    clause = filters.get('clause', '') if filters else ""
+    params = list(filters.get('params', [])) if filters else []
+    return clause + (" AND " if clause else " WHERE ") + condition, params
+
+def fts_match_expr(text):
+    """
+    Converte o texto digitado em uma expressão MATCH do FTS5: cada palavra vira
+    um termo de prefixo entre aspas ("jo" "sil" -> "jo"* AND "sil"*).
+    """
+    terms = re.findall(r"\w+", text or "")
+    return " AND ".join(f'"{t}"*' for t in terms)
+
+ROLLUP_COLUMNS = ["day", "attended_by", "course", "status", "how_found", "visits"]
 
+def rollup_dataframe(rows):
+    """DataFrame do resumo diário (linhas de get_rollup_rows) com a coluna 'visit_date_dt'."""
+    import pandas as pd  # importado sob demanda para não pesar na abertura do app
+    df = pd.DataFrame.from_records(rows, columns=ROLLUP_COLUMNS)
+    df['visit_date_dt'] = pd.to_datetime(df['day'], format="%Y-%m-%d", errors='coerce')
+    return df
+
+class ConnectionPool:
+    """
+    Mantém abertas, durante toda a vida da aplicação, uma única conexão de
+    escrita e um pequeno pool de conexões de leitura, todas em modo WAL.
+    Com todas as leituras emprestadas, reader() espera até reader_wait
+    segundos por uma livre e depois falha (em vez de travar para sempre).
+    """
+    def __init__(self, db_file, readers=SQLITE_READER_POOL_SIZE, reader_wait=SQLITE_READER_WAIT):
+        self.db_file = db_file
+        self.max_readers = max(1, readers)
+        self.reader_wait = reader_wait
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._writer_depth = 0
+        self._idle_readers = queue.LifoQueue()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self, read_only=False):
+        con = sqlite3.connect(self.db_file, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False,
+                              factory=connection_factory())
+        cur = con.cursor()
+        cur.execute(f"PRAGMA cache_size = {int(SQLITE_CACHE_SIZE)}")
+        cur.execute(f"PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}")
+        cur.execute(f"PRAGMA temp_store = {SQLITE_TEMP_STORE}")
+        cur.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        if read_only:
+            cur.execute("PRAGMA query_only = ON")
+        else:
+            # O modo WAL é persistente no arquivo; basta ativá-lo pela conexão de escrita.
+            cur.execute("PRAGMA journal_mode = WAL")
+        cur.close()
+        return con
+
+    def _check_open(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("O pool de conexões já foi fechado.")
+
+    @contextmanager
+    def writer(self):
+        """
+        Empresta a conexão de escrita; faz commit ao sair ou rollback em caso de
+        erro. Chamadas aninhadas (na mesma thread) entram na transação de fora,
+        que é a única a confirmar ou desfazer.
+        """
+        with self._writer_lock:
+            self._check_open()
+            if self._writer is None:
+                self._writer = self._connect()
+            con = self._writer
+            self._writer_depth += 1
+            try:
+                yield con
+                if self._writer_depth == 1:
+                    con.commit()
+            except BaseException:
+                if self._writer_depth == 1:
+                    con.rollback()
+                raise
+            finally:
+                self._writer_depth -= 1
+
+    @contextmanager
+    def reader(self):
+        """Empresta uma conexão de leitura do pool, criando-a sob demanda até o limite."""
+        self._check_open()
+        try:
+            con = self._idle_readers.get_nowait()
+        except queue.Empty:
+            con = None
+            with self._readers_lock:
+                if len(self._readers) < self.max_readers:
+                    con = self._connect(read_only=True)
+                    self._readers.append(con)
+            if con is None:
+                try:
+                    con = self._idle_readers.get(timeout=self.reader_wait)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"Nenhuma conexão de leitura livre após {self.reader_wait:g} s "
+                        f"({self.max_readers} em uso: leitura aninhada ou conexão não devolvida?)"
+                    ) from None
+        try:
+            yield con
+        finally:
+            if con.in_transaction:
+                con.rollback()
+            with self._readers_lock:
+                if self._closed:
+                    # O pool foi fechado enquanto a conexão estava emprestada
+                    con.close()
+                    self._readers.remove(con)
+                else:
+                    self._idle_readers.put(con)
+
+    def data_version(self):
+        """
+        Valor de PRAGMA data_version em uma conexão dedicada que nunca escreve:
+        muda sempre que qualquer outra conexão (deste ou de outro processo)
+        confirma uma alteração no banco.
+        """
+        with self._watcher_lock:
+            self._check_open()
+            if self._watcher is None:
+                self._watcher = self._connect(read_only=True)
+            return self._watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        """
+        Fecha todas as conexões abertas. Chamado ao encerrar a aplicação. As
+        leituras ainda emprestadas a outras threads são fechadas na devolução.
+        """
+        with self._writer_lock:
+            self._closed = True
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            while True:
+                try:
+                    con = self._idle_readers.get_nowait()
+                except queue.Empty:
+                    break
+                con.close()
+                self._readers.remove(con)
+        with self._watcher_lock:
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+
+@instrument_methods
 class DatabaseManager:
+    is_remote = False
+
     def __init__(self, db_file):
         self.db_file = db_file
+        self.pool = ConnectionPool(db_file)
+        self._has_phone_index = None
+        self._has_text_index = None
 
-    def _get_conn(self):
-        return sqlite3.connect(self.db_file)
+        # Cache do DataFrame de contatos (relatórios e duplicados)
+        self._df_cache = None
+        self._df_row_version = 0
+        self._df_data_version = None
+        self._df_lock = threading.Lock()
+
+    def close(self):
+        self.pool.close()
+
+    @staticmethod
+    def _derived_values(data):
+        """Colunas calculadas a partir dos campos do formulário (mantidas em sincronia na escrita)."""
+        phone, visit_date, monthly_fee = data[1], data[4], data[6]
+        return (ddmmyyyy_to_iso(visit_date), _only_digits(phone), money_to_cents(monthly_fee))
 
     def add_contact(self, data):
-        with self._get_conn() as con:
+        """Insere o contato e devolve a linha gravada (no formato da tabela)."""
+        data = tuple(data[:11]) + self._derived_values(data)
+        with self.pool.writer() as con:
             cur = con.cursor()
             cur.execute(
                 """INSERT INTO contacts (name, phone, email, course, visit_date, status, 
-                                        monthly_fee, how_found, course_for, attended_by, notes) 
-                   VALUES (?,?,?,?,?,?,?,?,?,?,?)""", data
+                                        monthly_fee, how_found, course_for, attended_by, notes,
+                                        visit_date_iso, phone_digits, monthly_fee_cents) 
+                   VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", data
             )
-            con.commit()
+            return self.get_contact(con, cur.lastrowid)
+
+    # Gatilhos de inserção substituídos por manutenção em bloco em insert_contacts
+    BULK_INSERT_TRIGGERS = ("contacts_phone_fts_ai", "contacts_fts_ai", "contacts_version_ai", "contacts_rollup_ai")
+
+    def insert_contacts(self, con, records):
+        """
+        Insere vários contatos de uma vez (importação), dentro da transação de
+        con. Cada registro traz os 11 campos do formulário mais visit_date_iso,
+        phone_digits e monthly_fee_cents.
+
+        Os gatilhos AFTER INSERT são suspensos dentro da própria transação e o
+        trabalho deles (índices FTS, rollup diário e row_version) é feito com
+        um INSERT ... SELECT para o lote inteiro; outras conexões nunca veem a
+        tabela sem os gatilhos.
+        """
+        if not records:
+            return 0
+        if not con.in_transaction:
+            con.execute("BEGIN IMMEDIATE")  # o DROP TRIGGER não abre transação sozinho
+        cur = con.cursor()
+        marks = ",".join("?" * len(self.BULK_INSERT_TRIGGERS))
+        cur.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({marks})",
+                    self.BULK_INSERT_TRIGGERS)
+        triggers = cur.fetchall()
+        for name, _ in triggers:
+            cur.execute(f"DROP TRIGGER {name}")
+
+        cur.execute("SELECT coalesce(max(id), 0) FROM contacts")
+        last_id = cur.fetchone()[0]
+        cur.execute("UPDATE sync_state SET value = value + 1 WHERE key = 'contacts_version'")
+        cur.execute("SELECT value FROM sync_state WHERE key = 'contacts_version'")
+        version = cur.fetchone()[0]
+        cur.executemany(
+            """INSERT INTO contacts (name, phone, email, course, visit_date, status, 
+                                    monthly_fee, how_found, course_for, attended_by, notes,
+                                    visit_date_iso, phone_digits, monthly_fee_cents, row_version) 
+               VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", [r + (version,) for r in records]
+        )
+
+        dropped = {name for name, _ in triggers}
+        if "contacts_phone_fts_ai" in dropped:
+            cur.execute("INSERT INTO contacts_phone_fts(rowid, phone_digits) SELECT id, phone_digits FROM contacts WHERE id > ?", (last_id,))
+        if "contacts_fts_ai" in dropped:
+            cur.execute("INSERT INTO contacts_fts(rowid, name, email, notes) SELECT id, name, email, notes FROM contacts WHERE id > ?", (last_id,))
+        if "contacts_rollup_ai" in dropped:
+            cur.execute(
+                f"""
+                INSERT INTO contacts_daily_rollup (day, attended_by, course, status, how_found, visits)
+                SELECT {_rollup_key_values('contacts')}, COUNT(*)
+                  FROM contacts WHERE id > ?
+                 GROUP BY 1, 2, 3, 4, 5
+                ON CONFLICT (day, attended_by, course, status, how_found) DO UPDATE SET visits = visits + excluded.visits
+                """, (last_id,)
+            )
+        for _, sql in triggers:
+            cur.execute(sql)
+        return len(records)
+
+    def get_import_checkpoint(self, source):
+        """(rows_done, imported, rejected) de uma importação interrompida, ou None."""
+        with self.pool.reader() as con:
+            cur = con.cursor()
+            cur.execute("SELECT rows_done, imported, rejected FROM import_checkpoints WHERE source = ?", (source,))
+            return cur.fetchone()
+
+    def save_import_checkpoint(self, con, source, rows_done, imported, rejected):
+        con.execute(
+            """INSERT INTO import_checkpoints (source, rows_done, imported, rejected, updated_at)
+               VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+               ON CONFLICT (source) DO UPDATE SET rows_done = excluded.rows_done, imported = excluded.imported,
+                                                  rejected = excluded.rejected, updated_at = excluded.updated_at""",
+            (source, rows_done, imported, rejected)
+        )
+
+    def clear_import_checkpoint(self, source):
+        with self.pool.writer() as con:
+            con.execute("DELETE FROM import_checkpoints WHERE source = ?", (source,))
 
     def update_contact(self, data):
-        with self._get_conn() as con:
+        """Atualiza o contato (id no último campo) e devolve a linha gravada."""
+        data = tuple(data[:11]) + self._derived_values(data) + (data[11],)
+        with self.pool.writer() as con:
             cur = con.cursor()
             cur.execute(
                 """UPDATE contacts SET name=?, phone=?, email=?, course=?, visit_date=?, status=?, 
-                                      monthly_fee=?, how_found=?, course_for=?, attended_by=?, notes=? 
+                                      monthly_fee=?, how_found=?, course_for=?, attended_by=?, notes=?,
+                                      visit_date_iso=?, phone_digits=?, monthly_fee_cents=? 
                    WHERE id=?""", data
             )
-            con.commit()
+            return self.get_contact(con, data[-1])
 
     def delete_contact(self, contact_id):
-        with self._get_conn() as con:
+        with self.pool.writer() as con:
             cur = con.cursor()
             cur.execute("DELETE FROM contacts WHERE id=?", (contact_id,))
-            con.commit()
+            return contact_id
+
+    def _table_exists(self, name):
+        with self.pool.reader() as con:
+            cur = con.cursor()
+            cur.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+            return cur.fetchone() is not None
+
+    def text_search_clause(self, text):
+        """
+        Retorna (condição SQL, parâmetros) para a busca livre da barra superior:
+        nome, email e observações pelo índice FTS5, com prefixo e sem acentos.
+        """
+        if self._has_text_index is None:
+            self._has_text_index = self._table_exists("contacts_fts")
+        match = fts_match_expr(text)
+        if self._has_text_index and match:
+            return "id IN (SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH ?)", [match]
+        return "name LIKE ?", [f"%{text}%"]
+
+    def search_contacts(self, text, limit=50):
+        """
+        Busca ranqueada (bm25) por nome, email e observações. Retorna tuplas
+        (id, nome destacado, email destacado, trecho das observações, rank),
+        com os termos encontrados entre colchetes.
+        """
+        match = fts_match_expr(text)
+        if not match:
+            return []
+        with self.pool.reader() as con:
+            cur = con.cursor()
+            try:
+                cur.execute(
+                    """SELECT rowid,
+                              highlight(contacts_fts, 0, '[', ']'),
+                              highlight(contacts_fts, 1, '[', ']'),
+                              snippet(contacts_fts, 2, '[', ']', '…', 12),
+                              rank
+                         FROM contacts_fts
+                        WHERE contacts_fts MATCH ?
+                        ORDER BY rank
+                        LIMIT ?""", (match, limit)
+                )
+                return cur.fetchall()
+            except sqlite3.OperationalError:
+                return []
+
+    def phone_search_clause(self, digits):
+        """
+        Retorna (condição SQL, parâmetros) para buscar um trecho de dígitos do telefone.
+        Trechos com 3 dígitos ou mais usam o índice de trigramas.
+        """
+        if self._has_phone_index is None:
+            self._has_phone_index = self._table_exists("contacts_phone_fts")
+        if self._has_phone_index and len(digits) >= 3:
+            return "id IN (SELECT rowid FROM contacts_phone_fts WHERE phone_digits MATCH ?)", [f'"{digits}"']
+        return "phone_digits LIKE ?", [f"%{digits}%"]
+
+    def build_filters(self, criteria):
+        """
+        Monta o filtro da tabela ({"clause", "params"}) a partir dos critérios
+        de FILTER_FIELDS; valores vazios (ou "Todos") são ignorados. Levanta
+        ValueError se uma data não estiver em AAAA-MM-DD.
+        """
+        criteria = {k: v for k, v in (criteria or {}).items() if v and v != "Todos"}
+        where, params = [], []
+        text = (criteria.get("text") or "").strip()
+        if text:
+            text_clause, text_params = self.text_search_clause(text)
+            where.append(text_clause)
+            params.extend(text_params)
+
+        digits = _only_digits(criteria.get("phone"))
+        if digits:
+            phone_clause, phone_params = self.phone_search_clause(digits)
+            where.append(phone_clause)
+            params.extend(phone_params)
+
+        for col in ("attended_by", "course", "status"):
+            if criteria.get(col):
+                where.append(f"{col} = ?")
+                params.append(criteria[col])
+
+        vfrom_iso, vto_iso = criteria.get("visit_from"), criteria.get("visit_to")
+        for iso in (vfrom_iso, vto_iso):
+            if iso:
+                datetime.date.fromisoformat(iso)
+        if vfrom_iso and vto_iso:
+            where.append("visit_date_iso BETWEEN ? AND ?")
+            params.extend([vfrom_iso, vto_iso])
+        elif vfrom_iso:
+            where.append("visit_date_iso >= ?")
+            params.append(vfrom_iso)
+        elif vto_iso:
+            where.append("visit_date_iso <= ?")
+            params.append(vto_iso)
+
+        clause = (" WHERE " + " AND ".join(where)) if where else ""
+        return {"clause": clause, "params": params}
 
     def get_contacts(self, filters=None):
-        with self._get_conn() as con:
+        with self.pool.reader() as con:
+            return self.query_contacts(con, filters)
+
+    def query_contacts(self, con, filters=None, order=None, limit=None, offset=0):
+        """
+        Mesma consulta de get_contacts, usando uma conexão já emprestada do pool.
+        Aceita uma ordenação (coluna, decrescente) e uma página (limit/offset).
+        """
+        cur = con.cursor()
+        base_select = "SELECT id, name, phone, email, course, visit_date, status, monthly_fee, how_found, course_for, attended_by, notes FROM contacts"
+        
+        clause = ""
+        params = []
+        if filters:
+            clause = filters.get('clause', '')
+            params = filters.get('params', [])
+        
+        query = base_select + clause + order_clause(order)
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params = list(params) + [limit, offset]
+        cur.execute(query, params)
+        return cur.fetchall()
+
+    def _table_columns_cursor(self, con, filters, fields):
+        clause = filters.get('clause', '') if filters else ""
+        params = filters.get('params', []) if filters else []
+        cur = con.cursor()
+        cur.execute(f"SELECT {', '.join(fields)} FROM contacts{clause} ORDER BY id", params)
+        return cur
+
+    def query_table_columns(self, con, filters=None, fields=None):
+        """Linhas do resultado filtrado só com as colunas pedidas, em ordem de id (para o modelo da tabela)."""
+        return self._table_columns_cursor(con, filters, fields).fetchall()
+
+    def stream_table_columns(self, con, filters=None, fields=None, fetch_size=2000):
+        """Mesmo resultado de query_table_columns, em lotes de fetch_size linhas."""
+        cur = self._table_columns_cursor(con, filters, fields)
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield rows
+
+    def get_notes(self, con, ids):
+        """Observações de alguns contatos, como {id: notes}."""
+        if not ids:
+            return {}
+        cur = con.cursor()
+        cur.execute(f"SELECT id, notes FROM contacts WHERE id IN ({','.join('?' * len(ids))})", list(ids))
+        return dict(cur.fetchall())
+
+    def stream_contacts(self, con, filters=None, order=None, fetch_size=2000):
+        """
+        Percorre o resultado filtrado em lotes de fetch_size linhas (fetchmany),
+        sem carregar tudo na memória, na mesma ordem da tabela na tela para
+        order = (coluna, decrescente).
+        """
+        clause = filters.get('clause', '') if filters else ""
+        params = filters.get('params', []) if filters else []
+        cur = con.cursor()
+        cur.execute(
+            "SELECT id, name, phone, email, course, visit_date, status, monthly_fee, how_found, course_for, attended_by, notes FROM contacts"
+            + clause + table_order_by(con, order), params
+        )
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield rows
+
+    def get_contact(self, con, contact_id):
+        cur = con.cursor()
+        cur.execute(
+            "SELECT id, name, phone, email, course, visit_date, status, monthly_fee, how_found, course_for, attended_by, notes FROM contacts WHERE id = ?",
+            (contact_id,)
+        )
+        return cur.fetchone()
+
+    def contact_matches(self, con, contact_id, filters=None):
+        """Indica se o contato faz parte do resultado dos filtros informados."""
+        clause, params = _and_clause(filters, "id = ?")
+        cur = con.cursor()
+        cur.execute("SELECT 1 FROM contacts" + clause, params + [contact_id])
+        return cur.fetchone() is not None
+
+    def contact_position(self, con, contact_id, filters=None, order=None):
+        """
+        Posição (0-based) do contato no resultado filtrado e ordenado, contando
+        as linhas que vêm antes dele no ORDER BY da tabela.
+        """
+        expr, descending = sort_expression(order)
+        cur = con.cursor()
+        cur.execute(f"SELECT {expr} FROM contacts WHERE id = ?", (contact_id,))
+        found = cur.fetchone()
+        if found is None:
+            return None
+        key = found[0]
+        cmp, tie = (">", ">") if descending else ("<", "<")
+        if key is None:
+            # NULLs vêm primeiro em ordem crescente e por último em decrescente
+            if descending:
+                condition, extra = f"({expr} IS NOT NULL OR id > ?)", [contact_id]
+            else:
+                condition, extra = f"({expr} IS NULL AND id < ?)", [contact_id]
+        else:
+            null_first = "" if descending else f"{expr} IS NULL OR "
+            condition = f"({null_first}{expr} {cmp} ? OR ({expr} = ? AND id {tie} ?))"
+            extra = [key, key, contact_id]
+        clause, params = _and_clause(filters, condition)
+        cur.execute("SELECT COUNT(*) FROM contacts" + clause, params + extra)
+        return cur.fetchone()[0]
+
+    def count_contacts(self, con, filters=None):
+        cur = con.cursor()
+        clause = filters.get('clause', '') if filters else ""
+        params = filters.get('params', []) if filters else []
+        cur.execute("SELECT COUNT(*) FROM contacts" + clause, params)
+        return cur.fetchone()[0]
+
+    def get_dedupe_rows(self):
+        """(id, name, phone, phone_digits, email) de todos os contatos, para o verificador de duplicados."""
+        with self.pool.reader() as con:
             cur = con.cursor()
-            base_select = "SELECT id, name, phone, email, course, visit_date, status, monthly_fee, how_found, course_for, attended_by, notes FROM contacts"
-            
-            clause = ""
-            params = []
-            if filters:
-                clause = filters.get('clause', '')
-                params = filters.get('params', [])
-            
-            query = base_select + clause + " ORDER BY id DESC"
-            cur.execute(query, params)
+            cur.execute("SELECT id, name, phone, phone_digits, email FROM contacts")
             return cur.fetchall()
 
+    # --- Retornos agendados (followup_date) ---
+    def get_followups(self, attended_by=None, until=None, contact_ids=None):
+        """
+        Retornos pendentes (id, nome, telefone, atendente, followup_date, status)
+        em ordem de data, sem os contatos com status de FOLLOWUP_CLOSED_STATUSES.
+        Com attended_by a consulta usa idx_contacts_followup; sem ele, o índice
+        parcial idx_contacts_followup_date.
+        """
+        marks = ",".join("?" * len(FOLLOWUP_CLOSED_STATUSES))
+        where = ["followup_date IS NOT NULL", f"coalesce(status, '') NOT IN ({marks})"]
+        params = list(FOLLOWUP_CLOSED_STATUSES)
+        if attended_by:
+            where.append("attended_by = ?")
+            params.append(attended_by)
+        if until:
+            where.append("followup_date <= ?")
+            params.append(until)
+        if contact_ids is not None:
+            if not contact_ids:
+                return []
+            where.append(f"id IN ({','.join('?' * len(contact_ids))})")
+            params.extend(contact_ids)
+        with self.pool.reader() as con:
+            cur = con.cursor()
+            cur.execute(
+                "SELECT id, name, phone, attended_by, followup_date, status FROM contacts WHERE "
+                + " AND ".join(where) + " ORDER BY followup_date, id", params
+            )
+            return cur.fetchall()
+
+    def get_followup(self, contact_id):
+        with self.pool.reader() as con:
+            row = con.execute("SELECT followup_date FROM contacts WHERE id = ?", (contact_id,)).fetchone()
+            return row[0] if row else None
+
+    def set_followup(self, contact_id, when):
+        """Agenda (when = "AAAA-MM-DD HH:MM") ou conclui (when = None) o retorno do contato."""
+        with self.pool.writer() as con:
+            con.execute("UPDATE contacts SET followup_date = ? WHERE id = ?", (when, contact_id))
+
     def get_distinct_values(self, column):
-        with self._get_conn() as con:
+        with self.pool.reader() as con:
             cur = con.cursor()
             try:
                 cur.execute(f"SELECT DISTINCT {column} FROM contacts WHERE {column} IS NOT NULL AND {column} <> '' ORDER BY {column}")
@@ -84,15 +811,133 @@ class DatabaseManager:
             except sqlite3.OperationalError:
                 return []
 
+    def data_version(self):
+        return self.pool.data_version()
+
+    def rebuild_rollups(self):
+        """Recalcula do zero o resumo diário dos relatórios a partir de contacts."""
+        with self.pool.writer() as con:
+            _rebuild_rollups(con.cursor())
+
+    def get_rollup_dataframe(self, start_iso=None, end_iso=None, attended_by=None, course=None):
+        """
+        Resumo diário (contacts_daily_rollup) já restrito ao período/atendente/curso,
+        no formato aceito por ReportGenerator: 'visit_date_dt' e a contagem em 'visits'.
+        """
+        return rollup_dataframe(self.get_rollup_rows(start_iso, end_iso, attended_by, course))
+
+    def get_rollup_rows(self, start_iso=None, end_iso=None, attended_by=None, course=None):
+        """Linhas (day, attended_by, course, status, how_found, visits) de get_rollup_dataframe."""
+        where, params = ["visits > 0"], []
+        if start_iso:
+            where.append("day >= ?")
+            params.append(start_iso)
+        if end_iso:
+            where.append("day <= ?")
+            params.append(end_iso)
+        if attended_by and attended_by != "Todos":
+            where.append("attended_by = ?")
+            params.append(attended_by)
+        if course and course != "Todos":
+            where.append("course = ?")
+            params.append(course)
+        with self.pool.reader() as con:
+            cur = con.cursor()
+            cur.execute(
+                "SELECT day, attended_by, course, status, how_found, visits FROM contacts_daily_rollup WHERE "
+                + " AND ".join(where), params
+            )
+            return cur.fetchall()
+
+    def get_revenue_kpis(self, start_iso=None, end_iso=None, attended_by=None, course=None):
+        """
+        Indicadores de receita das matrículas fechadas no período (valores em
+        centavos), calculados no SQLite sobre o índice idx_contacts_revenue:
+        receita mensal projetada, ticket médio e os mesmos números por atendente
+        e por curso, como listas (nome, matrículas, ticket médio, receita).
+        """
+        where, params = ["status = ?", "monthly_fee_cents IS NOT NULL"], [ENROLLED_STATUS]
+        if start_iso:
+            where.append("visit_date_iso >= ?")
+            params.append(start_iso)
+        if end_iso:
+            where.append("visit_date_iso <= ?")
+            params.append(end_iso)
+        if attended_by and attended_by != "Todos":
+            where.append("attended_by = ?")
+            params.append(attended_by)
+        if course and course != "Todos":
+            where.append("course = ?")
+            params.append(course)
+        where = " WHERE " + " AND ".join(where)
+        with self.pool.reader() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT COUNT(*), SUM(monthly_fee_cents), AVG(monthly_fee_cents) FROM contacts{where}", params)
+            enrollments, total, average = cur.fetchone()
+            groups = {}
+            for key, column, empty in (("by_attendant", "attended_by", "(sem atendente)"), ("by_course", "course", "(sem curso)")):
+                cur.execute(
+                    f"""SELECT coalesce(nullif({column}, ''), ?), COUNT(*), AVG(monthly_fee_cents), SUM(monthly_fee_cents)
+                          FROM contacts{where}
+                         GROUP BY 1 ORDER BY 4 DESC""", [empty] + params
+                )
+                groups[key] = [(name, n, round(avg), int(sum_)) for name, n, avg, sum_ in cur.fetchall()]
+        return {
+            "enrollments": enrollments,
+            "total_cents": int(total or 0),
+            "average_cents": round(average) if average is not None else None,
+            **groups,
+        }
+
     def get_data_as_dataframe(self):
-        with self._get_conn() as con:
-            df = pd.read_sql_query("SELECT * FROM contacts", con)
-            df['visit_date_dt'] = pd.to_datetime(df['visit_date'], format=DATE_FMT, errors='coerce')
-            return df
+        """
+        Todos os contatos em um DataFrame tipado, mantido em cache. Se o banco não
+        mudou (PRAGMA data_version), o SQLite nem é consultado; se mudou, só as
+        linhas com row_version novo são relidas e as apagadas são retiradas.
+        """
+        with self._df_lock:
+            data_version = self.pool.data_version()
+            if self._df_cache is None or data_version != self._df_data_version:
+                self._refresh_dataframe_cache()
+                self._df_data_version = data_version
+            # Cópia rasa: quem chama pode acrescentar colunas sem alterar o cache
+            return self._df_cache.copy(deep=False)
+
+    def _refresh_dataframe_cache(self):
+        import pandas as pd  # importado sob demanda para não pesar na abertura do app
+        with self.pool.reader() as con:
+            con.execute("BEGIN")  # leitura consistente entre as consultas abaixo
+            cur = con.cursor()
+            cur.execute("SELECT value FROM sync_state WHERE key = 'contacts_version'")
+            version = cur.fetchone()[0]
+            if self._df_cache is None:
+                changed = pd.read_sql_query("SELECT * FROM contacts ORDER BY id", con)
+                deleted = []
+            else:
+                if version == self._df_row_version:
+                    return
+                changed = pd.read_sql_query(
+                    "SELECT * FROM contacts WHERE row_version > ? ORDER BY id", con, params=(self._df_row_version,)
+                )
+                cur.execute("SELECT id FROM contacts_deleted WHERE row_version > ?", (self._df_row_version,))
+                deleted = [r[0] for r in cur.fetchall()]
+
+        changed['visit_date_dt'] = pd.to_datetime(changed['visit_date'], format=DATE_FMT, errors='coerce')
+        changed.index = changed['id'].to_numpy()
+        if self._df_cache is None:
+            df = changed
+        else:
+            df = self._df_cache
+            stale = df.index.intersection(changed.index.union(pd.Index(deleted)))
+            if len(stale):
+                df = df.drop(index=stale)
+            if len(changed):
+                df = pd.concat([df, changed]).sort_index() if len(df) else changed
+        self._df_cache = df
+        self._df_row_version = version
 
     def delete_contacts_by_ids(self, ids):
-        with self._get_conn() as con:
+        with self.pool.writer() as con:
             cur = con.cursor()
             cur.executemany("DELETE FROM contacts WHERE id = ?", [(id,) for id in ids])
-            con.commit()
             return len(ids)
\ No newline at end of file
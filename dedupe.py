@@ -0,0 +1,285 @@
+# dedupe.py
+import difflib
+import functools
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from utils import only_digits_batch
+
+# Regras fonéticas simples para nomes em português (aplicadas em ordem)
+PHONETIC_RULES = (
+    ("ph", "f"), ("lh", "l"), ("nh", "n"), ("sh", "x"), ("ch", "x"),
+    ("qu", "k"), ("ck", "k"), ("ce", "se"), ("ci", "si"), ("c", "k"), ("q", "k"),
+    ("ge", "je"), ("gi", "ji"), ("y", "i"), ("w", "v"), ("z", "s"), ("ss", "s"), ("h", ""),
+)
+
+def fold_text(s):
+    """Minúsculas, sem acentos e com espaços normalizados ("  João " -> "joao")."""
+    s = s or ""
+    if not s.isascii():
+        s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
+    return " ".join(s.casefold().split())
+
+@functools.lru_cache(maxsize=65536)
+def phonetic_token(token):
+    """Chave fonética de uma palavra: aplica PHONETIC_RULES, junta letras repetidas e tira vogais internas."""
+    t = re.sub(r"[^a-z]", "", token)
+    if not t:
+        return ""
+    for old, new in PHONETIC_RULES:
+        t = t.replace(old, new)
+    t = re.sub(r"(.)\1+", r"\1", t)
+    return t[:1] + re.sub(r"[aeiou]", "", t[1:])
+
+def name_key(folded_name):
+    """Chave de bloco do nome: fonética do primeiro e do último nome."""
+    tokens = folded_name.split()
+    if not tokens:
+        return ""
+    first = phonetic_token(tokens[0])
+    return first if len(tokens) == 1 else f"{first} {phonetic_token(tokens[-1])}"
+
+@functools.lru_cache(maxsize=65536)
+def char_counts(folded_name):
+    """Contagem das letras de um nome (para o limite de similaridade antes do difflib)."""
+    return Counter(folded_name)
+
+def normalize_phone(digits):
+    """Tira DDI (55) e zero de operadora, para comparar telefones digitados de formas diferentes."""
+    digits = digits or ""
+    if len(digits) >= 12 and digits.startswith("55"):
+        digits = digits[2:]
+    return digits.lstrip("0")
+
+class DedupeEngine:
+    """
+    Encontra contatos prováveis de serem a mesma pessoa sem comparar todos com
+    todos: cada contato entra em blocos (últimos 8 dígitos do telefone, email
+    sem acento/maiúsculas e chave fonética do nome) e só os contatos de um
+    mesmo bloco são comparados. Os pares acima de min_score são agrupados
+    (union-find) em clusters.
+
+    A pontuação combina a evidência do telefone/email com a similaridade dos
+    nomes (difflib): email igual ou telefone igual valem 1.0, telefone com o
+    mesmo final (com/sem DDD ou nono dígito) vale 0.9, e pares só com nomes
+    parecidos precisam de pelo menos name_only_min de similaridade. Antes do
+    difflib, o limite pelo tamanho dos nomes e os tokens em comum descartam os
+    pares que não têm como chegar à nota mínima.
+
+    Blocos maiores que max_block_size (nome muito comum, telefone ou email
+    repetido em muitos cadastros) não são ignorados, e sim divididos:
+    - nome: por DDD; dentro de cada parte, contatos com o mesmo nome (sem
+      acentos) são ligados direto e só os nomes distintos são comparados;
+    - telefone: pelo telefone completo, mais uma janela sobre a ordem dos nomes
+      para os números com/sem DDD ou nono dígito;
+    - email: janela sobre a ordem dos nomes (todos os pares já têm evidência).
+    Partes que continuam grandes usam a mesma janela (vizinhança ordenada):
+    cada contato é comparado só com os window seguintes.
+    """
+    PHONE_SUFFIX = 8
+
+    def __init__(self, min_score=0.6, name_only_min=0.92, max_block_size=50, window=10):
+        self.min_score = min_score
+        self.name_only_min = name_only_min
+        self.max_block_size = max_block_size
+        self.window = window
+        self.last_stats = {}
+        self._difflib_calls = 0
+
+    def _prepare(self, rows):
+        """rows: (id, name, phone, phone_digits, email). Devolve registros normalizados e os blocos."""
+        records = []
+        blocks = defaultdict(list)
+        if any(r[3] is None for r in rows):
+            # Contatos gravados fora do programa podem não ter phone_digits: calcula a coluna de uma vez
+            computed = only_digits_batch([r[2] for r in rows])
+            rows = [r if r[3] is not None else (r[0], r[1], r[2], d, r[4]) for r, d in zip(rows, computed)]
+        for contact_id, name, phone, digits, email in rows:
+            folded = fold_text(name)
+            phone_norm = normalize_phone(digits)
+            email_key = fold_text((email or "").strip())
+            index = len(records)
+            records.append((contact_id, name, phone, email, folded, phone_norm, email_key, frozenset(folded.split())))
+            if len(phone_norm) >= self.PHONE_SUFFIX:
+                blocks["p:" + phone_norm[-self.PHONE_SUFFIX:]].append(index)
+            if email_key:
+                blocks["e:" + email_key].append(index)
+            key = name_key(folded)
+            if key:
+                blocks["n:" + key].append(index)
+        return records, blocks
+
+    def name_similarity(self, a, b, minimum, by_tokens=False):
+        """
+        Similaridade (difflib) dos nomes de dois registros, ou 0.0 quando um
+        filtro barato mostra que ela não chega a minimum: o ratio do difflib
+        nunca passa de 2*menor/(soma dos tamanhos). Com by_tokens, nomes de
+        várias palavras sem nenhuma palavra em comum (Jaccard 0) também são
+        descartados.
+        """
+        name_a, name_b = a[4], b[4]
+        if name_a == name_b:
+            return 1.0
+        size_a, size_b = len(name_a), len(name_b)
+        if not size_a or not size_b or 2.0 * min(size_a, size_b) / (size_a + size_b) < minimum:
+            return 0.0
+        if by_tokens and len(a[7]) > 1 and len(b[7]) > 1 and a[7].isdisjoint(b[7]):
+            return 0.0
+        # Mesmo limite do quick_ratio do difflib (letras em comum), sem montar o SequenceMatcher
+        common = sum((char_counts(name_a) & char_counts(name_b)).values())
+        if 2.0 * common / (size_a + size_b) < minimum:
+            return 0.0
+        self._difflib_calls += 1
+        return difflib.SequenceMatcher(None, name_a, name_b, autojunk=False).ratio()
+
+    def score(self, a, b):
+        """Pontuação de 0 a 1 para dois registros normalizados (0 quando não parecem duplicados)."""
+        phone_a, phone_b = a[5], b[5]
+        if a[6] and a[6] == b[6]:
+            evidence = 1.0
+        elif phone_a and phone_a == phone_b:
+            evidence = 1.0
+        elif len(phone_a) >= self.PHONE_SUFFIX and phone_a[-self.PHONE_SUFFIX:] == phone_b[-self.PHONE_SUFFIX:]:
+            evidence = 0.9
+        else:
+            evidence = 0.0
+
+        if evidence:
+            return 0.6 * evidence + 0.4 * self.name_similarity(a, b, 0.5)
+        name_score = self.name_similarity(a, b, self.name_only_min, by_tokens=True)
+        return 0.9 * name_score if name_score >= self.name_only_min else 0.0
+
+    @staticmethod
+    def _split(members, key):
+        parts = defaultdict(list)
+        for i in members:
+            parts[key(i)].append(i)
+        return parts.values()
+
+    def find_clusters(self, rows):
+        """
+        Devolve os clusters em ordem de pontuação, como dicts
+        {"score": melhor par, "members": [(id, nome, telefone, email, pontuação), ...]}.
+        """
+        t0 = time.perf_counter()
+        records, blocks = self._prepare(rows)
+        parent = list(range(len(records)))
+        self._difflib_calls = 0
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        best = {}  # índice -> melhor pontuação com algum outro membro
+        seen = set()
+        compared = 0
+
+        def link(i, j, s):
+            best[i] = max(best.get(i, 0.0), s)
+            best[j] = max(best.get(j, 0.0), s)
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[rj] = ri
+
+        def compare(i, j):
+            nonlocal compared
+            pair = (i, j) if i < j else (j, i)
+            if pair in seen:
+                return
+            seen.add(pair)
+            compared += 1
+            s = self.score(records[i], records[j])
+            if s >= self.min_score:
+                link(i, j, s)
+
+        def compare_all(members):
+            for pos, i in enumerate(members):
+                for j in members[pos + 1:]:
+                    compare(i, j)
+
+        def compare_window(members):
+            # Vizinhança ordenada: cada registro só com os window seguintes
+            for pos, i in enumerate(members):
+                for j in members[pos + 1:pos + 1 + self.window]:
+                    compare(i, j)
+
+        def by_name(members):
+            return sorted(members, key=lambda i: (records[i][4], records[i][5]))
+
+        def compare_part(members):
+            if len(members) <= self.max_block_size:
+                compare_all(members)
+            else:
+                compare_window(by_name(members))
+
+        def compare_names(members):
+            # Sem telefone/email em comum só o nome conta, e a nota só depende dos nomes:
+            # cada par de nomes distintos do bloco é comparado uma vez e vale para todos os DDDs
+            nonlocal compared
+            first = {}
+            for i in members:
+                first.setdefault(records[i][4], i)
+            names = sorted(first)
+            span = len(names) if len(names) <= self.max_block_size else self.window + 1
+            similar = []
+            for pos, name_a in enumerate(names):
+                for name_b in names[pos + 1:pos + span]:
+                    compared += 1
+                    similarity = self.name_similarity(records[first[name_a]], records[first[name_b]],
+                                                      self.name_only_min, by_tokens=True)
+                    if similarity >= self.name_only_min:
+                        similar.append((name_a, name_b, 0.9 * similarity))
+            for part in self._split(members, lambda i: records[i][5][:2] if len(records[i][5]) >= 10 else ""):
+                same_name = {}
+                for group in self._split(part, lambda i: records[i][4]):
+                    same_name[records[group[0]][4]] = group
+                    for i in group[1:]:
+                        link(group[0], i, 0.9)  # homônimos: nota de nomes iguais sem outra evidência
+                for name_a, name_b, s in similar:
+                    group_a, group_b = same_name.get(name_a), same_name.get(name_b)
+                    if group_a and group_b:
+                        for i in group_a:
+                            link(i, group_b[0], s)
+                        for j in group_b[1:]:
+                            link(group_a[0], j, s)
+
+        split = 0
+        for key, members in blocks.items():
+            if len(members) < 2:
+                continue
+            if len(members) <= self.max_block_size:
+                compare_all(members)
+                continue
+            split += 1
+            if key.startswith("n:"):
+                compare_names(members)
+                continue
+            if key.startswith("p:"):
+                for part in self._split(members, lambda i: records[i][5]):
+                    if len(part) > 1:
+                        compare_part(part)
+            compare_window(by_name(members))
+
+        groups = defaultdict(list)
+        for i in best:
+            groups[find(i)].append(i)
+        clusters = []
+        for indexes in groups.values():
+            indexes.sort(key=lambda i: records[i][0])
+            members = [records[i][:4] + (round(best[i], 3),) for i in indexes]
+            clusters.append({"score": max(m[4] for m in members), "members": members})
+        clusters.sort(key=lambda c: (-c["score"], -len(c["members"]), c["members"][0][0]))
+
+        self.last_stats = {
+            "contacts": len(records),
+            "blocks": len(blocks),
+            "split_blocks": split,
+            "pairs_compared": compared,
+            "difflib_calls": self._difflib_calls,
+            "clusters": len(clusters),
+            "elapsed_s": round(time.perf_counter() - t0, 3),
+        }
+        return clusters
@@ -0,0 +1,324 @@
+# diagnostics.py
+import datetime
+import functools
+import inspect
+import json
+import os
+import platform
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from collections import deque
+from config import DIAGNOSTICS_ENABLED, DIAG_EVENT_BUFFER, DIAG_SLOW_QUERY_MS, DIAG_SLOW_LOG_SIZE
+
+_SPACES = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+SQL_TEXT_LIMIT = 2000
+
+def params_shape(params, many=False):
+    """
+    Formato dos parâmetros sem os valores (que podem ter nomes e telefones):
+    "(str, int, None)", "{nome: str}" ou, no executemany, "N × (...)".
+    """
+    if many:
+        if not isinstance(params, (list, tuple)):
+            return "iterável"
+        return f"{len(params)} × {params_shape(params[0]) if params else '()'}"
+    if not params:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__ if v is not None else 'None'}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ if v is not None else "None" for v in params) + ")"
+
+def format_plan(rows):
+    """Linhas de EXPLAIN QUERY PLAN (id, parent, notused, detail) como texto indentado."""
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return "\n".join(lines)
+
+class Diagnostics:
+    """
+    Registro em memória do que a aplicação fez, para investigar lentidão:
+
+    - "sql": cada comando executado nas conexões do pool (texto, formato dos
+      parâmetros, linhas lidas/alteradas e tempo de execução + leitura);
+    - "db": cada chamada a um método público do gerenciador de banco;
+    - "ui": callbacks da interface (atualizar tabela, relatórios, buscas).
+
+    Os eventos ficam em um buffer circular (os mais antigos saem). Comandos
+    acima de slow_ms entram também no log de consultas lentas, com o EXPLAIN
+    QUERY PLAN capturado em uma conexão separada (a do comando pode estar no
+    meio da leitura). Os valores dos parâmetros nunca são guardados, só os
+    tipos, para que o JSON possa ser enviado ao suporte. Desligado (padrão,
+    DIAGNOSTICS_ENABLED), nada é registrado.
+    """
+    def __init__(self, capacity=DIAG_EVENT_BUFFER, slow_ms=DIAG_SLOW_QUERY_MS, slow_capacity=DIAG_SLOW_LOG_SIZE,
+                 enabled=DIAGNOSTICS_ENABLED):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.events = deque(maxlen=capacity)
+        self.slow_queries = deque(maxlen=slow_capacity)
+        self.started_at = datetime.datetime.now()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, kind, name, elapsed_ms, **info):
+        if not self.enabled:
+            return None
+        event = {"at": datetime.datetime.now().isoformat(timespec="milliseconds"), "kind": kind, "name": name,
+                 "ms": round(elapsed_ms, 3), "thread": threading.current_thread().name, **info}
+        self.events.append(event)  # deque.append é atômico
+        return event
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self.slow_queries.clear()
+
+    # --- Método do banco em andamento nesta thread (marcado nos comandos SQL) ---
+    def current_call(self):
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    def _push(self, name):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+
+    def _pop(self):
+        self._local.stack.pop()
+
+    # --- Comandos SQL (chamado pelo InstrumentedCursor) ---
+    def sql_started(self, sql, shape, elapsed_ms, rows):
+        return self.record("sql", self.current_call() or "", elapsed_ms,
+                           sql=_SPACES.sub(" ", sql).strip()[:SQL_TEXT_LIMIT], params=shape, rows=rows)
+
+    def check_slow(self, event, connection, sql, params):
+        """Na primeira vez que o comando passa de slow_ms, guarda o plano e o põe no log de lentas."""
+        if event is None or event["ms"] < self.slow_ms or "plan" in event:
+            return
+        event["plan"] = None
+        if sql.lstrip()[:7].upper().startswith(_EXPLAINABLE):
+            event["plan"] = explain(getattr(connection, "db_path", None), sql, params)
+        self.slow_queries.append(event)
+
+    # --- Exportação ---
+    def summary(self):
+        """Por (tipo, nome): quantidade, mediana, p95, máximo e total em ms."""
+        groups = {}
+        for event in list(self.events):
+            groups.setdefault((event["kind"], event["name"]), []).append(event["ms"])
+        result = []
+        for (kind, name), times in groups.items():
+            times.sort()
+            result.append({
+                "kind": kind, "name": name, "count": len(times),
+                "p50_ms": round(statistics.median(times), 3),
+                "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+                "max_ms": round(times[-1], 3), "total_ms": round(sum(times), 3),
+            })
+        result.sort(key=lambda g: g["total_ms"], reverse=True)
+        return result
+
+    def snapshot(self, extra=None):
+        return {
+            "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "environment": {
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "settings": {"slow_query_ms": self.slow_ms, "event_buffer": self.events.maxlen},
+            **(extra or {}),
+            "summary": self.summary(),
+            # Cópias: leituras em andamento ainda somam tempo e linhas nos eventos
+            "slow_queries": [dict(e) for e in list(self.slow_queries)],
+            "events": [dict(e) for e in list(self.events)],
+        }
+
+    def export_json(self, path, extra=None):
+        """Grava snapshot(extra) em path (UTF-8, indentado) para enviar ao suporte."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(extra), f, ensure_ascii=False, indent=2, default=str)
+
+def explain(db_path, sql, params):
+    """
+    EXPLAIN QUERY PLAN de sql em uma conexão própria, só de leitura: a conexão
+    que rodou o comando pode ainda estar lendo as linhas dele.
+    """
+    if not db_path or db_path == ":memory:":
+        return "(plano indisponível: banco em memória)"
+    try:
+        con = sqlite3.connect(db_path)  # conexão comum: o EXPLAIN não vira um novo evento
+        try:
+            con.execute("PRAGMA query_only = ON")
+            return format_plan(con.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+        finally:
+            con.close()
+    except sqlite3.Error as e:
+        return f"(plano indisponível: {e})"
+
+# Registro único do processo (janela, servidor e ferramentas de linha de comando)
+diagnostics = Diagnostics()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor que registra cada comando em diagnostics; o tempo e as linhas das leituras somam no mesmo evento."""
+    _event = None
+    _sql, _params = "", ()
+
+    def _run(self, method, sql, params, many):
+        t0 = time.perf_counter()
+        try:
+            return method(sql, params)
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000
+            rows = self.rowcount if self.rowcount >= 0 else None
+            self._event = diagnostics.sql_started(sql, params_shape(params, many), elapsed, rows)
+            self._sql = sql
+            self._params = (params[0] if params else ()) if many else params
+            diagnostics.check_slow(self._event, self.connection, self._sql, self._params)
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters, False)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        return self._run(super().executemany, sql, seq_of_parameters, True)
+
+    def _fetched(self, t0, rows):
+        event = self._event
+        if event is not None:
+            event["ms"] = round(event["ms"] + (time.perf_counter() - t0) * 1000, 3)
+            event["rows"] = (event["rows"] or 0) + rows
+            diagnostics.check_slow(event, self.connection, self._sql, self._params)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(t0, len(rows))
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows))
+        return rows
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Conexão (factory de sqlite3.connect) cujos cursores são InstrumentedCursor.
+    Connection.execute não passa pelo execute do cursor, por isso é refeito aqui.
+    Guarda o caminho do banco para o EXPLAIN das consultas lentas.
+    """
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.db_path = database
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def _result_size(result):
+    # Listas de linhas, dicionários e DataFrames; uma tupla é uma linha só, não uma contagem
+    if isinstance(result, (list, dict, set)) or (hasattr(result, "__len__") and hasattr(result, "columns")):
+        return len(result)
+    return None
+
+def _timed_method(owner, func):
+    name = f"{owner}.{func.__name__}"
+
+    if inspect.isgeneratorfunction(func):
+        # Conta o tempo dentro do gerador (não o de quem consome os lotes) e as linhas de todos os lotes
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            gen = func(*args, **kwargs)
+            elapsed, rows, error = 0.0, 0, None
+            try:
+                while True:
+                    diagnostics._push(name)
+                    t0 = time.perf_counter()
+                    try:
+                        batch = next(gen)
+                    except StopIteration:
+                        break
+                    finally:
+                        elapsed += time.perf_counter() - t0
+                        diagnostics._pop()
+                    rows += len(batch)
+                    yield batch
+            except BaseException as e:
+                if not isinstance(e, GeneratorExit):
+                    error = repr(e)
+                raise
+            finally:
+                gen.close()
+                diagnostics.record("db", name, elapsed * 1000, rows=rows, error=error)
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        diagnostics._push(name)
+        t0 = time.perf_counter()
+        result, error = None, None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            diagnostics._pop()
+            diagnostics.record("db", name, (time.perf_counter() - t0) * 1000, rows=_result_size(result), error=error)
+    return wrapper
+
+def instrument_methods(cls):
+    """
+    Decorador de classe: cronometra todos os métodos públicos definidos em cls
+    (eventos "db"). Os comandos SQL feitos durante a chamada levam o nome do método.
+    """
+    if not DIAGNOSTICS_ENABLED:
+        return cls
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.isfunction(value):
+            setattr(cls, attr, _timed_method(cls.__name__, value))
+    return cls
+
+def timed(name):
+    """Decorador dos callbacks da interface (eventos "ui")."""
+    def decorate(func):
+        if not DIAGNOSTICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                diagnostics.record("ui", name, (time.perf_counter() - t0) * 1000)
+        return wrapper
+    return decorate
+
+def connection_factory():
+    """factory para sqlite3.connect: InstrumentedConnection com os diagnósticos ativos."""
+    return InstrumentedConnection if DIAGNOSTICS_ENABLED else sqlite3.Connection
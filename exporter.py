@@ -0,0 +1,128 @@
+# exporter.py
+import csv
+import gzip
+import os
+import time
+from config import COLUMNS
+
+class ExportFileError(Exception):
+    """Formato de exportação indisponível."""
+
+def export_format(path):
+    """"csv", "csv.gz" ou "parquet", conforme a extensão do arquivo."""
+    lower = path.lower()
+    if lower.endswith(".parquet"):
+        return "parquet"
+    if lower.endswith(".gz"):
+        return "csv.gz"
+    return "csv"
+
+class _CsvWriter:
+    def __init__(self, path, compressed):
+        if compressed:
+            self.file = gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+        else:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file, delimiter=";")
+        self.writer.writerow([label for _, label in COLUMNS])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class _ParquetWriter:
+    ROW_GROUP = 50000
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ExportFileError("Para exportar em Parquet instale o pacote pyarrow (pip install pyarrow).")
+        self.pa = pa
+        self.schema = pa.schema([(key, pa.int64() if key == "id" else pa.string()) for key, _ in COLUMNS])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        self.pending = []
+
+    def write(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) >= self.ROW_GROUP:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            columns = list(zip(*self.pending))
+            self.writer.write_table(self.pa.Table.from_arrays(
+                [self.pa.array(col, type=field.type) for col, field in zip(columns, self.schema)], schema=self.schema))
+            self.pending = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+class ContactExporter:
+    """
+    Exporta o resultado filtrado da tabela em fluxo: o cursor é percorrido com
+    fetchmany e cada lote é gravado logo em seguida, na ordem da tela.
+
+    O arquivo é escrito em "<destino>.part" e só substitui o destino ao final;
+    uma exportação cancelada ou com erro não deixa arquivo pela metade.
+    """
+    FETCH_SIZE = 2000
+
+    def __init__(self, db_manager, path, filters=None, order=None):
+        self.db_manager = db_manager
+        self.path = path
+        self.filters = filters
+        self.order = order
+        self.format = export_format(path)
+
+    def _open(self, path):
+        if self.format == "parquet":
+            return _ParquetWriter(path)
+        return _CsvWriter(path, compressed=self.format == "csv.gz")
+
+    def run(self, progress=None, cancel=None):
+        """
+        Exporta (roda na thread de trabalho). progress(linhas gravadas, total)
+        é chamado a cada lote; cancel é um threading.Event opcional.
+        """
+        t0 = time.perf_counter()
+        partial = self.path + ".part"
+        written = 0
+        cancelled = False
+        writer = self._open(partial)
+        try:
+            with self.db_manager.pool.reader() as con:
+                con.execute("BEGIN")  # contagem e linhas do mesmo instante do banco
+                total = self.db_manager.count_contacts(con, self.filters)
+                for rows in self.db_manager.stream_contacts(con, self.filters, self.order, self.FETCH_SIZE):
+                    writer.write(rows)
+                    written += len(rows)
+                    if progress:
+                        progress(written, total)
+                    if cancel is not None and cancel.is_set():
+                        cancelled = True
+                        break
+            writer.close()
+            writer = None
+            if cancelled:
+                os.remove(partial)
+            else:
+                os.replace(partial, self.path)
+        finally:
+            if writer is not None:
+                writer.close()
+                if os.path.exists(partial):
+                    os.remove(partial)
+        elapsed = time.perf_counter() - t0
+        return {
+            "rows": written,
+            "cancelled": cancelled,
+            "path": None if cancelled else self.path,
+            "format": self.format,
+            "elapsed_s": round(elapsed, 2),
+            "rows_per_s": round(written / elapsed) if elapsed else 0,
+        }
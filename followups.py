@@ -0,0 +1,167 @@
+# followups.py
+import datetime
+import heapq
+from config import DATE_FMT, FOLLOWUP_DEFAULT_TIME
+
+FOLLOWUP_FMT = "%Y-%m-%d %H:%M"
+
+def followup_from_form(date_text, time_text=""):
+    """
+    Converte a data (dd/mm/aaaa) e a hora (HH:MM, opcional) do formulário no
+    formato gravado ("AAAA-MM-DD HH:MM"). Devolve None sem data e levanta
+    ValueError se algum dos campos for inválido.
+    """
+    date_text = (date_text or "").strip()
+    if not date_text:
+        return None
+    time_text = (time_text or "").strip() or FOLLOWUP_DEFAULT_TIME
+    when = datetime.datetime.strptime(f"{date_text} {time_text}", f"{DATE_FMT} %H:%M")
+    return when.strftime(FOLLOWUP_FMT)
+
+def followup_to_form(when):
+    """("dd/mm/aaaa", "HH:MM") de um retorno gravado; textos vazios sem retorno."""
+    try:
+        moment = datetime.datetime.strptime(when or "", FOLLOWUP_FMT)
+    except ValueError:
+        return "", ""
+    return moment.strftime(DATE_FMT), moment.strftime("%H:%M")
+
+def is_followup(when):
+    """True para um retorno gravado no formato FOLLOWUP_FMT (bancos antigos podem ter texto livre)."""
+    try:
+        datetime.datetime.strptime(when, FOLLOWUP_FMT)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def _now_key():
+    return datetime.datetime.now().strftime(FOLLOWUP_FMT)
+
+def _tomorrow_key():
+    return (datetime.date.today() + datetime.timedelta(days=1)).isoformat()
+
+class FollowupListSource:
+    """Linhas já ordenadas da fila para o VirtualTreeview (tudo em memória)."""
+    def __init__(self, rows):
+        self._rows = rows
+
+    def count(self):
+        return len(self._rows)
+
+    def rows(self, start, stop):
+        return self._rows[max(0, start):stop]
+
+class FollowupQueue:
+    """
+    Retornos pendentes em memória, lidos do banco uma vez e atualizados por
+    contato (refresh) depois de cada alteração.
+
+    Os lembretes ainda por vencer ficam em um min-heap por data/hora, e só um
+    after() fica agendado: para o próximo vencimento (ou para a meia-noite,
+    quando "hoje" muda). Ao disparar, os itens vencidos saem do heap e
+    on_due(vencidos agora) é chamado; a tabela nunca é varrida de novo.
+    Entradas antigas do heap (retorno remarcado ou concluído) são descartadas
+    ao chegar ao topo; refresh só empilha quando a data muda. Retornos fora do
+    formato "AAAA-MM-DD HH:MM" (texto livre de versões antigas) ficam de fora.
+    """
+    MAX_TIMER_MS = 60 * 60 * 1000  # reconfere ao menos a cada hora (relógio ajustado, suspensão)
+
+    def __init__(self, root, db_manager, on_due=None):
+        self.root = root
+        self.db_manager = db_manager
+        self.on_due = on_due
+        self._items = {}  # id -> (id, nome, telefone, atendente, followup_date, status)
+        self._heap = []   # (followup_date, id) dos retornos que ainda não venceram
+        self._after_id = None
+
+    def load(self):
+        self._items = {row[0]: row for row in self.db_manager.get_followups() if is_followup(row[4])}
+        self._rebuild_heap()
+        self._schedule()
+
+    def _rebuild_heap(self):
+        now = _now_key()
+        self._heap = [(row[4], cid) for cid, row in self._items.items() if row[4] > now]
+        heapq.heapify(self._heap)
+
+    def refresh(self, contact_ids):
+        """Relê do banco os retornos desses contatos (após salvar, atualizar, apagar ou concluir)."""
+        contact_ids = list(contact_ids)
+        previous = {cid: self._items.pop(cid, None) for cid in contact_ids}
+        now = _now_key()
+        for row in self.db_manager.get_followups(contact_ids=contact_ids):
+            if not is_followup(row[4]):
+                continue
+            self._items[row[0]] = row
+            old = previous.get(row[0])
+            # A entrada antiga continua valendo se a data não mudou
+            if row[4] > now and (old is None or old[4] != row[4]):
+                heapq.heappush(self._heap, (row[4], row[0]))
+        if len(self._heap) > 2 * len(self._items) + 64:
+            self._rebuild_heap()  # muitas remarcações: tira as entradas antigas de uma vez
+        self._schedule()
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _schedule(self):
+        self.stop()
+        # Descarta do topo entradas que não valem mais
+        while self._heap and (self._items.get(self._heap[0][1]) or (None,) * 5)[4] != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        now = datetime.datetime.now()
+        midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+        target = midnight
+        if self._heap:
+            target = min(target, datetime.datetime.strptime(self._heap[0][0], FOLLOWUP_FMT))
+        delay = int((target - now).total_seconds() * 1000)
+        self._after_id = self.root.after(max(0, min(delay, self.MAX_TIMER_MS)), self._fire)
+
+    def _fire(self):
+        self._after_id = None
+        now = _now_key()
+        fired = []
+        fired_ids = set()
+        while self._heap and self._heap[0][0] <= now:
+            when, cid = heapq.heappop(self._heap)
+            row = self._items.get(cid)
+            # Um contato apagado e recriado com a mesma data pode ter duas entradas iguais
+            if row is not None and row[4] == when and cid not in fired_ids:
+                fired.append(row)
+                fired_ids.add(cid)
+        self._schedule()
+        if self.on_due:
+            self.on_due(fired)
+
+    # --- Consultas para o painel ---
+    def due_count(self, attended_by=None):
+        """Retornos atrasados ou de hoje."""
+        tomorrow = _tomorrow_key()
+        return sum(1 for row in self._items.values()
+                   if row[4] < tomorrow and (not attended_by or row[3] == attended_by))
+
+    def attendants(self):
+        return sorted({row[3] for row in self._items.values() if row[3]})
+
+    def rows(self, attended_by=None, only_due=True):
+        """
+        Linhas do painel em ordem de data: (id, situação, retorno, nome,
+        telefone, status, atendente). only_due limita a atrasados e de hoje.
+        """
+        today = datetime.date.today().isoformat()
+        tomorrow = _tomorrow_key()
+        selected = [row for row in self._items.values()
+                    if (not attended_by or row[3] == attended_by) and (not only_due or row[4] < tomorrow)]
+        selected.sort(key=lambda row: (row[4], row[0]))
+        rows = []
+        for cid, name, phone, att, when, status in selected:
+            situation = "Atrasado" if when < today else "Hoje" if when < tomorrow else "Agendado"
+            # "AAAA-MM-DD HH:MM" -> "dd/mm/aaaa HH:MM" por fatias: milhares de linhas sem strptime
+            shown = f"{when[8:10]}/{when[5:7]}/{when[:4]} {when[11:16]}"
+            rows.append((cid, situation, shown, name, phone or "", status or "", att or ""))
+        return rows
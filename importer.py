@@ -0,0 +1,347 @@
+# importer.py
+import csv
+import datetime
+import functools
+import io
+import itertools
+import os
+import queue
+import threading
+import time
+from config import COLUMNS, DATE_FMT
+from dedupe import fold_text
+from utils import (ddmmyyyy_to_iso, money_to_cents, only_digits_batch, format_br_phone_batch,
+                   format_ddmmyyyy_batch, normalize_money_batch, money_to_cents_batch)
+
+# Campos gravados pela importação, na ordem de add_contact
+IMPORT_FIELDS = [c for c, _ in COLUMNS if c != "id"]
+
+# Outros nomes de cabeçalho aceitos (além da chave e do rótulo de config.COLUMNS)
+HEADER_ALIASES = {
+    "nome completo": "name", "celular": "phone", "whatsapp": "phone", "fone": "phone",
+    "e-mail": "email", "curso": "course", "interesse": "course",
+    "data": "visit_date", "data visita": "visit_date", "mensalidade": "monthly_fee", "valor": "monthly_fee",
+    "origem": "how_found", "atendente": "attended_by", "observacao": "notes", "obs": "notes",
+}
+
+class ImportFileError(Exception):
+    """Arquivo que não pode ser importado (formato ou cabeçalho)."""
+
+def map_headers(headers):
+    """Campo de IMPORT_FIELDS correspondente a cada coluna da planilha (None = ignorada)."""
+    known = {}
+    for key, label in COLUMNS:
+        if key != "id":
+            known[fold_text(key)] = key
+            known[fold_text(label)] = key
+    known.update({fold_text(alias): key for alias, key in HEADER_ALIASES.items()})
+    mapping = [known.get(fold_text(str(h or ""))) for h in headers]
+    if "name" not in mapping:
+        raise ImportFileError("A planilha precisa de uma coluna de nome (ex.: \"Nome\").")
+    return mapping
+
+@functools.lru_cache(maxsize=8192)  # datas se repetem muito em uma planilha
+def _parse_date(text):
+    """Aceita dd/mm/aaaa, 8 dígitos ou AAAA-MM-DD. Devolve (dd/mm/aaaa, AAAA-MM-DD) ou None."""
+    iso = ddmmyyyy_to_iso(text)
+    if iso is None:
+        try:
+            iso = datetime.date.fromisoformat(text[:10]).isoformat()
+        except ValueError:
+            return None
+    return datetime.date.fromisoformat(iso).strftime(DATE_FMT), iso
+
+def _clean(value):
+    if value.__class__ is str:
+        return value.strip()
+    return "" if value is None else str(value).strip()
+
+def _clean_column(values):
+    try:
+        return list(map(str.strip, values))  # CSV: só textos, sem laço em Python
+    except TypeError:  # células do XLSX (None, números, datas)
+        return [v.strip() if v.__class__ is str else _clean(v) for v in values]
+
+def _text_column(values, cell_types):
+    """Como _clean_column, mas células já tipadas do XLSX (cell_types) viram texto vazio."""
+    try:
+        return list(map(str.strip, values))
+    except TypeError:
+        return _clean_column(["" if isinstance(v, cell_types) else v for v in values])
+
+class RecordNormalizer:
+    """
+    Converte linhas da planilha em registros de insert_contacts, conforme o
+    mapeamento de colunas de map_headers (resolvido uma única vez). Telefones,
+    datas e mensalidades são normalizados por coluna, um lote inteiro de cada
+    vez, com as versões em lote das funções de utils.
+    """
+    def __init__(self, mapping):
+        self.width = len(mapping)
+        # Posição de cada campo de IMPORT_FIELDS na linha (None = coluna ausente na planilha)
+        self.positions = [mapping.index(f) if f in mapping else None for f in IMPORT_FIELDS]
+
+    def _columns(self, rows):
+        width = self.width
+        if set(map(len, rows)) != {width}:
+            rows = [values if len(values) == width else list(values[:width]) + [""] * (width - len(values))
+                    for values in rows]
+        columns = list(zip(*rows))  # transpõe o lote em C
+        return [columns[p] if p is not None else ("",) * len(rows) for p in self.positions]
+
+    def __call__(self, rows):
+        """Normaliza um lote de linhas. Devolve, por linha, (registro, None) ou (None, motivo da rejeição)."""
+        if not rows:
+            return []
+        (names, phones, emails, courses, visits, statuses, fees,
+         how_found, course_for, attended_by, notes) = self._columns(rows)
+
+        phone_texts = _clean_column(phones)
+        digits = [d[2:] if len(d) > 11 and d.startswith("55") else d  # DDI do Brasil
+                  for d in only_digits_batch(phone_texts)]
+        formatted_phones = format_br_phone_batch(digits)
+
+        # Células de data do XLSX já vêm prontas; textos passam pela validação em lote
+        visit_texts = _text_column(visits, (datetime.date, datetime.datetime))
+        visit_dates = format_ddmmyyyy_batch(visit_texts)
+        visit_isos = [d and f"{d[6:]}-{d[3:5]}-{d[0:2]}" for d in visit_dates]
+
+        # Células numéricas do XLSX são formatadas aqui; textos passam por normalize_money em lote
+        fee_texts = _text_column(fees, (int, float))
+        normalized_fees = normalize_money_batch(fee_texts)
+        fee_cents = money_to_cents_batch(normalized_fees)
+
+        names, emails, courses, statuses, how_found, course_for, attended_by, notes = map(
+            _clean_column, (names, emails, courses, statuses, how_found, course_for, attended_by, notes))
+
+        results = []
+        for i, name in enumerate(names):
+            if not name:
+                results.append((None, "Nome vazio"))
+                continue
+
+            phone, phone_digits = phone_texts[i], digits[i]
+            if phone_digits:
+                phone = formatted_phones[i]
+                if phone is None or len(phone_digits) > 11:
+                    results.append((None, "Telefone inválido"))
+                    continue
+
+            visit_date = visit_iso = None
+            visit = visits[i]
+            if isinstance(visit, (datetime.date, datetime.datetime)):
+                visit_date, visit_iso = visit.strftime(DATE_FMT), visit.strftime("%Y-%m-%d")
+            elif visit_dates[i] is not None:
+                visit_date, visit_iso = visit_dates[i], visit_isos[i]
+            elif visit_texts[i]:
+                parsed = _parse_date(visit_texts[i])  # outros formatos (AAAA-MM-DD, 1/2/2024...)
+                if parsed is None:
+                    results.append((None, "Data da visita inválida"))
+                    continue
+                visit_date, visit_iso = parsed
+
+            fee, cents = fees[i], fee_cents[i]
+            if isinstance(fee, (int, float)):
+                fee = f"{fee:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                cents = money_to_cents(fee)
+            elif fee_texts[i]:
+                fee = normalized_fees[i]
+                if not fee:
+                    results.append((None, "Valor da mensalidade inválido"))
+                    continue
+            else:
+                fee = ""
+
+            results.append(((
+                name, phone, emails[i], courses[i], visit_date, statuses[i] or "Novo",
+                fee, how_found[i], course_for[i], attended_by[i], notes[i],
+                visit_iso, phone_digits, cents,
+            ), None))
+        return results
+
+def _open_csv(path):
+    """Abre o CSV detectando codificação (UTF-8 com/sem BOM ou Latin-1) e separador."""
+    raw = open(path, "rb")
+    sample = raw.read(64 * 1024)
+    raw.seek(0)
+    try:
+        sample.decode("utf-8")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+    try:
+        dialect = csv.Sniffer().sniff(sample.decode(encoding, errors="ignore"), delimiters=";,\t|")
+    except csv.Error:
+        dialect = csv.excel
+    return raw, io.TextIOWrapper(raw, encoding=encoding, newline=""), dialect
+
+class ContactImporter:
+    """
+    Importa contatos de uma planilha CSV ou XLSX em lotes.
+
+    O arquivo é lido em fluxo (csv.reader / openpyxl em modo read_only), cada
+    lote é normalizado por coluna (RecordNormalizer) e os registros válidos
+    entram com executemany, um lote por transação. O ponto de retomada
+    (import_checkpoints) é gravado na mesma transação de cada lote: se o
+    programa cair, a próxima importação do mesmo arquivo continua da última
+    linha confirmada. Linhas rejeitadas vão, com o motivo, para
+    "<arquivo>.rejeitados.csv".
+    """
+    CHUNK_SIZE = 20000
+
+    def __init__(self, db_manager, path, chunk_size=CHUNK_SIZE):
+        self.db_manager = db_manager
+        self.path = path
+        self.chunk_size = chunk_size
+        stat = os.stat(path)
+        # O mesmo arquivo (caminho, tamanho e data) retoma; um arquivo alterado recomeça
+        self.source = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        self.rejects_path = os.path.splitext(path)[0] + ".rejeitados.csv"
+
+    def _rows(self):
+        """Devolve (cabeçalho, iterador de linhas, função de progresso 0..1, função para fechar)."""
+        if self.path.lower().endswith((".xlsx", ".xlsm")):
+            try:
+                import openpyxl
+            except ImportError:
+                raise ImportFileError("Para importar XLSX instale o pacote openpyxl (pip install openpyxl).")
+            book = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+            sheet = book.active
+            rows = sheet.iter_rows(values_only=True)
+            total = sheet.max_row or 0
+            counter = {"n": 0}
+
+            def counted():
+                for row in rows:
+                    counter["n"] += 1
+                    yield row
+                book.close()
+            header = next(rows, None)
+            return header, counted(), lambda: counter["n"] / total if total else 0.0, book.close
+
+        raw, text, dialect = _open_csv(self.path)
+        reader = csv.reader(text, dialect)
+        size = os.path.getsize(self.path) or 1
+        return next(reader, None), reader, lambda: min(1.0, raw.tell() / size), text.close
+
+    def run(self, progress=None, cancel=None):
+        """
+        Importa o arquivo (roda na thread de trabalho). progress(linhas lidas,
+        fração) é chamado a cada lote gravado; cancel é um threading.Event
+        opcional. Devolve um resumo da importação.
+
+        A leitura/normalização e a gravação correm em paralelo: enquanto o
+        SQLite grava um lote (sem segurar o GIL), o próximo já está sendo
+        preparado.
+        """
+        t0 = time.perf_counter()
+        header, rows, fraction, close = self._rows()
+        writes = queue.Queue(maxsize=2)
+        state = {"imported": 0, "done": 0, "error": None}
+
+        def write_batches():
+            while True:
+                item = writes.get()
+                if item is None:
+                    return
+                if state["error"] is not None:
+                    continue
+                batch, rows_done, rejected_so_far, progress_fraction = item
+                try:
+                    state["imported"] += self._commit(batch, rows_done, state["imported"], rejected_so_far)
+                    state["done"] = rows_done
+                except BaseException as e:
+                    state["error"] = e
+                    continue
+                if progress:
+                    progress(rows_done, progress_fraction)
+
+        writer = None
+        cancelled = False
+        try:
+            if header is None:
+                raise ImportFileError("O arquivo está vazio.")
+            normalize = RecordNormalizer(map_headers(header))
+
+            checkpoint = self.db_manager.get_import_checkpoint(self.source)
+            done, state["imported"], rejected = checkpoint or (0, 0, 0)
+            state["done"] = resumed_from = done
+            for _ in range(done):
+                if next(rows, None) is None:
+                    break
+
+            writer = threading.Thread(target=write_batches, daemon=True)
+            writer.start()
+            mode = "a" if resumed_from and os.path.exists(self.rejects_path) else "w"
+            if mode == "a":
+                self._trim_rejects(resumed_from)
+            with open(self.rejects_path, mode, newline="", encoding="utf-8-sig") as rejects_file:
+                rejects = csv.writer(rejects_file, delimiter=";")
+                if mode == "w":
+                    rejects.writerow(["linha", "motivo"] + [str(h or "") for h in header])
+
+                read = done
+                chunk = list(itertools.islice(rows, self.chunk_size))
+                while chunk:
+                    batch = []
+                    for values, (record, reason) in zip(chunk, normalize(chunk)):
+                        read += 1
+                        if record is None:
+                            if any(v not in (None, "") for v in values):  # linhas em branco são ignoradas
+                                rejected += 1
+                                rejects.writerow([read + 1, reason] + ["" if v is None else v for v in values])
+                        else:
+                            batch.append(record)
+                    chunk = list(itertools.islice(rows, self.chunk_size))
+                    writes.put((batch, read, rejected, fraction() if chunk else 1.0))
+                    done = read
+                    if chunk and (state["error"] is not None or (cancel is not None and cancel.is_set())):
+                        cancelled = state["error"] is None
+                        break
+        finally:
+            if writer is not None:
+                writes.put(None)
+                writer.join()
+            close()
+        if state["error"] is not None:
+            raise state["error"]
+
+        if not cancelled:
+            self.db_manager.clear_import_checkpoint(self.source)
+            if rejected == 0:
+                os.remove(self.rejects_path)
+        elapsed = time.perf_counter() - t0
+        return {
+            "read": state["done"],
+            "imported": state["imported"],
+            "rejected": rejected,
+            "resumed_from": resumed_from,
+            "cancelled": cancelled,
+            "rejects_path": self.rejects_path if rejected else None,
+            "elapsed_s": round(elapsed, 2),
+            "rows_per_s": round((state["done"] - resumed_from) / elapsed) if elapsed else 0,
+        }
+
+    def _trim_rejects(self, rows_done):
+        """
+        Deixa no arquivo de rejeitados só as linhas até rows_done. As rejeições
+        são gravadas na leitura, antes de o lote ser confirmado; as dos lotes
+        perdidos na interrupção serão lidas (e gravadas) de novo.
+        """
+        with open(self.rejects_path, newline="", encoding="utf-8-sig") as f:
+            lines = list(csv.reader(f, delimiter=";"))
+        kept = lines[:1] + [line for line in lines[1:] if line and line[0].isdigit() and int(line[0]) <= rows_done + 1]
+        if len(kept) == len(lines):
+            return
+        temp = self.rejects_path + ".tmp"
+        with open(temp, "w", newline="", encoding="utf-8-sig") as f:
+            csv.writer(f, delimiter=";").writerows(kept)
+        os.replace(temp, self.rejects_path)
+
+    def _commit(self, batch, rows_done, imported, rejected):
+        """Grava um lote e o ponto de retomada na mesma transação."""
+        with self.db_manager.pool.writer() as con:
+            if batch:
+                self.db_manager.insert_contacts(con, batch)
+            self.db_manager.save_import_checkpoint(con, self.source, rows_done, imported + len(batch), rejected)
+        return len(batch)
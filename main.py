@@ -1,20 +1,55 @@
 # main.py
-from ui_manager import App
-from database import init_db
-import matplotlib
+import time
+_START = time.perf_counter()
+
+import argparse
 
 # Importações necessárias para definir o AppUserModelID
 import sys
 import ctypes
 from ctypes import wintypes
 
-# Define o backend do Matplotlib antes de qualquer outra coisa
-matplotlib.use('TkAgg')
+from startup_profile import StartupProfiler
+
+# A interface, o pandas e o matplotlib são importados só quando necessários
+# (o backend TkAgg é definido ao abrir a aba de Relatórios).
 
 def main():
     """
     Função principal que configura e executa a aplicação.
     """
+    parser = argparse.ArgumentParser(description="Fisk Follow-up")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="recalcula o resumo diário usado pelos relatórios e encerra")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="mede os tempos de importação e de cada fase da abertura, mostra e encerra")
+    parser.add_argument("--server", action="store_true",
+                        help="atende o banco local pela API HTTP, sem abrir a janela (para várias recepções)")
+    parser.add_argument("--host", default=None, help="endereço do --server (padrão: SERVER_HOST)")
+    parser.add_argument("--port", type=int, default=None, help="porta do --server (padrão: SERVER_PORT)")
+    parser.add_argument("--token", default=None,
+                        help="senha da API do --server/--remote (padrão: SERVER_TOKEN; obrigatória fora de 127.0.0.1)")
+    parser.add_argument("--remote", metavar="URL",
+                        help="abre a janela usando o banco de um servidor (ex.: http://192.168.0.10:8765)")
+    parser.add_argument("--batch-reports", metavar="PASTA",
+                        help="gera, sem abrir a janela, os relatórios de cada atendente × período na pasta e encerra")
+    parser.add_argument("--periods", help="períodos do --batch-reports, separados por vírgula (padrão: todos do painel; all = todo o histórico)")
+    parser.add_argument("--attendants", help="atendentes do --batch-reports, separados por vírgula (padrão: Todos + cada um)")
+    parser.add_argument("--formats", default="png,pdf", help="formatos do --batch-reports (padrão: png,pdf)")
+    parser.add_argument("--workers", type=int, default=None, help="processos do --batch-reports (padrão: núcleos da CPU)")
+    parser.add_argument("--generate-data", metavar="TAMANHO",
+                        help="cria um banco de contatos sintéticos (10k, 100k, 1m ou um número) em --db e encerra")
+    parser.add_argument("--seed", type=int, default=42, help="semente do --generate-data (mesma semente, mesmos dados)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="mede consultas, relatórios, duplicados e exportação no banco --db, mostra o JSON e encerra")
+    parser.add_argument("--db", metavar="ARQUIVO",
+                        help="banco do --benchmark (padrão: DB_FILE) ou destino do --generate-data (padrão: synthetic_<tamanho>.db)")
+    parser.add_argument("--repeat", type=int, default=5, help="execuções de cada medida do --benchmark")
+    parser.add_argument("--json", metavar="SAIDA", help="grava o resultado do --benchmark neste arquivo")
+    parser.add_argument("--compare", metavar="ANTERIOR", help="compara o --benchmark com um JSON de uma execução anterior")
+    args = parser.parse_args()
+    profiler = StartupProfiler(_START) if args.profile_startup else None
+
     # No Windows, define um AppUserModelID explícito para garantir que o 
     # ícone correto seja exibido na barra de tarefas.
     if sys.platform == 'win32':
@@ -28,11 +63,65 @@ def main():
             # Acontece em versões muito antigas do Windows. Pode ser ignorado.
             pass
 
-    # Garante que a tabela do banco de dados exista com todas as colunas
-    init_db()
+    if args.rebuild_rollups:
+        from config import DB_FILE
+        from database import init_db, DatabaseManager
+        init_db()
+        db_manager = DatabaseManager(DB_FILE)
+        db_manager.rebuild_rollups()
+        db_manager.close()
+        print("Resumo diário dos relatórios recalculado.")
+        return
+
+    if args.batch_reports:
+        from batch_reports import run_batch_reports
+        split = lambda text: [v.strip() for v in text.split(",") if v.strip()] if text else None
+        run_batch_reports(args.batch_reports, split(args.periods), split(args.attendants),
+                          split(args.formats), args.workers)
+        return
+
+    if args.generate_data:
+        from synthetic_data import PRESETS, generate_database
+        size = args.generate_data.lower()
+        if size not in PRESETS and not size.isdigit():
+            parser.error(f"--generate-data: use {', '.join(PRESETS)} ou um número de contatos")
+        count = PRESETS.get(size) or int(size)
+        path = args.db or f"synthetic_{size}.db"
+        try:
+            summary = generate_database(path, count, args.seed,
+                                        progress=lambda done, total: print(f"\r{done}/{total} contatos", end="", flush=True))
+        except FileExistsError as e:
+            print(e)
+            return
+        print(f"\n{summary['rows']} contatos em {summary['path']} ({summary['elapsed_s']} s, {summary['rows_per_s']} linhas/s)")
+        return
+
+    if args.benchmark:
+        from config import DB_FILE
+        from benchmark import run_benchmarks
+        run_benchmarks(args.db or DB_FILE, args.repeat, args.json, args.compare)
+        return
+
+    if args.server:
+        from config import SERVER_HOST, SERVER_PORT, SERVER_TOKEN
+        from server import run_server
+        run_server(args.host or SERVER_HOST, args.port or SERVER_PORT, token=args.token or SERVER_TOKEN)
+        return
     
-    # Cria e executa a aplicação
-    app = App()
+    if profiler is not None:
+        profiler.mark("importações iniciais")
+    from ui_manager import App
+    if profiler is not None:
+        profiler.mark("importação da interface (ui_manager)")
+
+    db_manager = None
+    if args.remote:
+        from config import SERVER_TOKEN
+        from remote_client import RemoteDatabaseManager
+        db_manager = RemoteDatabaseManager(args.remote, token=args.token or SERVER_TOKEN)
+
+    # Cria e executa a aplicação (o init_db roda logo após a primeira pintura da janela)
+    app = App(profiler=profiler, db_manager=db_manager)
     app.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+# migrations.py
+from config import MIGRATION_BATCH_SIZE, FOLLOWUP_DEFAULT_TIME
+from utils import _only_digits, money_to_cents_batch
+from database import (_create_phone_index, _create_text_index, _create_change_tracking,
+                      _create_rollups, _create_import_checkpoints)
+
+def schema_version(con):
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+class Migrator:
+    """
+    Aplica as migrações pendentes (MIGRATIONS) em ordem, conforme o PRAGMA
+    user_version do banco. Cada migração roda em uma transação que termina
+    gravando o novo user_version; se falhar, nada dela fica no banco.
+
+    Preenchimentos grandes usam backfill: o UPDATE/INSERT é repetido por faixas
+    de id, cada faixa em sua própria transação, para não segurar o lock de
+    escrita durante toda a migração. Por isso as migrações precisam poder ser
+    repetidas: se o programa cair no meio, a migração recomeça do início e as
+    faixas já preenchidas não mudam.
+    """
+    def __init__(self, con, progress=None, batch_size=MIGRATION_BATCH_SIZE):
+        self.con = con  # isolation_level=None: as transações são abertas aqui
+        self.cur = con.cursor()
+        self.progress = progress
+        self.batch_size = batch_size
+        self._description = ""
+
+    def pending(self):
+        current = schema_version(self.con)
+        return [m for m in MIGRATIONS if m[0] > current]
+
+    def run(self):
+        for version, description, apply in self.pending():
+            self._description = description
+            self.report(0.0)
+            self.con.execute("BEGIN IMMEDIATE")
+            try:
+                apply(self)
+                self.con.execute(f"PRAGMA user_version = {int(version)}")
+                self.con.execute("COMMIT")
+            except BaseException:
+                if self.con.in_transaction:
+                    self.con.execute("ROLLBACK")
+                raise
+            self.report(1.0)
+
+    def report(self, fraction):
+        if self.progress:
+            self.progress(self._description, fraction)
+
+    def backfill(self, sql, table="contacts"):
+        """
+        Executa sql (com dois parâmetros: primeiro e último id da faixa) em lotes
+        de batch_size ids, confirmando cada lote. O que a migração fez antes
+        fica gravado; ela continua em uma nova transação depois do preenchimento.
+        """
+        self._in_batches(table, lambda start, stop: self.con.execute(sql, (start, stop)))
+
+    def backfill_rows(self, select_sql, update_sql, compute, table="contacts"):
+        """
+        Como backfill, para valores calculados em Python: em cada faixa,
+        select_sql (primeiro e último id) lê as linhas, compute(linhas) devolve
+        os parâmetros de update_sql, gravados com executemany.
+        """
+        def step(start, stop):
+            rows = self.con.execute(select_sql, (start, stop)).fetchall()
+            if rows:
+                self.con.executemany(update_sql, compute(rows))
+        self._in_batches(table, step)
+
+    def _in_batches(self, table, step):
+        first, last = self.cur.execute(f"SELECT min(rowid), max(rowid) FROM {table}").fetchone()
+        if first is None:
+            return
+        self.con.execute("COMMIT")
+        start = first
+        while start <= last:
+            stop = start + self.batch_size - 1
+            self.con.execute("BEGIN IMMEDIATE")
+            step(start, stop)
+            self.con.execute("COMMIT")
+            self.report(min(1.0, (stop - first + 1) / (last - first + 1)))
+            start = stop + 1
+        self.con.execute("BEGIN IMMEDIATE")
+
+# --- Migrações (nunca altere uma já publicada; acrescente uma nova ao final) ---
+
+def _contacts_table(m):
+    m.cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL, phone TEXT, email TEXT, course TEXT,
+            visit_date TEXT, status TEXT, followup_date TEXT, notes TEXT
+        )
+        """
+    )
+    # Bancos das primeiras versões não têm as colunas acrescentadas depois
+    cols = {row[1] for row in m.cur.execute("PRAGMA table_info(contacts)")}
+    for col in ["followup_date", "monthly_fee", "how_found", "course_for", "attended_by", "visit_date_iso",
+                "phone_digits"]:
+        if col not in cols:
+            m.cur.execute(f"ALTER TABLE contacts ADD COLUMN {col} TEXT")
+    if "row_version" not in cols:
+        m.cur.execute("ALTER TABLE contacts ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+
+def _visit_date_iso(m):
+    # Data da visita normalizada (AAAA-MM-DD) para filtros e ordenação indexados
+    m.backfill(
+        """
+        UPDATE contacts
+           SET visit_date_iso = substr(visit_date,7,4)||'-'||substr(visit_date,4,2)||'-'||substr(visit_date,1,2)
+         WHERE id BETWEEN ? AND ?
+           AND visit_date_iso IS NULL
+           AND visit_date GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]'
+        """
+    )
+    m.cur.execute("CREATE INDEX IF NOT EXISTS idx_contacts_visit_date_iso ON contacts(visit_date_iso)")
+    m.cur.execute("CREATE INDEX IF NOT EXISTS idx_contacts_name ON contacts(name COLLATE NOCASE)")
+
+def _phone_digits(m):
+    # Telefone só com dígitos, calculado pela mesma função usada na interface
+    m.con.create_function("only_digits", 1, _only_digits, deterministic=True)
+    m.backfill("UPDATE contacts SET phone_digits = only_digits(phone) WHERE id BETWEEN ? AND ? AND phone_digits IS NULL")
+
+def _phone_search(m):
+    # 'rebuild' relê contacts inteira na transação da migração: um índice criado por
+    # uma execução interrompida (mesmo que preenchido pela metade) é refeito por completo
+    if _create_phone_index(m.cur):
+        m.cur.execute("INSERT INTO contacts_phone_fts(contacts_phone_fts) VALUES ('rebuild')")
+
+def _text_search(m):
+    if _create_text_index(m.cur):
+        m.cur.execute("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')")
+
+def _change_tracking(m):
+    _create_change_tracking(m.cur)
+
+def _rollups(m):
+    _create_rollups(m.cur)
+
+def _import_checkpoints(m):
+    _create_import_checkpoints(m.cur)
+
+def _fee_cents(m):
+    # Mensalidade em centavos (INTEGER) para somas, médias e ordenação no SQLite
+    cols = {row[1] for row in m.cur.execute("PRAGMA table_info(contacts)")}
+    if "monthly_fee_cents" not in cols:
+        m.cur.execute("ALTER TABLE contacts ADD COLUMN monthly_fee_cents INTEGER")
+    m.backfill_rows(
+        "SELECT id, monthly_fee FROM contacts WHERE id BETWEEN ? AND ? AND monthly_fee_cents IS NULL AND monthly_fee <> ''",
+        "UPDATE contacts SET monthly_fee_cents = ? WHERE id = ?",
+        lambda rows: [(cents, cid) for (cid, _), cents in zip(rows, money_to_cents_batch([r[1] for r in rows]))
+                      if cents is not None],
+    )
+    # Cobre os indicadores de receita: status fixo, faixa de datas e agrupamentos sem ler a tabela
+    m.cur.execute(
+        """CREATE INDEX IF NOT EXISTS idx_contacts_revenue
+           ON contacts(status, visit_date_iso, attended_by, course, monthly_fee_cents)"""
+    )
+
+def _followup_dates(m):
+    # Bancos que passaram pela migração 1 antes de ela incluir followup_date
+    cols = {row[1] for row in m.cur.execute("PRAGMA table_info(contacts)")}
+    if "followup_date" not in cols:
+        m.cur.execute("ALTER TABLE contacts ADD COLUMN followup_date TEXT")
+    # Retornos em "AAAA-MM-DD HH:MM" (ordenáveis como texto); datas antigas em dd/mm/aaaa são convertidas
+    m.backfill(
+        f"""
+        UPDATE contacts
+           SET followup_date = substr(followup_date,7,4)||'-'||substr(followup_date,4,2)||'-'||substr(followup_date,1,2)
+                               ||' {FOLLOWUP_DEFAULT_TIME}'
+         WHERE id BETWEEN ? AND ?
+           AND followup_date GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]'
+        """
+    )
+    m.backfill(
+        f"""
+        UPDATE contacts SET followup_date = followup_date||' {FOLLOWUP_DEFAULT_TIME}'
+         WHERE id BETWEEN ? AND ?
+           AND followup_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+        """
+    )
+    m.backfill("UPDATE contacts SET followup_date = NULL WHERE id BETWEEN ? AND ? AND followup_date = ''")
+    # Fila por atendente e, para a fila completa, um índice só com os contatos que têm retorno
+    m.cur.execute("CREATE INDEX IF NOT EXISTS idx_contacts_followup ON contacts(attended_by, followup_date, status)")
+    m.cur.execute(
+        """CREATE INDEX IF NOT EXISTS idx_contacts_followup_date
+           ON contacts(followup_date) WHERE followup_date IS NOT NULL"""
+    )
+
+# (versão, descrição exibida no progresso, função)
+MIGRATIONS = [
+    (1, "Criando a tabela de contatos", _contacts_table),
+    (2, "Normalizando as datas de visita", _visit_date_iso),
+    (3, "Normalizando os telefones", _phone_digits),
+    (4, "Indexando os telefones para busca", _phone_search),
+    (5, "Indexando nomes, emails e observações", _text_search),
+    (6, "Preparando o controle de alterações", _change_tracking),
+    (7, "Calculando o resumo dos relatórios", _rollups),
+    (8, "Preparando a retomada de importações", _import_checkpoints),
+    (9, "Convertendo as mensalidades para centavos", _fee_cents),
+    (10, "Preparando a fila de retornos", _followup_dates),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def migrate(con, progress=None):
+    """
+    Deixa o banco na última versão do esquema. Em um banco atualizado é só uma
+    leitura do PRAGMA user_version. con deve ter isolation_level=None.
+    """
+    if schema_version(con) >= LATEST_VERSION:
+        return
+    Migrator(con, progress).run()
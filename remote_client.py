@@ -0,0 +1,326 @@
+# remote_client.py
+import http.client
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import quote, urlencode, urlsplit
+from config import REMOTE_TIMEOUT, REMOTE_CACHE_ENTRIES, SERVER_TOKEN
+from database import rollup_dataframe
+from diagnostics import instrument_methods
+
+class RemoteError(sqlite3.OperationalError):
+    """
+    Falha ao falar com o servidor, ou erro devolvido por ele. É um
+    OperationalError para que o resto da aplicação o trate como erro do banco.
+    status é o código HTTP do servidor (None quando não houve resposta).
+    """
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+class RemoteSession:
+    """
+    Faz o papel da conexão emprestada pelo pool: os métodos do
+    RemoteDatabaseManager a recebem como con. interrupt() abandona a resposta
+    em andamento, como Connection.interrupt() na busca enquanto digita.
+    """
+    in_transaction = False
+
+    def __init__(self):
+        self.interrupted = threading.Event()
+
+    def interrupt(self):
+        self.interrupted.set()
+
+    def execute(self, *_):
+        # BEGIN do exportador: cada resposta do servidor já é lida de uma só vez
+        return None
+
+    def rollback(self):
+        pass
+
+class RemotePool:
+    """O que a interface usa do ConnectionPool (reader/close) com o banco no servidor."""
+    def __init__(self, base_url):
+        self.db_file = base_url
+
+    @contextmanager
+    def reader(self):
+        yield RemoteSession()
+
+    def close(self):
+        pass
+
+@instrument_methods
+class RemoteDatabaseManager:
+    """
+    Mesma interface do DatabaseManager usada pela janela (tabela, formulário,
+    filtros, retornos, relatórios e duplicados), atendida pela API de
+    server.py (main.py --remote URL).
+
+    Cada thread mantém sua conexão HTTP aberta (keep-alive). As respostas de
+    leitura ficam em um cache LRU com o ETag do servidor e são revalidadas com
+    If-None-Match: enquanto o banco não muda, o servidor responde 304 e nada é
+    transferido de novo. Importação e backup não passam pela API. token é
+    enviado em todas as requisições (o mesmo --token do servidor).
+    """
+    is_remote = True
+
+    def __init__(self, base_url, timeout=REMOTE_TIMEOUT, cache_entries=REMOTE_CACHE_ENTRIES, token=SERVER_TOKEN):
+        parts = urlsplit(base_url if "//" in base_url else "http://" + base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.base_url = f"http://{parts.netloc}"
+        self.timeout = timeout
+        self.token = token
+        self.pool = RemotePool(self.base_url)
+        self.requests = 0
+        self.not_modified = 0
+        self._local = threading.local()
+        self._connections = []
+        self._cache = OrderedDict()  # url -> (etag, resposta já decodificada)
+        self._cache_entries = cache_entries
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            for con in self._connections:
+                con.close()
+            self._connections.clear()
+
+    # --- HTTP ---
+    def _connection(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.con = con
+            self._local.used = False
+            with self._lock:
+                self._connections.append(con)
+        return con
+
+    def _drop_connection(self):
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            con.close()
+            with self._lock:
+                if con in self._connections:
+                    self._connections.remove(con)
+            self._local.con = None
+
+    def _open(self, method, url, headers, payload):
+        for attempt in range(2):
+            reused = getattr(self._local, "used", False)
+            con = self._connection()
+            try:
+                con.request(method, url, body=payload, headers=headers)
+                response = con.getresponse()
+                self._local.used = True
+                self.requests += 1
+                return response
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                # Conexão keep-alive fechada pelo servidor enquanto estava ociosa: tenta uma vez em uma nova
+                self._drop_connection()
+                if attempt or not reused:
+                    raise RemoteError(f"Sem resposta do servidor {self.base_url}: {e}") from e
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection()
+                raise RemoteError(f"Sem resposta do servidor {self.base_url}: {e}") from e
+
+    def _request(self, method, path, params=None, body=None, session=None, stream=False):
+        """
+        Faz a requisição e devolve o JSON da resposta (ou, com stream=True, um
+        gerador dos lotes de linhas em NDJSON). GETs sem fluxo usam o cache de ETags.
+        """
+        url = path + ("?" + urlencode(params) if params else "")
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            headers["Content-Type"] = "application/json; charset=utf-8"
+        cached = None
+        if method == "GET" and not stream:
+            with self._lock:
+                cached = self._cache.get(url)
+            if cached is not None:
+                headers["If-None-Match"] = cached[0]
+
+        response = self._open(method, url, headers, payload)
+        if response.status == 304 and cached is not None:
+            response.read()
+            self.not_modified += 1
+            with self._lock:
+                if url in self._cache:
+                    self._cache.move_to_end(url)
+            return cached[1]
+        if response.status >= 400:
+            data = self._read(response, session)
+            try:
+                message = json.loads(data)["error"]
+            except (ValueError, KeyError, TypeError):
+                message = data.decode("utf-8", "replace")
+            raise RemoteError(f"Erro do servidor ({response.status}): {message}", response.status)
+
+        if stream:
+            return self._batches(response, session)
+        if response.headers.get_content_type() == "application/x-ndjson":
+            result = [row for rows in self._batches(response, session) for row in rows]
+        else:
+            result = json.loads(self._read(response, session))
+        etag = response.headers.get("ETag")
+        if method == "GET" and etag:
+            with self._lock:
+                self._cache[url] = (etag, result)
+                self._cache.move_to_end(url)
+                while len(self._cache) > self._cache_entries:
+                    self._cache.popitem(last=False)
+        return result
+
+    def _check_interrupted(self, session):
+        if session is not None and session.interrupted.is_set():
+            self._drop_connection()  # a resposta ficou pela metade: a conexão não pode ser reaproveitada
+            raise RemoteError("interrupted")
+
+    def _read(self, response, session):
+        chunks = []
+        try:
+            while True:
+                self._check_interrupted(session)
+                chunk = response.read(64 * 1024)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except (OSError, http.client.HTTPException) as e:
+            self._drop_connection()
+            raise RemoteError(f"Resposta incompleta do servidor: {e}") from e
+        return b"".join(chunks)
+
+    def _batches(self, response, session):
+        """Lotes de linhas (tuplas) de uma resposta NDJSON, à medida que chegam."""
+        finished = False
+        try:
+            while True:
+                self._check_interrupted(session)
+                line = response.readline()
+                if not line:
+                    finished = True
+                    break
+                yield [tuple(row) for row in json.loads(line)]
+        except (OSError, http.client.HTTPException) as e:
+            raise RemoteError(f"Resposta incompleta do servidor: {e}") from e
+        finally:
+            if not finished:
+                self._drop_connection()  # fluxo abandonado no meio (exportação cancelada, erro)
+
+    def _get(self, path, params=None, session=None):
+        return self._request("GET", path, params, session=session)
+
+    # --- Filtros e tabela ---
+    def build_filters(self, criteria):
+        """Os critérios vão como estão para o servidor, que monta o SQL (DatabaseManager.build_filters)."""
+        return {k: v for k, v in (criteria or {}).items() if v and v != "Todos"}
+
+    def query_table_columns(self, con, filters=None, fields=None):
+        params = dict(filters or {}, fields=",".join(fields))
+        return self._get("/api/contacts", params, session=con)
+
+    def get_notes(self, con, ids):
+        if not ids:
+            return {}
+        notes = self._get("/api/notes", {"ids": ",".join(map(str, ids))}, session=con)["notes"]
+        return {int(k): v for k, v in notes.items()}
+
+    def contact_matches(self, con, contact_id, filters=None):
+        return self._get(f"/api/contacts/{int(contact_id)}/matches", filters, session=con)["matches"]
+
+    def get_contact(self, con, contact_id):
+        row = self._get(f"/api/contacts/{int(contact_id)}", session=con)["row"]
+        return tuple(row) if row is not None else None
+
+    def count_contacts(self, con, filters=None):
+        return self._get("/api/contacts/count", filters, session=con)["count"]
+
+    @staticmethod
+    def _order_params(filters, order):
+        col, descending = order or ("id", True)
+        return dict(filters or {}, order=col, desc="1" if descending else "0")
+
+    def query_contacts(self, con, filters=None, order=None, limit=None, offset=0):
+        """Uma página do resultado ordenado (a tabela só pede páginas com limit)."""
+        params = dict(self._order_params(filters, order), limit=limit, offset=offset)
+        return [tuple(row) for row in self._get("/api/contacts/page", params, session=con)["rows"]]
+
+    def contact_position(self, con, contact_id, filters=None, order=None):
+        params = self._order_params(filters, order)
+        return self._get(f"/api/contacts/{int(contact_id)}/position", params, session=con)["position"]
+
+    def stream_contacts(self, con, filters=None, order=None, fetch_size=2000):
+        params = self._order_params(filters, order)
+        return self._request("GET", "/api/contacts/export", params, session=con, stream=True)
+
+    def get_distinct_values(self, column):
+        return list(self._get(f"/api/distinct/{quote(column)}")["values"])
+
+    def get_dedupe_rows(self):
+        return self._get("/api/dedupe")
+
+    def data_version(self):
+        return self._get("/api/version")["version"]
+
+    # --- Gravações ---
+    def add_contact(self, data):
+        return tuple(self._request("POST", "/api/contacts", body={"data": list(data[:11])})["row"])
+
+    def update_contact(self, data):
+        """Como DatabaseManager.update_contact: None se o contato não existe mais."""
+        try:
+            row = self._request("PUT", f"/api/contacts/{int(data[11])}", body={"data": list(data[:11])})["row"]
+        except RemoteError as e:
+            if e.status == 404:
+                return None
+            raise
+        return tuple(row)
+
+    def delete_contact(self, contact_id):
+        self._request("DELETE", f"/api/contacts/{int(contact_id)}")
+        return contact_id
+
+    def delete_contacts_by_ids(self, ids):
+        return self._request("POST", "/api/contacts/delete", body={"ids": [int(i) for i in ids]})["deleted"]
+
+    # --- Retornos ---
+    def get_followups(self, attended_by=None, until=None, contact_ids=None):
+        if contact_ids is not None and not contact_ids:
+            return []
+        params = {}
+        if attended_by:
+            params["attended_by"] = attended_by
+        if until:
+            params["until"] = until
+        if contact_ids is not None:
+            params["ids"] = ",".join(str(int(i)) for i in contact_ids)
+        return [tuple(row) for row in self._get("/api/followups", params)["rows"]]
+
+    def get_followup(self, contact_id):
+        return self._get(f"/api/contacts/{int(contact_id)}/followup")["when"]
+
+    def set_followup(self, contact_id, when):
+        self._request("PUT", f"/api/contacts/{int(contact_id)}/followup", body={"when": when})
+
+    # --- Relatórios ---
+    @staticmethod
+    def _report_params(start_iso, end_iso, attended_by, course):
+        params = {"start": start_iso, "end": end_iso, "attended_by": attended_by, "course": course}
+        return {k: v for k, v in params.items() if v}
+
+    def get_rollup_dataframe(self, start_iso=None, end_iso=None, attended_by=None, course=None):
+        rows = self._get("/api/reports/rollup", self._report_params(start_iso, end_iso, attended_by, course))["rows"]
+        return rollup_dataframe([tuple(r) for r in rows])
+
+    def get_revenue_kpis(self, start_iso=None, end_iso=None, attended_by=None, course=None):
+        kpis = self._get("/api/reports/revenue", self._report_params(start_iso, end_iso, attended_by, course))
+        return {**kpis, "by_attendant": [tuple(g) for g in kpis["by_attendant"]],
+                "by_course": [tuple(g) for g in kpis["by_course"]]}
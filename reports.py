@@ -1,11 +1,28 @@
 # reports.py
 import datetime
+from collections import OrderedDict
 import pandas as pd
 from dateutil.relativedelta import relativedelta
-from config import FISK_BLUE, SUCCESS_GREEN, FISK_RED
+from config import FISK_BLUE, SUCCESS_GREEN, FISK_RED, REPORT_CACHE_ENTRIES
+
+# Períodos prontos do painel (rótulo, valor aceito por resolve_period)
+PERIOD_OPTIONS = [
+    ("Últimos 7 dias", "7_days"), ("Últimos 15 dias", "15_days"),
+    ("Últimos 30 dias", "30_days"), ("Últimos 60 dias", "60_days"),
+    ("Últimos 90 dias", "90_days"), ("Este Mês", "this_month"),
+]
 
 class ReportGenerator:
-    def get_filtered_data(self, df, period, start_date_str, end_date_str, att_filter, course_filter):
+    def __init__(self, cache_entries=REPORT_CACHE_ENTRIES):
+        # Entradas dos gráficos já calculadas (LRU), ver get_chart_inputs
+        self._cache = OrderedDict()
+        self._cache_entries = cache_entries
+        self._cache_version = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def resolve_period(self, period, start_date_str, end_date_str):
+        """Converte a opção de período em (data inicial, data final); a inicial pode ser None."""
         today = datetime.date.today()
         start_date = None
         end_date = pd.to_datetime(today)
@@ -25,6 +42,10 @@ class ReportGenerator:
             
             if start_date:
                 start_date = pd.to_datetime(start_date)
+        return start_date, end_date
+
+    def get_filtered_data(self, df, period, start_date_str, end_date_str, att_filter, course_filter):
+        start_date, end_date = self.resolve_period(period, start_date_str, end_date_str)
 
         df_filtered = df.copy()
         if start_date is not None:
@@ -39,58 +60,151 @@ class ReportGenerator:
             
         return df_filtered
 
-    def update_visits_enrollments_chart(self, ax, fig, df):
+    # Os gráficos aceitam tanto os contatos (uma linha por visita) quanto o resumo
+    # diário (contacts_daily_rollup), em que a coluna 'visits' traz a contagem.
+    def _total(self, df):
+        return int(df['visits'].sum()) if 'visits' in df else len(df)
+
+    def _counts(self, df, column):
+        values = df[column].fillna('')
+        if 'visits' in df:
+            counts = df['visits'].groupby(values).sum()
+        else:
+            counts = values.value_counts()
+        counts = counts[(counts.index != '') & (counts > 0)]
+        return counts.sort_values(ascending=False)
+
+    def compute_chart_inputs(self, df):
+        """Totais e contagens usados pelos quatro gráficos do painel."""
+        return {
+            'empty': df.empty,
+            'total_visits': self._total(df),
+            'total_enrollments': self._total(df[df['status'] == 'Fechou matrícula']),
+            'status_counts': self._counts(df, 'status'),
+            'source_counts': self._counts(df, 'how_found').sort_values(ascending=True),
+            'course_counts': self._counts(df, 'course').nlargest(5).sort_values(ascending=False),
+        }
+
+    def get_chart_inputs(self, load_rollup, data_version, period, start_date_str, end_date_str, att_filter, course_filter):
+        """
+        compute_chart_inputs do período/atendente/curso, guardado em um cache
+        LRU pela chave (período, datas já resolvidas, atendente, curso,
+        data_version do banco). Voltar a um filtro já visto não consulta o banco
+        nem usa o pandas; quando o banco muda, o data_version muda e o cache é
+        esvaziado. load_rollup(início, fim, atendente, curso), com datas
+        AAAA-MM-DD, só é chamado quando a chave não está no cache.
+        """
+        start_date, end_date = self.resolve_period(period, start_date_str, end_date_str)
+        start_iso = start_date.strftime("%Y-%m-%d") if start_date is not None else None
+        end_iso = end_date.strftime("%Y-%m-%d") if end_date is not None else None
+        if data_version != self._cache_version:
+            self._cache.clear()
+            self._cache_version = data_version
+        key = (period, start_iso, end_iso, att_filter, course_filter, data_version)
+        inputs = self._cache.get(key)
+        if inputs is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return inputs
+        self.cache_misses += 1
+        df = load_rollup(start_iso, end_iso, att_filter, course_filter)
+        df = self.get_filtered_data(df, period, start_date_str, end_date_str, att_filter, course_filter)
+        inputs = self.compute_chart_inputs(df)
+        self._cache[key] = inputs
+        while len(self._cache) > self._cache_entries:
+            self._cache.popitem(last=False)
+        return inputs
+
+    def cache_stats(self):
+        return {"entries": len(self._cache), "hits": self.cache_hits, "misses": self.cache_misses}
+
+    # As funções draw_* redesenham o gráfico do zero a partir das entradas já
+    # calculadas e devolvem os artistas criados, para que o ChartRenderer possa
+    # atualizá-los no lugar nas próximas vezes.
+    def _draw_empty(self, ax):
+        ax.text(0.5, 0.5, "Sem dados no período", ha='center', va='center')
+
+    def draw_visits_enrollments(self, ax, inputs):
         ax.clear()
-        if df.empty:
-            ax.text(0.5, 0.5, "Sem dados no período", ha='center', va='center')
+        handles = {}
+        if inputs['empty']:
+            self._draw_empty(ax)
         else:
-            total_visitas = len(df)
-            total_matriculas = len(df[df['status'] == 'Fechou matrícula'])
+            total_visitas = inputs['total_visits']
+            total_matriculas = inputs['total_enrollments']
             data = {'Visitas': total_visitas, 'Matrículas': total_matriculas}
             colors = [FISK_BLUE, SUCCESS_GREEN]
-            ax.bar(data.keys(), data.values(), color=colors)
-            for i, v in enumerate(data.values()):
+            handles['bars'] = ax.bar(data.keys(), data.values(), color=colors)
+            handles['labels'] = [
                 ax.text(i, v + (total_visitas * 0.02), str(v), ha='center', fontweight='bold')
+                for i, v in enumerate(data.values())
+            ]
         ax.set_title('Visitas vs. Matrículas')
         ax.set_ylabel('Quantidade')
         ax.set_ylim(bottom=0)
-        fig.canvas.draw()
+        return handles
 
-    def update_status_distribution_chart(self, ax, fig, df):
+    def draw_status_distribution(self, ax, inputs):
         ax.clear()
-        if df.empty:
-            ax.text(0.5, 0.5, "Sem dados no período", ha='center', va='center')
+        handles = {}
+        status_counts = inputs['status_counts']
+        if inputs['empty'] or status_counts.empty:
+            self._draw_empty(ax)
         else:
-            status_counts = df['status'].value_counts()
-            ax.pie(status_counts, labels=status_counts.index, autopct='%1.1f%%', startangle=90, wedgeprops=dict(width=0.4))
+            wedges, labels, pcts = ax.pie(status_counts, labels=status_counts.index, autopct='%1.1f%%', startangle=90, wedgeprops=dict(width=0.4))
             ax.axis('equal')
+            handles = {'wedges': wedges, 'labels': labels, 'pcts': pcts}
         ax.set_title('Distribuição por Status')
-        fig.canvas.draw()
+        return handles
 
-    def update_lead_source_chart(self, ax, fig, df):
+    def draw_lead_source(self, ax, inputs):
         ax.clear()
-        if df.empty:
-            ax.text(0.5, 0.5, "Sem dados no período", ha='center', va='center')
+        handles = {}
+        source_counts = inputs['source_counts']
+        if inputs['empty'] or source_counts.empty:
+            self._draw_empty(ax)
         else:
-            source_counts = df['how_found'].value_counts().sort_values(ascending=True)
             source_counts.plot(kind='barh', ax=ax, color=FISK_RED)
-            for index, value in enumerate(source_counts):
+            handles['bars'] = ax.containers[0]
+            handles['labels'] = [
                 ax.text(value, index, f' {value}', va='center', fontweight='bold')
+                for index, value in enumerate(source_counts)
+            ]
         ax.set_title('Origem dos Leads')
         ax.set_xlabel('Quantidade')
         ax.set_ylabel('')
-        fig.canvas.draw()
+        return handles
 
-    def update_top_courses_chart(self, ax, fig, df):
+    def draw_top_courses(self, ax, inputs):
         ax.clear()
-        if df.empty:
-            ax.text(0.5, 0.5, "Sem dados no período", ha='center', va='center')
+        handles = {}
+        course_counts = inputs['course_counts']
+        if inputs['empty'] or course_counts.empty:
+            self._draw_empty(ax)
         else:
-            course_counts = df['course'].value_counts().nlargest(5).sort_values(ascending=False)
             course_counts.plot(kind='bar', ax=ax, color=FISK_BLUE)
             ax.tick_params(axis='x', rotation=15)
-            for i, v in enumerate(course_counts):
+            handles['bars'] = ax.containers[0]
+            handles['labels'] = [
                 ax.text(i, v + (course_counts.max() * 0.02), str(v), ha='center', fontweight='bold')
+                for i, v in enumerate(course_counts)
+            ]
         ax.set_title('Cursos Mais Procurados')
         ax.set_ylabel('Quantidade')
-        fig.canvas.draw()
\ No newline at end of file
+        return handles
+
+    def update_visits_enrollments_chart(self, ax, fig, df):
+        self.draw_visits_enrollments(ax, self.compute_chart_inputs(df))
+        fig.canvas.draw_idle()
+
+    def update_status_distribution_chart(self, ax, fig, df):
+        self.draw_status_distribution(ax, self.compute_chart_inputs(df))
+        fig.canvas.draw_idle()
+
+    def update_lead_source_chart(self, ax, fig, df):
+        self.draw_lead_source(ax, self.compute_chart_inputs(df))
+        fig.canvas.draw_idle()
+
+    def update_top_courses_chart(self, ax, fig, df):
+        self.draw_top_courses(ax, self.compute_chart_inputs(df))
+        fig.canvas.draw_idle()
@@ -0,0 +1,204 @@
+# search_pipeline.py
+import queue
+import sqlite3
+import statistics
+import threading
+import time
+from collections import deque
+from config import SEARCH_DEBOUNCE_MS
+from diagnostics import diagnostics
+
+class SearchPipeline:
+    """
+    Busca enquanto o usuário digita, sem travar a interface:
+
+    1. cada tecla apenas (re)agenda a busca com after(), aguardando uma pausa
+       na digitação (debounce);
+    2. a consulta roda em uma thread, com uma conexão de leitura do pool;
+    3. se uma nova busca começa antes da anterior terminar, a consulta em
+       andamento é cancelada com Connection.interrupt();
+    4. somente o resultado da busca mais recente é desenhado na tela.
+
+    build_request() roda na thread da interface e devolve os parâmetros da
+    consulta (ou None para não buscar); run_query(con, request) roda na thread
+    de trabalho; render(result) volta para a thread da interface. Uma consulta
+    que falha (ou um render que falha) vai para on_error(erro) — por padrão uma
+    caixa de erro — e a busca continua funcionando nas próximas teclas.
+    """
+    POLL_MS = 10
+
+    def __init__(self, root, pool, build_request, run_query, render, delay_ms=SEARCH_DEBOUNCE_MS, history=200,
+                 on_error=None):
+        self.root = root
+        self.pool = pool
+        self.build_request = build_request
+        self.run_query = run_query
+        self.render = render
+        self.on_error = on_error
+        self.delay_ms = delay_ms
+
+        self._after_id = None
+        self._poll_id = None
+        self._generation = 0
+        self._active_con = None
+        self._active_lock = threading.Lock()
+        self._results = queue.Queue()
+        self._first_key_at = None
+        self._closed = False
+
+        # Métricas (em milissegundos)
+        self.latencies = deque(maxlen=history)     # tecla -> resultado desenhado
+        self.query_times = deque(maxlen=history)   # tempo da consulta na thread
+        self.render_times = deque(maxlen=history)  # tempo de desenho na interface
+        self.cancelled = 0
+        self.errors = 0
+
+    def schedule(self, *_):
+        """Chamado a cada tecla: reinicia a espera do debounce."""
+        if self._closed:
+            return
+        if self._first_key_at is None:
+            self._first_key_at = time.perf_counter()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(self.delay_ms, self._start)
+
+    def run_now(self):
+        """Dispara a busca imediatamente (botão Aplicar, filtros de combobox, carga inicial)."""
+        if self._closed:
+            return
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._first_key_at is None:
+            self._first_key_at = time.perf_counter()
+        self._start()
+
+    def _start(self):
+        self._after_id = None
+        request = self.build_request()
+        if request is None:
+            self._first_key_at = None
+            return
+
+        self._generation += 1
+        generation = self._generation
+        self._interrupt_active()
+
+        started_at = self._first_key_at
+        self._first_key_at = None
+        worker = threading.Thread(target=self._work, args=(generation, request, started_at), daemon=True)
+        worker.start()
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.POLL_MS, self._poll)
+
+    def _interrupt_active(self):
+        with self._active_lock:
+            if self._active_con is not None:
+                self._active_con.interrupt()
+                self.cancelled += 1
+
+    def _work(self, generation, request, started_at):
+        t0 = time.perf_counter()
+        try:
+            with self.pool.reader() as con:
+                with self._active_lock:
+                    if generation != self._generation:
+                        return  # já existe uma busca mais nova
+                    self._active_con = con
+                try:
+                    result = self.run_query(con, request)
+                finally:
+                    with self._active_lock:
+                        if self._active_con is con:
+                            self._active_con = None
+        except sqlite3.OperationalError as e:
+            if "interrupt" in str(e):
+                return
+            self._results.put((generation, None, e, started_at, 0.0))
+            return
+        except sqlite3.ProgrammingError as e:
+            if self._closed:
+                return  # pool fechado durante o encerramento
+            self._results.put((generation, None, e, started_at, 0.0))
+            return
+        except Exception as e:
+            self._results.put((generation, None, e, started_at, 0.0))
+            return
+        self._results.put((generation, result, None, started_at, time.perf_counter() - t0))
+
+    def _poll(self):
+        self._poll_id = None
+        if self._closed:
+            return
+        latest = None
+        while True:
+            try:
+                item = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == self._generation:
+                latest = item
+        if latest is not None:
+            _, result, error, started_at, query_s = latest
+            if error is not None:
+                self._report_error(error)
+                return
+            t0 = time.perf_counter()
+            try:
+                self.render(result)
+            except Exception as e:
+                self._report_error(e)
+                return
+            now = time.perf_counter()
+            self.query_times.append(query_s * 1000)
+            self.render_times.append((now - t0) * 1000)
+            self.latencies.append((now - started_at) * 1000)
+            diagnostics.record("ui", "busca (tecla -> tabela)", (now - started_at) * 1000,
+                               query_ms=round(query_s * 1000, 3), render_ms=round((now - t0) * 1000, 3))
+            return
+        self._poll_id = self.root.after(self.POLL_MS, self._poll)
+
+    def _report_error(self, error):
+        # Nada fica pendente: a próxima tecla agenda uma busca nova normalmente
+        self.errors += 1
+        diagnostics.record("ui", "busca (erro)", 0.0, error=repr(error))
+        if self.on_error is not None:
+            self.on_error(error)
+        else:
+            from tkinter import messagebox
+            messagebox.showerror("Erro", f"Falha na busca:\n{error}", parent=self.root)
+
+    def stats(self):
+        """Resumo das métricas de latência (ms) das últimas buscas."""
+        def summary(values):
+            values = list(values)
+            if not values:
+                return {"count": 0}
+            ordered = sorted(values)
+            return {
+                "count": len(values),
+                "p50": round(statistics.median(ordered), 2),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                "max": round(ordered[-1], 2),
+            }
+        return {
+            "keystroke_to_render_ms": summary(self.latencies),
+            "query_ms": summary(self.query_times),
+            "render_ms": summary(self.render_times),
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        """Cancela esperas e consultas em andamento (usado ao fechar a janela)."""
+        self._closed = True
+        for after_id in (self._after_id, self._poll_id):
+            if after_id is not None:
+                try:
+                    self.root.after_cancel(after_id)
+                except Exception:
+                    pass
+        self._after_id = self._poll_id = None
+        self._generation += 1
+        self._interrupt_active()
@@ -0,0 +1,430 @@
+# server.py
+import datetime
+import ipaddress
+import json
+import queue
+import re
+import secrets
+import threading
+import traceback
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from config import (DB_FILE, SERVER_HOST, SERVER_PORT, SERVER_TOKEN, SERVER_MAX_BODY, SERVER_WRITE_BATCH,
+                    SERVER_FETCH_SIZE)
+from database import DatabaseManager, FILTER_FIELDS, init_db
+from followups import FOLLOWUP_FMT
+from table_model import TABLE_FIELDS, DERIVED_FIELDS
+
+# Colunas aceitas nas listas de valores distintos e na lista da tabela
+DISTINCT_COLUMNS = ("attended_by", "status", "course", "how_found", "course_for")
+LIST_FIELDS = set(TABLE_FIELDS + DERIVED_FIELDS)
+FORM_FIELDS = 11
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class WriteBatcher:
+    """
+    Todas as gravações do servidor passam por uma única thread, com a conexão
+    de escrita do pool. O que chega enquanto um lote está sendo gravado forma
+    o próximo lote (até max_batch operações), confirmado em uma só transação;
+    cada operação roda em seu próprio SAVEPOINT, então um erro desfaz só ela.
+    """
+    def __init__(self, db_manager, max_batch=SERVER_WRITE_BATCH):
+        self.db_manager = db_manager
+        self.max_batch = max_batch
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="api-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        """Enfileira fn(*args) e espera o resultado (ou a exceção) depois do commit do lote."""
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future.result()
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._run(batch)
+                    return
+                batch.append(item)
+            self._run(batch)
+
+    def _run(self, batch):
+        results = []
+        try:
+            with self.db_manager.pool.writer() as con:
+                if not con.in_transaction:
+                    con.execute("BEGIN IMMEDIATE")
+                for future, fn, args in batch:
+                    con.execute("SAVEPOINT api_write")
+                    try:
+                        result = fn(*args)
+                    except Exception as e:
+                        con.execute("ROLLBACK TO api_write")
+                        con.execute("RELEASE api_write")
+                        results.append((future, None, e))
+                    else:
+                        con.execute("RELEASE api_write")
+                        results.append((future, result, None))
+        except Exception as e:
+            # O commit do lote falhou: nenhuma operação foi gravada
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.operations += len(batch)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+class ContactsApiHandler(BaseHTTPRequestHandler):
+    """
+    API HTTP/JSON sobre o DatabaseManager. Os filtros da tabela chegam como
+    critérios (FILTER_FIELDS) na query string e o SQL é montado aqui, por
+    DatabaseManager.build_filters.
+
+    Toda leitura responde com um ETag ligado ao PRAGMA data_version: se o
+    cliente manda o mesmo valor em If-None-Match, a resposta é um 304 sem
+    consultar o banco. Listas grandes vão em fluxo (NDJSON com chunked
+    transfer encoding), um lote de linhas por linha de texto.
+
+    Com um token no servidor, toda requisição precisa do cabeçalho
+    "Authorization: Bearer <token>" (401 sem ele). Corpos maiores que
+    max_body recebem 413 sem serem lidos.
+    """
+    protocol_version = "HTTP/1.1"
+    server_version = "FiskFollowUp/1.0"
+    timeout = 600  # conexões ociosas do cliente (keep-alive) são fechadas depois de 10 minutos
+
+    # (método HTTP, caminho, método do handler, responde com ETag)
+    ROUTES = [(method, re.compile(pattern), name, cached) for method, pattern, name, cached in [
+        ("GET", r"/api/health", "health", False),
+        ("GET", r"/api/version", "version", False),
+        ("GET", r"/api/contacts", "list_contacts", True),
+        ("GET", r"/api/contacts/count", "count_contacts", True),
+        ("GET", r"/api/contacts/export", "export_contacts", True),
+        ("GET", r"/api/contacts/page", "contacts_page", True),
+        ("GET", r"/api/contacts/(\d+)", "get_contact", True),
+        ("GET", r"/api/contacts/(\d+)/matches", "contact_matches", True),
+        ("GET", r"/api/contacts/(\d+)/position", "contact_position", True),
+        ("GET", r"/api/contacts/(\d+)/followup", "get_followup", True),
+        ("GET", r"/api/notes", "get_notes", True),
+        ("GET", r"/api/distinct/(\w+)", "distinct_values", True),
+        ("GET", r"/api/followups", "list_followups", True),
+        ("GET", r"/api/reports/rollup", "report_rollup", True),
+        ("GET", r"/api/reports/revenue", "report_revenue", True),
+        ("GET", r"/api/dedupe", "dedupe_rows", True),
+        ("POST", r"/api/contacts", "add_contact", False),
+        ("POST", r"/api/contacts/delete", "delete_contacts", False),
+        ("PUT", r"/api/contacts/(\d+)", "update_contact", False),
+        ("PUT", r"/api/contacts/(\d+)/followup", "set_followup", False),
+        ("DELETE", r"/api/contacts/(\d+)", "delete_contact", False),
+    ]]
+
+    @property
+    def db(self):
+        return self.server.db_manager
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _dispatch(self, method):
+        self.etag = None
+        if not self._authorized():
+            self.close_connection = True  # o corpo (se houver) não é lido
+            self._send_json({"error": "Token de acesso ausente ou inválido."}, HTTPStatus.UNAUTHORIZED)
+            return
+        url = urlsplit(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        for route_method, pattern, name, cached in self.ROUTES:
+            match = pattern.fullmatch(url.path)
+            if match is None or route_method != method:
+                continue
+            try:
+                body = self._read_body()
+                if cached:
+                    self.etag = self.server.etag()
+                    if self.headers.get("If-None-Match") == self.etag:
+                        self.send_response(HTTPStatus.NOT_MODIFIED)
+                        self.send_header("ETag", self.etag)
+                        self.end_headers()
+                        return
+                args = match.groups() + ((body,) if body is not None else ())
+                getattr(self, name)(*args)
+            except ApiError as e:
+                self._send_json({"error": str(e)}, e.status)
+            except (ValueError, TypeError, KeyError) as e:
+                self._send_json({"error": f"Requisição inválida: {e}"}, HTTPStatus.BAD_REQUEST)
+            except Exception as e:
+                traceback.print_exc()
+                self._send_json({"error": str(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+        self._send_json({"error": f"Rota não encontrada: {method} {url.path}"}, HTTPStatus.NOT_FOUND)
+
+    # --- Entrada e saída ---
+    def _authorized(self):
+        token = self.server.token
+        if not token:
+            return True
+        given = self.headers.get("Authorization", "")
+        return secrets.compare_digest(given.encode("utf-8"), f"Bearer {token}".encode("utf-8"))
+
+    def _read_body(self):
+        """Corpo JSON (um objeto) de POST/PUT; None nos demais métodos."""
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > self.server.max_body:
+            self.close_connection = True  # o corpo fica sem ler: a conexão não pode ser reaproveitada
+            if length < 0:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Content-Length inválido.")
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                           f"Corpo da requisição acima de {self.server.max_body} bytes.")
+        data = self.rfile.read(length)
+        if self.command not in ("POST", "PUT"):
+            return None
+        body = json.loads(data or b"{}")
+        if not isinstance(body, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "O corpo da requisição deve ser um objeto JSON.")
+        return body
+
+    def _send_json(self, obj, status=HTTPStatus.OK):
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if self.etag and status == HTTPStatus.OK:
+            self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, batches):
+        """Envia os lotes de linhas como NDJSON em chunks, à medida que são lidos do banco."""
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.end_headers()
+        try:
+            for rows in batches:
+                data = json.dumps(rows, ensure_ascii=False).encode("utf-8") + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.write(b"0\r\n\r\n")
+        except Exception as e:
+            # O status já foi enviado: a resposta fica sem o chunk final e o cliente vê o fluxo incompleto
+            self.close_connection = True
+            if not isinstance(e, ConnectionError):
+                traceback.print_exc()
+
+    def _filters(self):
+        return self.db.build_filters({k: self.query.get(k, "") for k in FILTER_FIELDS})
+
+    def _contact_data(self, body):
+        data = body.get("data")
+        if not isinstance(data, list) or len(data) != FORM_FIELDS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"'data' deve ter os {FORM_FIELDS} campos do formulário.")
+        if any(v is not None and not isinstance(v, str) for v in data):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Os campos do contato devem ser textos.")
+        if not (data[0] or "").strip():
+            raise ApiError(HTTPStatus.BAD_REQUEST, "O campo Nome é obrigatório.")
+        return tuple(data)
+
+    def _ids(self, text):
+        return [int(v) for v in text.split(",") if v]
+
+    # --- Leituras ---
+    def health(self):
+        self._send_json({"ok": True})
+
+    def version(self):
+        self._send_json({"version": self.server.etag()})
+
+    def list_contacts(self):
+        fields = [f for f in self.query.get("fields", ",".join(TABLE_FIELDS)).split(",") if f]
+        unknown = [f for f in fields if f not in LIST_FIELDS]
+        if unknown or not fields:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Colunas inválidas: {', '.join(unknown) or '(nenhuma)'}")
+        filters = self._filters()
+        with self.db.pool.reader() as con:
+            self._send_stream(self.db.stream_table_columns(con, filters, fields, SERVER_FETCH_SIZE))
+
+    def count_contacts(self):
+        filters = self._filters()
+        with self.db.pool.reader() as con:
+            self._send_json({"count": self.db.count_contacts(con, filters)})
+
+    def _order(self):
+        return (self.query.get("order") or "id", self.query.get("desc", "1") == "1")
+
+    def export_contacts(self):
+        filters = self._filters()
+        with self.db.pool.reader() as con:
+            self._send_stream(self.db.stream_contacts(con, filters, self._order(), SERVER_FETCH_SIZE))
+
+    def contacts_page(self):
+        filters = self._filters()
+        limit, offset = int(self.query["limit"]), int(self.query.get("offset", 0))
+        if not 0 < limit <= SERVER_FETCH_SIZE or offset < 0:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"'limit' deve estar entre 1 e {SERVER_FETCH_SIZE}.")
+        with self.db.pool.reader() as con:
+            self._send_json({"rows": self.db.query_contacts(con, filters, self._order(), limit, offset)})
+
+    def get_contact(self, contact_id):
+        with self.db.pool.reader() as con:
+            self._send_json({"row": self.db.get_contact(con, int(contact_id))})
+
+    def contact_matches(self, contact_id):
+        filters = self._filters()
+        with self.db.pool.reader() as con:
+            self._send_json({"matches": self.db.contact_matches(con, int(contact_id), filters)})
+
+    def contact_position(self, contact_id):
+        filters = self._filters()
+        with self.db.pool.reader() as con:
+            self._send_json({"position": self.db.contact_position(con, int(contact_id), filters, self._order())})
+
+    def get_followup(self, contact_id):
+        self._send_json({"when": self.db.get_followup(int(contact_id))})
+
+    def get_notes(self):
+        ids = self._ids(self.query.get("ids", ""))
+        with self.db.pool.reader() as con:
+            self._send_json({"notes": self.db.get_notes(con, ids)})
+
+    def distinct_values(self, column):
+        if column not in DISTINCT_COLUMNS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Coluna inválida: {column}")
+        self._send_json({"values": self.db.get_distinct_values(column)})
+
+    def list_followups(self):
+        ids = self.query.get("ids")
+        rows = self.db.get_followups(self.query.get("attended_by"), self.query.get("until"),
+                                     self._ids(ids) if ids is not None else None)
+        self._send_json({"rows": rows})
+
+    def _report_args(self):
+        return tuple(self.query.get(k) for k in ("start", "end", "attended_by", "course"))
+
+    def report_rollup(self):
+        self._send_json({"rows": self.db.get_rollup_rows(*self._report_args())})
+
+    def report_revenue(self):
+        self._send_json(self.db.get_revenue_kpis(*self._report_args()))
+
+    def dedupe_rows(self):
+        rows = self.db.get_dedupe_rows()
+        self._send_stream(rows[i:i + SERVER_FETCH_SIZE] for i in range(0, len(rows), SERVER_FETCH_SIZE))
+
+    # --- Gravações (em lote, pela thread de escrita) ---
+    def add_contact(self, body):
+        row = self.server.writes.submit(self.db.add_contact, self._contact_data(body))
+        self._send_json({"row": row}, HTTPStatus.CREATED)
+
+    def update_contact(self, contact_id, body):
+        row = self.server.writes.submit(self.db.update_contact, self._contact_data(body) + (int(contact_id),))
+        if row is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Contato {contact_id} não encontrado.")
+        self._send_json({"row": row})
+
+    def delete_contact(self, contact_id):
+        self.server.writes.submit(self.db.delete_contact, int(contact_id))
+        self._send_json({"deleted": 1})
+
+    def delete_contacts(self, body):
+        ids = [int(v) for v in body.get("ids", [])]
+        self._send_json({"deleted": self.server.writes.submit(self.db.delete_contacts_by_ids, ids)})
+
+    def set_followup(self, contact_id, body):
+        when = body.get("when") or None
+        if when is not None:
+            datetime.datetime.strptime(when, FOLLOWUP_FMT)
+        self.server.writes.submit(self.db.set_followup, int(contact_id), when)
+        self._send_json({"when": when})
+
+class ContactsApiServer(ThreadingHTTPServer):
+    """
+    Servidor da API (uma thread por conexão) com um único DatabaseManager:
+    leituras pelo pool de leitores, gravações pelo WriteBatcher. Fora do
+    endereço de loopback (rede da unidade) só sobe com um token.
+    """
+    daemon_threads = True
+    request_queue_size = 128  # conexões aguardando accept (o padrão, 5, recusa rajadas)
+
+    def __init__(self, db_manager, host=SERVER_HOST, port=SERVER_PORT, verbose=False,
+                 token=SERVER_TOKEN, max_body=SERVER_MAX_BODY):
+        super().__init__((host, port), ContactsApiHandler)
+        if not token and not ipaddress.ip_address(self.server_address[0]).is_loopback:
+            super().server_close()
+            raise ValueError(f"O servidor em {host} fica acessível pela rede: defina um token "
+                             "(--token ou SERVER_TOKEN no config.py) ou use 127.0.0.1.")
+        self.db_manager = db_manager
+        self.verbose = verbose
+        self.token = token
+        self.max_body = max_body
+        self.writes = WriteBatcher(db_manager)
+        # Muda a cada execução: um ETag de antes de reiniciar o servidor nunca é aceito
+        self._boot = secrets.token_hex(4)
+
+    def etag(self):
+        return f'"{self._boot}-{self.db_manager.data_version()}"'
+
+    def server_close(self):
+        super().server_close()
+        self.writes.stop()
+
+def run_server(host=SERVER_HOST, port=SERVER_PORT, verbose=False, token=SERVER_TOKEN):
+    """Aplica as migrações pendentes e atende a API até Ctrl+C (main.py --server)."""
+    init_db(progress=lambda text, fraction: print(f"{text}... {fraction:.0%}", flush=True))
+    db_manager = DatabaseManager(DB_FILE)
+    try:
+        server = ContactsApiServer(db_manager, host, port, verbose, token)
+    except (ValueError, OSError) as e:
+        db_manager.close()
+        print(e, flush=True)
+        return
+    print(f"Servidor do banco {DB_FILE} em http://{host}:{server.server_address[1]} (Ctrl+C encerra)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db_manager.close()
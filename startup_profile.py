@@ -0,0 +1,28 @@
+# startup_profile.py
+import sys
+import time
+
+class StartupProfiler:
+    """
+    Mede a abertura do aplicativo (modo --profile-startup): o tempo de cada fase
+    desde a anterior e o acumulado desde o início do processo.
+    """
+    HEAVY_MODULES = ("pandas", "matplotlib", "PIL")
+
+    def __init__(self, t0=None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self._last = self.t0
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000, (now - self.t0) * 1000))
+        self._last = now
+
+    def report(self):
+        lines = ["Tempo de abertura (ms):"]
+        for phase, elapsed, total in self.phases:
+            lines.append(f"  {phase:<42} {elapsed:9.1f}   (acumulado {total:9.1f})")
+        loaded = ", ".join(f"{m}={'sim' if m in sys.modules else 'não'}" for m in self.HEAVY_MODULES)
+        lines.append(f"Módulos pesados já carregados: {loaded}")
+        return "\n".join(lines)
@@ -0,0 +1,148 @@
+# synthetic_data.py
+import datetime
+import os
+import random
+import time
+from config import COURSES, STATUS_LIST, HOW_FOUND_LIST, COURSE_FOR_LIST, DATE_FMT
+from dedupe import fold_text
+from utils import format_br_phone_from_digits, format_cents
+
+# Tamanhos prontos (main.py --generate-data)
+PRESETS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+FIRST_NAMES = [
+    "Ana", "Beatriz", "Camila", "Daniela", "Eduarda", "Fernanda", "Gabriela", "Helena", "Isabela", "Júlia",
+    "Larissa", "Mariana", "Natália", "Patrícia", "Rafaela", "Sofia", "Vanessa", "Yasmin", "Letícia", "Luana",
+    "André", "Bruno", "Carlos", "Diego", "Eduardo", "Felipe", "Gustavo", "Henrique", "João", "Lucas",
+    "Marcos", "Otávio", "Pedro", "Rafael", "Samuel", "Thiago", "Vinícius", "Matheus", "Caio", "Davi",
+]
+LAST_NAMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+    "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas",
+]
+ATTENDANTS = ["Sueli", "Larissa", "Bia", "Renata", "Carla", "Marcelo"]
+NOTES = [
+    "", "", "", "Cliente pediu mais informações", "Retornar contato semana que vem", "Interessado em desconto",
+    "Prefere aulas à noite", "Vai conversar com a família", "Pediu material por WhatsApp", "Já fez curso antes",
+]
+EMAIL_DOMAINS = ["gmail.com", "hotmail.com", "outlook.com", "yahoo.com.br", "exemplo.com"]
+DDDS = ["11", "12", "13", "19", "21", "27", "31", "41", "47", "51", "61", "71", "81", "85", "91"]
+FEES_CENTS = [19900, 22450, 24900, 29900, 30000, 34900, 39900, 44900]
+
+# Pesos aproximados de uma recepção real (mesma ordem das listas do config)
+STATUS_WEIGHTS = [30, 25, 15, 18, 12]
+HOW_FOUND_WEIGHTS = [25, 15, 20, 8, 10, 5, 3, 10, 4]
+# Fração dos contatos que repetem uma pessoa já gerada (telefone/email/nome digitados de outro jeito)
+DUPLICATE_RATE = 0.02
+
+class SyntheticContacts:
+    """
+    Gera contatos realistas e reprodutíveis (mesma semente, mesmos dados) no
+    formato de DatabaseManager.insert_contacts: os 11 campos do formulário
+    mais visit_date_iso, phone_digits e monthly_fee_cents.
+
+    Usa as listas do config (cursos, status, "como conheceu", "para quem é"),
+    telefones com DDD brasileiro, datas de visita dos últimos years anos e
+    mensalidade nas matrículas fechadas. Uma parte dos contatos repete uma
+    pessoa anterior com pequenas diferenças, para o verificador de duplicados.
+    """
+    def __init__(self, seed=42, years=3, today=None):
+        self.random = random.Random(seed)
+        self.today = today or datetime.date.today()
+        self.days = years * 365
+        self._people = []  # pessoas já geradas, candidatas a duplicado
+        self._emails = set()  # cada pessoa nova tem o seu; só os duplicados repetem um email
+        self._created = 0
+
+    def _phone(self):
+        r = self.random
+        if r.random() < 0.85:
+            return r.choice(DDDS) + "9" + f"{r.randrange(10**8):08d}"
+        return r.choice(DDDS) + str(r.randint(2, 5)) + f"{r.randrange(10**7):07d}"
+
+    def _person(self):
+        r = self.random
+        if self._people and r.random() < DUPLICATE_RATE:
+            name, digits, email = r.choice(self._people)
+            variant = r.randrange(3)
+            if variant == 0:
+                digits = digits[2:]  # sem DDD
+            elif variant == 1:
+                email = email.upper()
+            else:
+                name = fold_text(name).title()  # sem acentos
+            return name, digits, email
+        name = f"{r.choice(FIRST_NAMES)} {r.choice(LAST_NAMES)}"
+        if r.random() < 0.3:
+            name = f"{name} {r.choice(LAST_NAMES)}"
+        digits = self._phone()
+        self._created += 1
+        email = ""
+        if r.random() < 0.8:
+            first, *_, last = fold_text(name).split()
+            domain = r.choice(EMAIL_DOMAINS)
+            email = f"{first}.{last}@{domain}"
+            if email in self._emails:
+                # Homônimos: o número da pessoa deixa o endereço único
+                email = f"{first}.{last}{self._created}@{domain}"
+            self._emails.add(email)
+        person = (name, digits, email)
+        if len(self._people) < 5000:
+            self._people.append(person)
+        else:
+            self._people[r.randrange(5000)] = person
+        return person
+
+    def record(self):
+        r = self.random
+        name, digits, email = self._person()
+        visit = self.today - datetime.timedelta(days=r.randrange(self.days))
+        status = r.choices(STATUS_LIST, STATUS_WEIGHTS)[0]
+        cents = None
+        if status == "Fechou matrícula" or r.random() < 0.3:
+            cents = r.choice(FEES_CENTS)
+        return (
+            name, format_br_phone_from_digits(digits) or digits, email, r.choice(COURSES),
+            visit.strftime(DATE_FMT), status, format_cents(cents),
+            r.choices(HOW_FOUND_LIST, HOW_FOUND_WEIGHTS)[0], r.choice(COURSE_FOR_LIST),
+            r.choice(ATTENDANTS), r.choice(NOTES),
+            visit.isoformat(), digits, cents,
+        )
+
+    def records(self, count):
+        for _ in range(count):
+            yield self.record()
+
+def generate_database(path, count, seed=42, chunk_size=10000, progress=None):
+    """
+    Cria um banco novo em path (com o esquema atual) e grava count contatos
+    sintéticos em lotes de chunk_size, um lote por transação.
+    progress(gravados, total) a cada lote. Não escreve em um arquivo existente.
+    """
+    from database import DatabaseManager, init_db
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} já existe; escolha outro arquivo para os dados sintéticos")
+    t0 = time.perf_counter()
+    init_db(db_file=path)
+    db_manager = DatabaseManager(path)
+    generator = SyntheticContacts(seed)
+    written = 0
+    try:
+        while written < count:
+            batch = list(generator.records(min(chunk_size, count - written)))
+            with db_manager.pool.writer() as con:
+                db_manager.insert_contacts(con, batch)
+            written += len(batch)
+            if progress:
+                progress(written, count)
+    finally:
+        db_manager.close()
+    elapsed = time.perf_counter() - t0
+    return {
+        "path": path,
+        "rows": written,
+        "seed": seed,
+        "elapsed_s": round(elapsed, 2),
+        "rows_per_s": round(written / elapsed) if elapsed else 0,
+    }
@@ -0,0 +1,404 @@
+# table_model.py
+import bisect
+import math
+from array import array
+from collections import OrderedDict
+from config import COLUMNS, TABLE_MEMORY_MAX_ROWS
+from utils import _only_digits, ddmmyyyy_to_iso, money_to_cents
+
+# Colunas mantidas em memória pelo modelo; as observações são lidas só para as linhas visíveis
+TABLE_FIELDS = [c for c, _ in COLUMNS if c != "notes"]
+# Colunas calculadas do banco usadas só como chave de ordenação
+DERIVED_FIELDS = ["visit_date_iso", "phone_digits", "monthly_fee_cents"]
+
+# As chaves das colunas calculadas ordenam como a própria coluna no SQLite
+# (ORDER BY direto, sem função), com a ausência de valor primeiro, como NULL
+def _date_key(iso):
+    return iso or ""  # AAAA-MM-DD: a ordem do texto é a das datas
+
+def _digits_key(digits):
+    return digits or ""
+
+def _cents_key(cents):
+    return -math.inf if cents is None else cents
+
+def _text_key(value):
+    return (value or "").casefold()
+
+# Coluna de origem e função da chave de ordenação; as demais colunas ordenam como texto
+SORT_KEYS = {
+    "visit_date": ("visit_date_iso", _date_key),
+    "phone": ("phone_digits", _digits_key),
+    "monthly_fee": ("monthly_fee_cents", _cents_key),
+}
+
+def sort_key(col):
+    """(coluna de origem, função da chave) usada para ordenar a tabela pela coluna."""
+    return SORT_KEYS.get(col, (col, _text_key))
+
+def table_order_by(con, order):
+    """
+    ORDER BY equivalente à ordenação da tabela na tela, com o id como
+    desempate. Colunas com coluna calculada (data, telefone, mensalidade)
+    ordenam por ela, sem chamar Python por linha; nas demais a mesma função
+    de chave do modelo é registrada na conexão.
+    """
+    col, descending = order or ("id", True)
+    if col not in TABLE_FIELDS:
+        col, descending = "id", True
+    direction = "DESC" if descending else "ASC"
+    if col == "id":
+        return f" ORDER BY id {direction}"
+    source, key = sort_key(col)
+    if source != col:
+        return f" ORDER BY {source} {direction}, id {direction}"
+    con.create_function("table_sort_key", 1, key, deterministic=True)
+    return f" ORDER BY table_sort_key({source}) {direction}, id {direction}"
+
+def load_table_source(db_manager, con, filters=None, order=None, max_rows=TABLE_MEMORY_MAX_ROWS):
+    """
+    Fonte da tabela para o resultado filtrado (roda na thread de busca): até
+    max_rows linhas o resultado inteiro vai para o modelo em memória; acima
+    disso ele fica no banco e é lido em páginas.
+    """
+    total = db_manager.count_contacts(con, filters)
+    if total > max_rows:
+        return ContactsPageSource(db_manager, filters, order).load(con, total)
+    return ContactsTableModel(db_manager, filters, order).load(con)
+
+class ContactsTableModel:
+    """
+    Resultado filtrado da tabela de contatos guardado em colunas (uma lista por
+    campo, ids em um array), lido do banco uma vez por busca.
+
+    As chaves de ordenação são calculadas uma única vez por carga e por coluna
+    (datas em AAAA-MM-DD, telefones só com dígitos, mensalidades em centavos,
+    textos com casefold); a ordem exibida é só uma permutação de posições, e
+    inverter o sentido não reordena nada. Empates são desfeitos pelo id, na
+    mesma direção.
+    """
+    NOTES_CACHE_SIZE = 500
+
+    def __init__(self, db_manager, filters=None, order=None):
+        self.db_manager = db_manager
+        self.filters = filters
+        self.order = order or ("id", True)
+        self.ids = array("q")
+        self.columns = {f: [] for f in TABLE_FIELDS[1:] + DERIVED_FIELDS}
+        self._row_of = {}     # id -> posição nas colunas (apenas linhas do resultado)
+        self._keys = {}       # coluna -> chaves de ordenação, por posição
+        self._perm = []       # posições em ordem crescente da coluna ordenada
+        self._ids_in_order = True  # posições crescentes correspondem a ids crescentes
+        self._notes = OrderedDict()
+
+    def load(self, con):
+        """Lê o resultado e ordena (roda na thread de busca)."""
+        fields = TABLE_FIELDS + DERIVED_FIELDS
+        rows = self.db_manager.query_table_columns(con, self.filters, fields)
+        data = list(zip(*rows)) if rows else [()] * len(fields)
+        self.ids = array("q", data[0])
+        self.columns = {f: list(values) for f, values in zip(fields[1:], data[1:])}
+        self._row_of = {cid: pos for pos, cid in enumerate(self.ids)}
+        self._keys.clear()
+        self._notes.clear()
+        self._ids_in_order = True
+        self.sort(*self.order)
+        return self
+
+    def count(self):
+        return len(self._perm)
+
+    # --- Ordenação ---
+    def _sort_keys(self, col):
+        keys = self._keys.get(col)
+        if keys is None:
+            if col == "id":
+                keys = self.ids
+            else:
+                source, key = sort_key(col)
+                keys = [key(v) for v in self.columns[source]]
+            self._keys[col] = keys
+        return keys
+
+    def sort(self, col, descending):
+        """Ordena pela coluna; trocar só o sentido não reordena a permutação."""
+        if col not in TABLE_FIELDS:
+            col, descending = "id", True
+        same_column = bool(self._perm) and col == self.order[0]
+        self.order = (col, descending)
+        if same_column:
+            return
+        positions = list(self._row_of.values())
+        if not self._ids_in_order:
+            positions.sort(key=self.ids.__getitem__)
+        if col != "id":
+            positions.sort(key=self._sort_keys(col).__getitem__)  # estável: empates por id
+        self._perm = positions
+
+    def _bisect(self, pos):
+        """Índice de uma posição (existente ou a inserir) na permutação crescente."""
+        keys = self._sort_keys(self.order[0])
+        ids = self.ids
+        return bisect.bisect_left(self._perm, (keys[pos], ids[pos]), key=lambda p: (keys[p], ids[p]))
+
+    def _display_index(self, asc_index):
+        return len(self._perm) - 1 - asc_index if self.order[1] else asc_index
+
+    def _position_at(self, index):
+        return self._perm[self._display_index(index)]
+
+    # --- Leitura das linhas visíveis ---
+    def rows(self, start, stop):
+        """Linhas no intervalo [start, stop) da ordem exibida."""
+        start, stop = max(0, start), min(stop, len(self._perm))
+        positions = [self._position_at(i) for i in range(start, stop)]
+        ids = [self.ids[p] for p in positions]
+        notes = self._get_notes(ids)
+        cols = [self.columns[f] for f in TABLE_FIELDS[1:]]
+        return [(cid, *(c[p] for c in cols), notes.get(cid)) for cid, p in zip(ids, positions)]
+
+    def _get_notes(self, ids):
+        missing = [cid for cid in ids if cid not in self._notes]
+        if missing:
+            with self.db_manager.pool.reader() as con:
+                found = self.db_manager.get_notes(con, missing)
+            for cid in missing:
+                self._notes[cid] = found.get(cid)
+        for cid in ids:
+            self._notes.move_to_end(cid)
+        while len(self._notes) > self.NOTES_CACHE_SIZE:
+            self._notes.popitem(last=False)
+        return {cid: self._notes.get(cid) for cid in ids}
+
+    def index_of(self, contact_id):
+        """Posição exibida de um contato do resultado, ou None."""
+        pos = self._row_of.get(contact_id)
+        if pos is None:
+            return None
+        return self._display_index(self._bisect(pos))
+
+    # --- Atualizações incrementais (após salvar, atualizar ou apagar) ---
+    def _store(self, pos, row):
+        """Grava a linha (formato de get_contact) na posição, atualizando as chaves já calculadas."""
+        values = dict(zip(TABLE_FIELDS, row))
+        values["visit_date_iso"] = ddmmyyyy_to_iso(values["visit_date"])
+        values["phone_digits"] = _only_digits(values["phone"])
+        values["monthly_fee_cents"] = money_to_cents(values["monthly_fee"])
+        if pos == len(self.ids):
+            self.ids.append(row[0])
+            for f, column in self.columns.items():
+                column.append(values[f])
+        else:
+            for f, column in self.columns.items():
+                column[pos] = values[f]
+        for col, keys in self._keys.items():
+            if col == "id":
+                continue
+            source, key = sort_key(col)
+            if pos == len(keys):
+                keys.append(key(values[source]))
+            else:
+                keys[pos] = key(values[source])
+        self._notes.pop(row[0], None)
+
+    def _add(self, row):
+        pos = len(self.ids)
+        if self.ids and row[0] < self.ids[-1]:
+            self._ids_in_order = False
+        self._store(pos, row)
+        self._row_of[row[0]] = pos
+        asc_index = self._bisect(pos)
+        self._perm.insert(asc_index, pos)
+        return self._display_index(asc_index)
+
+    def _drop(self, contact_id):
+        pos = self._row_of.get(contact_id)
+        if pos is None:
+            return None
+        asc_index = self._bisect(pos)
+        index = self._display_index(asc_index)
+        del self._perm[asc_index]
+        del self._row_of[contact_id]
+        self._notes.pop(contact_id, None)
+        return index
+
+    def _matches(self, contact_id):
+        with self.db_manager.pool.reader() as con:
+            return self.db_manager.contact_matches(con, contact_id, self.filters)
+
+    def insert_row(self, row):
+        """Inclui uma linha nova na posição ordenada. Devolve a posição, ou None se não passa no filtro."""
+        if not self._matches(row[0]):
+            return None
+        return self._add(row)
+
+    def update_row(self, row):
+        """
+        Atualiza uma linha. Devolve (posição antiga, posição nova); qualquer uma
+        delas é None quando a linha não estava/não está mais no resultado.
+        """
+        matches = self._matches(row[0])
+        pos = self._row_of.get(row[0])
+        if pos is None:
+            return None, (self._add(row) if matches else None)
+        asc_index = self._bisect(pos)
+        old_index = self._display_index(asc_index)
+        del self._perm[asc_index]
+        if not matches:
+            del self._row_of[row[0]]
+            return old_index, None
+        self._store(pos, row)
+        asc_index = self._bisect(pos)
+        self._perm.insert(asc_index, pos)
+        return old_index, self._display_index(asc_index)
+
+    def remove_rows(self, contact_ids):
+        """Retira linhas apagadas. Devolve a menor posição afetada (ou None)."""
+        indexes = [i for i in (self._drop(cid) for cid in contact_ids) if i is not None]
+        return min(indexes) if indexes else None
+
+class ContactsPageSource:
+    """
+    Resultado grande demais para o modelo em memória, lido do banco em páginas.
+
+    O total vem de um COUNT(*) e só as páginas exibidas são buscadas
+    (LIMIT/OFFSET), mantendo as mais recentes em um pequeno cache LRU. A
+    ordem é o ORDER BY de database.order_clause: colunas calculadas e índices
+    (data da visita, nome), sem função Python por linha, e textos com NOCASE.
+    """
+    PAGE_SIZE = 200
+    MAX_CACHED_PAGES = 10
+
+    def __init__(self, db_manager, filters=None, order=None):
+        self.db_manager = db_manager
+        self.filters = filters
+        self.order = order or ("id", True)
+        self.total = 0
+        self._pages = OrderedDict()
+
+    def load(self, con, total=None):
+        """Conta as linhas e pré-carrega a primeira página (roda na thread de busca)."""
+        self.total = self.db_manager.count_contacts(con, self.filters) if total is None else total
+        self._pages.clear()
+        if self.total:
+            self._store_page(0, self._fetch_page(con, 0))
+        return self
+
+    def count(self):
+        return self.total
+
+    def sort(self, col, descending):
+        """Troca o ORDER BY; as páginas são relidas sob demanda."""
+        if col not in TABLE_FIELDS:
+            col, descending = "id", True
+        if (col, descending) != tuple(self.order):
+            self.order = (col, descending)
+            self._pages.clear()
+
+    def rows(self, start, stop):
+        """Linhas no intervalo [start, stop), buscando as páginas que faltarem."""
+        start, stop = max(0, start), min(stop, self.total)
+        result = []
+        index = start
+        while index < stop:
+            page_no, offset = divmod(index, self.PAGE_SIZE)
+            chunk = self._get_page(page_no)[offset:offset + (stop - index)]
+            if not chunk:
+                break
+            result.extend(chunk)
+            index += len(chunk)
+        return result
+
+    def _get_page(self, page_no):
+        page = self._pages.get(page_no)
+        if page is None:
+            with self.db_manager.pool.reader() as con:
+                page = self._fetch_page(con, page_no)
+            self._store_page(page_no, page)
+        else:
+            self._pages.move_to_end(page_no)
+        return page
+
+    def _fetch_page(self, con, page_no):
+        return self.db_manager.query_contacts(
+            con, self.filters, self.order, limit=self.PAGE_SIZE, offset=page_no * self.PAGE_SIZE
+        )
+
+    def _store_page(self, page_no, rows):
+        self._pages[page_no] = list(rows)
+        self._pages.move_to_end(page_no)
+        while len(self._pages) > self.MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
+
+    def _cached_index(self, contact_id):
+        for page_no, page in self._pages.items():
+            for offset, row in enumerate(page):
+                if row[0] == contact_id:
+                    return page_no * self.PAGE_SIZE + offset
+        return None
+
+    def _invalidate_from(self, index):
+        for page_no in [p for p in self._pages if p >= index // self.PAGE_SIZE]:
+            del self._pages[page_no]
+
+    def _position(self, con, contact_id):
+        """Posição do contato no resultado (None se ele não passa nos filtros)."""
+        if not self.db_manager.contact_matches(con, contact_id, self.filters):
+            return None
+        return self.db_manager.contact_position(con, contact_id, self.filters, self.order)
+
+    def index_of(self, contact_id):
+        """Posição exibida de um contato do resultado, ou None."""
+        index = self._cached_index(contact_id)
+        if index is None:
+            with self.db_manager.pool.reader() as con:
+                index = self._position(con, contact_id)
+        return index
+
+    # --- Atualizações incrementais (após salvar, atualizar ou apagar) ---
+    def insert_row(self, row):
+        """Inclui uma linha nova na posição ordenada. Devolve a posição, ou None se não passa no filtro."""
+        with self.db_manager.pool.reader() as con:
+            index = self._position(con, row[0])
+        if index is None:
+            return None
+        self.total += 1
+        self._invalidate_from(index)
+        return index
+
+    def update_row(self, row):
+        """
+        Atualiza uma linha. Devolve (posição antiga, posição nova); qualquer uma
+        delas é None quando a linha não estava/não está mais no resultado.
+        """
+        old_index = self._cached_index(row[0])
+        with self.db_manager.pool.reader() as con:
+            new_index = self._position(con, row[0])
+            if old_index is None:
+                # Fora do cache não se sabe se a linha já fazia parte do resultado: reconta
+                self.total = self.db_manager.count_contacts(con, self.filters)
+                self._pages.clear()
+                return None, new_index
+        if old_index == new_index:
+            page_no, offset = divmod(old_index, self.PAGE_SIZE)
+            self._pages[page_no][offset] = row
+            return old_index, new_index
+        self.total += (new_index is not None) - 1
+        self._invalidate_from(old_index if new_index is None else min(old_index, new_index))
+        return old_index, new_index
+
+    def remove_rows(self, contact_ids):
+        """Retira linhas apagadas. Devolve a menor posição afetada (ou None)."""
+        indexes = [self._cached_index(cid) for cid in contact_ids]
+        if any(i is None for i in indexes):
+            # Algum id não estava no cache: reconta e descarta as páginas
+            with self.db_manager.pool.reader() as con:
+                self.total = self.db_manager.count_contacts(con, self.filters)
+            self._pages.clear()
+            return 0
+        if not indexes:
+            return None
+        self.total -= len(indexes)
+        first = min(indexes)
+        self._invalidate_from(first)
+        return first
@@ -0,0 +1,98 @@
+# tests/test_importer.py
+import csv
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager, init_db
+from importer import ContactImporter, RecordNormalizer, map_headers
+
+ROWS = 95  # linhas de dados; uma em cada sete é rejeitada
+CHUNK = 10
+
+class FailingImporter(ContactImporter):
+    """Cai ao gravar o lote fail_at, com os lotes seguintes já lidos (e as rejeições já no arquivo)."""
+    fail_at = 3
+
+    def _commit(self, batch, rows_done, imported, rejected):
+        if rows_done > self.fail_at * CHUNK:
+            raise RuntimeError("queda simulada")
+        return super()._commit(batch, rows_done, imported, rejected)
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        db_file = os.path.join(self.folder.name, "contatos.db")
+        init_db(db_file=db_file)
+        self.db_manager = DatabaseManager(db_file)
+        self.addCleanup(self.db_manager.close)
+        self.path = os.path.join(self.folder.name, "planilha.csv")
+        with open(self.path, "w", newline="", encoding="utf-8") as f:
+            out = csv.writer(f, delimiter=";")
+            out.writerow(["Nome", "Telefone", "Data"])
+            for i in range(1, ROWS + 1):
+                if i % 7 == 0:
+                    out.writerow([f"Pessoa {i}", "123", "01/01/2024"])  # telefone inválido
+                else:
+                    out.writerow([f"Pessoa {i}", f"1198765{i:04d}", "01/01/2024"])
+        self.rejected = [i for i in range(1, ROWS + 1) if i % 7 == 0]
+
+    def count(self):
+        with self.db_manager.pool.reader() as con:
+            return con.execute("SELECT COUNT(*), COUNT(DISTINCT name) FROM contacts").fetchone()
+
+    def reject_lines(self, importer):
+        with open(importer.rejects_path, newline="", encoding="utf-8-sig") as f:
+            lines = list(csv.reader(f, delimiter=";"))
+        self.assertEqual(lines[0][:2], ["linha", "motivo"])
+        return [int(line[0]) for line in lines[1:]]
+
+    def test_resume_after_partial_run(self):
+        failing = FailingImporter(self.db_manager, self.path, chunk_size=CHUNK)
+        with self.assertRaises(RuntimeError):
+            failing.run()
+        self.assertEqual(self.db_manager.get_import_checkpoint(failing.source)[0], FailingImporter.fail_at * CHUNK)
+        self.assertEqual(self.count()[0], FailingImporter.fail_at * CHUNK - 4)  # 7, 14, 21 e 28 rejeitadas
+
+        summary = ContactImporter(self.db_manager, self.path, chunk_size=CHUNK).run()
+        self.assertEqual(summary["resumed_from"], FailingImporter.fail_at * CHUNK)
+        self.assertEqual(summary["read"], ROWS)
+        self.assertEqual(summary["imported"], ROWS - len(self.rejected))
+        self.assertEqual(summary["rejected"], len(self.rejected))
+        self.assertEqual(self.count(), (ROWS - len(self.rejected),) * 2)
+        # Cada rejeição uma vez só, com o número da linha na planilha (o cabeçalho é a linha 1)
+        self.assertEqual(self.reject_lines(failing), [i + 1 for i in self.rejected])
+        self.assertIsNone(self.db_manager.get_import_checkpoint(failing.source))
+
+    def test_full_run(self):
+        summary = ContactImporter(self.db_manager, self.path, chunk_size=CHUNK).run()
+        self.assertEqual((summary["imported"], summary["rejected"], summary["resumed_from"]),
+                         (ROWS - len(self.rejected), len(self.rejected), 0))
+        self.assertEqual(self.reject_lines(ContactImporter(self.db_manager, self.path)), [i + 1 for i in self.rejected])
+
+class NormalizerTest(unittest.TestCase):
+    HEADER = ["Nome", "Telefone", "Data", "Mensalidade"]
+
+    def test_typed_cells_match_text_cells(self):
+        # O mesmo lote como viria do CSV (só textos) e do XLSX (None, números, datas)
+        texts = [[" Ana ", "(11) 98765-4321", "05/02/2024", "R$ 350,00"],
+                 ["Bia", "", "", ""],
+                 ["Caio", "11987654322"]]  # linha curta
+        cells = [("Ana", "(11) 98765-4321", datetime.date(2024, 2, 5), 350),
+                 ("Bia", None, None, None),
+                 ("Caio", 11987654322)]
+        normalize = RecordNormalizer(map_headers(self.HEADER))
+        self.assertEqual(normalize(texts), normalize(cells))
+        (ana, _), (bia, _), (caio, _) = normalize(texts)
+        self.assertEqual((ana[0], ana[1], ana[4], ana[6], ana[11], ana[13]),
+                         ("Ana", "(11) 98765-4321", "05/02/2024", "350,00", "2024-02-05", 35000))
+        self.assertEqual((bia[1], bia[4], bia[6]), ("", None, ""))
+        self.assertEqual((caio[1], caio[12]), ("(11) 98765-4322", "11987654322"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# tests/test_migrations.py
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from migrations import LATEST_VERSION, MIGRATIONS, Migrator, migrate, schema_version
+
+BUNDLED_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "contacts.db")
+
+# Tabela das primeiras versões do programa (sem as colunas acrescentadas depois)
+LEGACY_TABLE = """
+    CREATE TABLE contacts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL, phone TEXT, email TEXT, course TEXT,
+        visit_date TEXT, status TEXT, notes TEXT
+    )
+"""
+
+CURRENT_COLUMNS = {
+    "id", "name", "phone", "email", "course", "visit_date", "status", "followup_date", "notes", "monthly_fee",
+    "how_found", "course_for", "attended_by", "visit_date_iso", "phone_digits", "row_version", "monthly_fee_cents",
+}
+
+class MigrationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.db_file = os.path.join(self.folder.name, "contatos.db")
+
+    def migrate(self):
+        con = sqlite3.connect(self.db_file, isolation_level=None)
+        try:
+            migrate(con)
+            self.assertEqual(schema_version(con), LATEST_VERSION)
+            return {row[1] for row in con.execute("PRAGMA table_info(contacts)")}
+        finally:
+            con.close()
+
+    def assert_usable(self):
+        """O gerenciador lê e grava no banco migrado (tabela, busca e retornos)."""
+        db_manager = DatabaseManager(self.db_file)
+        try:
+            row = db_manager.add_contact(("Fulano de Tal", "(11) 98765-4321", "", "", "01/02/2024", "Novo",
+                                          "", "", "", "", ""))
+            db_manager.set_followup(row[0], "2024-02-10 09:00")
+            self.assertEqual(db_manager.get_followup(row[0]), "2024-02-10 09:00")
+            filters = db_manager.build_filters({"text": "fulano"})
+            with db_manager.pool.reader() as con:
+                self.assertEqual(db_manager.count_contacts(con, filters), 1)
+        finally:
+            db_manager.close()
+
+class LegacyTableTest(MigrationTestCase):
+    def test_legacy_table_gets_every_column(self):
+        con = sqlite3.connect(self.db_file)
+        con.execute(LEGACY_TABLE)
+        con.executemany("INSERT INTO contacts (name, phone, visit_date, status) VALUES (?, ?, ?, ?)",
+                        [(f"Pessoa {i}", f"(11) 9876-{i:04d}", "05/03/2023", "Novo") for i in range(30)])
+        con.commit()
+        con.close()
+        self.assertEqual(self.migrate(), CURRENT_COLUMNS)
+        self.assert_usable()
+
+    def test_new_database(self):
+        self.assertEqual(self.migrate(), CURRENT_COLUMNS)
+        self.assert_usable()
+
+@unittest.skipUnless(os.path.exists(BUNDLED_DB), "contacts.db não encontrado")
+class BundledDatabaseTest(MigrationTestCase):
+    def setUp(self):
+        super().setUp()
+        shutil.copyfile(BUNDLED_DB, self.db_file)
+        con = sqlite3.connect(self.db_file)
+        try:
+            self.rows = con.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+        finally:
+            con.close()
+
+    def test_bundled_database_from_version_0(self):
+        con = sqlite3.connect(self.db_file)
+        try:
+            self.assertEqual(schema_version(con), 0)
+        finally:
+            con.close()
+        self.assertEqual(self.migrate(), CURRENT_COLUMNS)
+        con = sqlite3.connect(self.db_file)
+        try:
+            self.assertEqual(con.execute("SELECT COUNT(*) FROM contacts").fetchone()[0], self.rows)
+            self.assertEqual(con.execute("SELECT COUNT(*) FROM contacts_fts").fetchone()[0], self.rows)
+        finally:
+            con.close()
+        self.assert_usable()
+
+    def test_stopped_before_followup_column(self):
+        # Banco que parou na versão 9 com a migração 1 antiga (sem followup_date)
+        con = sqlite3.connect(self.db_file, isolation_level=None)
+        try:
+            migrator = Migrator(con)
+            for version, _, apply in MIGRATIONS[:9]:
+                con.execute("BEGIN IMMEDIATE")
+                apply(migrator)
+                con.execute(f"PRAGMA user_version = {version}")
+                con.execute("COMMIT")
+            con.execute("ALTER TABLE contacts DROP COLUMN followup_date")
+        finally:
+            con.close()
+        self.assertEqual(self.migrate(), CURRENT_COLUMNS)
+        self.assert_usable()
+
+if __name__ == "__main__":
+    unittest.main()
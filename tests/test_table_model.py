@@ -0,0 +1,85 @@
+# tests/test_table_model.py
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager, init_db
+from table_model import TABLE_FIELDS, ContactsPageSource, ContactsTableModel, load_table_source
+
+# Nome, telefone, data e mensalidade com vazios, empates e valores fora de ordem
+CONTACTS = [
+    ("Bruna", "(11) 98765-4321", "05/02/2024", "350,00"),
+    ("ana", "", "", ""),
+    ("Álvaro", "9876-5432", "31/12/2023", "-10,00"),
+    ("Carlos", "(21) 3333-4444", "05/02/2024", "1.200,00"),
+    ("bruna", "(11) 98765-4321", "", "350,00"),
+    ("Davi", "", "01/01/2025", ""),
+]
+
+class OrderTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        db_file = os.path.join(folder.name, "contatos.db")
+        init_db(db_file=db_file)
+        self.db_manager = DatabaseManager(db_file)
+        self.addCleanup(self.db_manager.close)
+        for name, phone, visit_date, fee in CONTACTS:
+            self.db_manager.add_contact((name, phone, "", "", visit_date, "Novo", fee, "", "", "", ""))
+
+    def test_export_order_matches_table(self):
+        with self.db_manager.pool.reader() as con:
+            model = ContactsTableModel(self.db_manager).load(con)
+        for col in TABLE_FIELDS:
+            for descending in (False, True):
+                with self.subTest(col=col, descending=descending):
+                    model.sort(col, descending)
+                    shown = [row[0] for row in model.rows(0, model.count())]
+                    with self.db_manager.pool.reader() as con:
+                        exported = [row[0] for rows in self.db_manager.stream_contacts(con, None, (col, descending))
+                                    for row in rows]
+                    self.assertEqual(exported, shown)
+
+    def load(self, max_rows):
+        with self.db_manager.pool.reader() as con:
+            return load_table_source(self.db_manager, con, None, ("name", False), max_rows=max_rows)
+
+    def test_large_result_is_paged(self):
+        model, pages = self.load(len(CONTACTS)), self.load(len(CONTACTS) - 1)
+        self.assertIsInstance(model, ContactsTableModel)
+        self.assertIsInstance(pages, ContactsPageSource)
+        pages.PAGE_SIZE = 4  # mais de uma página
+        for col in ("id", "name", "phone", "visit_date", "monthly_fee"):
+            for descending in (False, True):
+                with self.subTest(col=col, descending=descending):
+                    model.sort(col, descending)
+                    pages.sort(col, descending)
+                    self.assertEqual(pages.count(), model.count())
+                    self.assertEqual(pages.rows(0, pages.count()), model.rows(0, model.count()))
+                    self.assertEqual([pages.index_of(row[0]) for row in model.rows(0, model.count())],
+                                     list(range(model.count())))
+
+    def test_paged_updates(self):
+        # Ordem NOCASE por nome: ana, Bruna, bruna, Carlos, Davi, Álvaro (acentos depois do ASCII)
+        pages = self.load(0)
+        pages.rows(0, pages.count())
+        row = self.db_manager.add_contact(("Beto", "", "", "", "", "Novo", "", "", "", "", ""))
+        self.assertEqual(pages.insert_row(row), 1)
+        self.assertEqual(pages.count(), len(CONTACTS) + 1)
+        self.assertEqual(pages.rows(1, 2)[0][0], row[0])
+
+        renamed = (row[0], "Zeca") + tuple(row[2:])
+        self.db_manager.update_contact(renamed[1:] + (row[0],))
+        self.assertEqual(pages.update_row(renamed), (1, 5))
+        self.assertEqual(pages.rows(5, 6)[0][1], "Zeca")
+
+        self.db_manager.delete_contact(row[0])
+        self.assertEqual(pages.remove_rows([row[0]]), 5)
+        self.assertEqual(pages.count(), len(CONTACTS))
+        self.assertNotIn(row[0], [r[0] for r in pages.rows(0, pages.count())])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# tests/test_utils_batch.py
+import math
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+
+# (versão em lote, versão de um valor)
+PAIRS = [
+    (utils.only_digits_batch, utils._only_digits),
+    (utils.format_br_phone_batch, utils.format_br_phone_from_digits),
+    (utils.format_ddmmyyyy_batch, utils.format_ddmmyyyy_from_digits),
+    (utils.normalize_money_batch, utils.normalize_money),
+    (utils.money_to_cents_batch, utils.money_to_cents),
+]
+
+# Dígitos de outras escritas (o \D do re os reconhece), acentos e símbolos
+EXTRA_CHARS = "٣۷०éçãÇ€ºª "
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def random_inputs(seed, count=3000):
+    """Telefones, datas e valores em reais digitados de vários jeitos, mais ausentes, vazios e textos longos."""
+    r = random.Random(seed)
+    values = [None, float("nan"), np.nan, "", " ", "()", "R$", "R$ ,", "-", "1" * 40, "9" * 33, "0" * 32]
+    # Fim de mês e anos bissextos (inclusive os de século)
+    values += [f"{day}/{month}/{year}" for day in ("28", "29", "30", "31") for month in ("02", "04", "12")
+               for year in ("0400", "1900", "2000", "2023", "2024", "0000")]
+    for _ in range(count):
+        kind = r.randrange(6)
+        digits = "".join(r.choice("0123456789") for _ in range(r.randint(0, 14)))
+        if kind == 0:
+            value = digits
+        elif kind == 1:
+            # Telefone/data com separadores
+            value = "".join(c + (r.choice(" ()-./") if r.random() < 0.3 else "") for c in digits)
+        elif kind == 2:
+            value = f"{r.randint(1, 31):02d}/{r.randint(0, 13):02d}/{r.randint(1, 2100):04d}"
+        elif kind == 3:
+            value = f"R$ {r.randint(0, 99999):,},{r.randint(0, 99):02d}".replace(",", ".", 1)
+        elif kind == 4:
+            # Fora do ASCII
+            value = "".join(r.choice("0123456789" + EXTRA_CHARS) for _ in range(r.randint(1, 15)))
+        else:
+            # Longo (acima da largura da matriz do NumPy)
+            value = " ".join(r.choice(["11", "98765", "4321", "x", "(21)", "-"]) for _ in range(r.randint(8, 20)))
+        values.append(value)
+        if r.random() < 0.03:
+            values.append(None if r.random() < 0.5 else float("nan"))
+    return values
+
+class BatchMatchesScalarTest(unittest.TestCase):
+    def assert_matches(self, batch, scalar, values):
+        expected = [scalar("" if _missing(v) else v) for v in values]
+        result = list(batch(values))
+        self.assertEqual(len(result), len(expected))
+        for value, got, want in zip(values, result, expected):
+            self.assertEqual(got, want, f"{batch.__name__}({value!r})")
+
+    def test_random_inputs(self):
+        for seed in (1, 2, 3):
+            values = random_inputs(seed)
+            for batch, scalar in PAIRS:
+                with self.subTest(batch=batch.__name__, seed=seed):
+                    self.assert_matches(batch, scalar, values)
+
+    def test_empty(self):
+        for batch, _ in PAIRS:
+            with self.subTest(batch=batch.__name__):
+                self.assertEqual(len(batch([])), 0)
+                result = batch(pd.Series([], dtype=object))
+                self.assertIsInstance(result, pd.Series)
+                self.assertEqual(len(result), 0)
+
+    def test_only_missing(self):
+        values = [None, float("nan"), ""]
+        for batch, scalar in PAIRS:
+            with self.subTest(batch=batch.__name__):
+                self.assert_matches(batch, scalar, values)
+
+    def test_long_and_non_ascii(self):
+        values = ["(11) 98765-4321" * 3, "٣٣٣٣٣٣٣٣", "25/12/２０２０", "2" * 100, "R$ 1.234,56 " * 4,
+                  "3१/0१/2020", "ação 11 98765 4321"]
+        for batch, scalar in PAIRS:
+            with self.subTest(batch=batch.__name__):
+                self.assert_matches(batch, scalar, values)
+
+    def test_numpy_array(self):
+        values = np.array(random_inputs(4, 200), dtype=object)
+        for batch, scalar in PAIRS:
+            with self.subTest(batch=batch.__name__):
+                result = batch(values)
+                self.assertIsInstance(result, np.ndarray)
+                self.assert_matches(batch, scalar, list(values))
+
+    def test_series_keeps_index_and_name(self):
+        values = random_inputs(5, 300)
+        index = pd.Index(random.Random(5).sample(range(10 ** 6), len(values)), name="id")
+        series = pd.Series(values, index=index, name="phone", dtype=object)
+        for batch, scalar in PAIRS:
+            with self.subTest(batch=batch.__name__):
+                result = batch(series)
+                self.assertIsInstance(result, pd.Series)
+                self.assertTrue(result.index.equals(series.index))
+                self.assertEqual(result.name, "phone")
+                self.assertEqual(list(result), [scalar("" if _missing(v) else v) for v in values])
+
+    def test_series_subset_keeps_labels(self):
+        # Índice fora de ordem e com buracos, como depois de um filtro no DataFrame
+        series = pd.Series(["11987654321", None, "01/02/2020", "R$ 10,50"], index=[7, 3, 42, 0])
+        for batch, scalar in PAIRS:
+            with self.subTest(batch=batch.__name__):
+                result = batch(series[series.index != 3])
+                self.assertEqual(list(result.index), [7, 42, 0])
+                self.assertEqual(result.loc[42], scalar("01/02/2020"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,29 +1,30 @@
 # ui_manager.py
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import csv
 import datetime
-import pandas as pd
 import os
 import sys
-import shutil
+import threading
 
 import ttkbootstrap as b
 from ttkbootstrap.constants import *
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
 
 # Importando dos nossos módulos
 from config import *
 from utils import (resource_path, _only_digits, format_ddmmyyyy_from_digits, 
-                   format_br_phone_from_digits, normalize_money)
-from database import DatabaseManager
-from reports import ReportGenerator
+                   format_br_phone_from_digits, normalize_money, ddmmyyyy_to_iso, format_cents)
+from database import DatabaseManager, init_db, schema_is_current
+from search_pipeline import SearchPipeline
+from backup import BackupService, BackupScheduler, BackupCancelled
+from table_model import ContactsPageSource, load_table_source
+from followups import FollowupQueue, FollowupListSource, FOLLOWUP_FMT, followup_from_form, followup_to_form
+from virtual_table import VirtualTreeview
+from diagnostics import diagnostics, timed
 
 class App(b.Window):
-    def __init__(self):
+    def __init__(self, profiler=None, db_manager=None):
         super().__init__(themename="flatly")
+        self.profiler = profiler
 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
         
@@ -31,9 +32,14 @@ class App(b.Window):
         self.state("zoomed")
         self.minsize(1200, 760)
 
-        # Inicializa os gerenciadores de lógica
-        self.db_manager = DatabaseManager(DB_FILE)
-        self.report_generator = ReportGenerator()
+        # Inicializa os gerenciadores de lógica (db_manager remoto: main.py --remote)
+        self.db_manager = db_manager or DatabaseManager(DB_FILE)
+        if self.db_manager.is_remote:
+            self.title(f"Follow-up - Cadastro e Relatórios ({self.db_manager.base_url})")
+        # Relatórios (pandas/matplotlib) só são carregados quando a aba é aberta
+        self.report_generator = None
+        self.chart_renderer = None
+        self.cb_report_att = None
         
         try:
             self.iconbitmap(resource_path("logo-fisk.ico"))
@@ -47,11 +53,71 @@ class App(b.Window):
         self.initialize_variables()
         self.load_assets()
         self.create_widgets()
+        self.search_pipeline = SearchPipeline(
+            self, self.db_manager.pool, self._collect_table_filters,
+            lambda con, request: load_table_source(self.db_manager, con, *request), self._render_table_source
+        )
         self.bind_events()
-        
+        self.clear_form()
+
+        # Backups automáticos (horário/diário/semanal) na pasta BACKUP_DIR, ao lado do banco.
+        # Com o banco em um servidor, backups e importações ficam a cargo do computador do servidor.
+        self.backup_service = self.backup_scheduler = None
+        if not self.db_manager.is_remote:
+            self.backup_service = BackupService(self.db_manager.pool.db_file)
+            backup_dir = os.path.join(os.path.dirname(os.path.abspath(self.db_manager.pool.db_file)), BACKUP_DIR)
+            self.backup_scheduler = BackupScheduler(self, self.backup_service, self.db_manager.data_version, backup_dir)
+            self.backup_scheduler.start()
+        # Fila de retornos: um único after() agendado para o próximo vencimento
+        self.followup_queue = FollowupQueue(self, self.db_manager, on_due=self._on_followups_due)
+        self.followup_window = None
+        self.diagnostics_window = None
+        self._mark_startup("construção da janela e dos widgets")
+
+        # Banco e primeira consulta só depois que a janela já foi desenhada:
+        # o after_idle roda depois dos redesenhos pendentes e o after(0) cede mais uma volta ao Tk.
+        self.after_idle(lambda: self.after(0, self._load_initial_data))
+
+    def _mark_startup(self, phase):
+        if self.profiler is not None:
+            self.profiler.mark(phase)
+
+    def _load_initial_data(self):
+        if self._is_closing:
+            return
+        self._mark_startup("primeira pintura da janela")
+        if not self.db_manager.is_remote and not schema_is_current(self.db_manager.db_file):
+            # Banco antigo: as migrações (que podem preencher muitas linhas) rodam com progresso
+            def done(_, error):
+                if error is not None:
+                    messagebox.showerror("Erro", f"Falha ao atualizar o banco de dados:\n{error}")
+                    self.on_closing()
+                    return
+                self._show_initial_data()
+            self._run_with_progress(
+                "Atualizando banco de dados", "Preparando...",
+                lambda report, cancel: init_db(progress=lambda text, fraction: report(fraction, text),
+                                               db_file=self.db_manager.db_file),
+                done, cancellable=False)
+            return
+        self._show_initial_data()
+
+    def _show_initial_data(self):
+        self._mark_startup("init_db")
+        self.followup_queue.load()
+        self._update_followup_button()
         self.refresh_filter_options()
+        self._mark_startup("opções dos filtros")
         self.refresh_table()
-        self.clear_form()
+
+    def _render_table_source(self, source):
+        source.sort(*self.table_order)  # a ordenação pode ter mudado durante a busca
+        self.table.set_source(source)
+        if self.profiler is not None:
+            self._mark_startup("primeira carga da tabela")
+            print(self.profiler.report())
+            self.profiler = None
+            self.after(0, self.on_closing)
 
     def setup_styles(self):
         style = b.Style()
@@ -59,7 +125,6 @@ class App(b.Window):
         style.map("Treeview.Heading", background=[('active', FISK_RED)])
         style.configure("Treeview", rowheight=25)
         style.map('Treeview', background=[('selected', '#e0e0e0')], foreground=[('selected', 'black')])
-        plt.style.use('seaborn-v0_8-pastel')
 
     # --- ALTERAÇÃO 2: Ativando a bandeira ao iniciar o fechamento ---
     def on_closing(self):
@@ -69,8 +134,17 @@ class App(b.Window):
         # Ativa a bandeira primeiro para que nenhum outro evento seja processado
         self._is_closing = True
         
-        # Fecha todas as figuras do Matplotlib para evitar erros em segundo plano
-        plt.close('all')
+        # Fecha todas as figuras do Matplotlib (se a aba de relatórios chegou a ser aberta)
+        if self.chart_renderer is not None:
+            self.chart_renderer.close()
+        if 'matplotlib.pyplot' in sys.modules:
+            sys.modules['matplotlib.pyplot'].close('all')
+        # Cancela buscas pendentes e backups agendados e fecha as conexões persistentes do pool do SQLite
+        if self.backup_scheduler is not None:
+            self.backup_scheduler.stop()
+        self.followup_queue.stop()
+        self.search_pipeline.close()
+        self.db_manager.close()
         # Agora, destrói a janela principal do Tkinter
         self.destroy()
 
@@ -83,6 +157,7 @@ class App(b.Window):
         self.var_filter_status = tk.StringVar(value="Todos")
         self.var_filter_from = tk.StringVar()
         self.var_filter_to = tk.StringVar()
+        self.table_order = ("id", True)
 
         # Variáveis do formulário (Cadastro)
         self.var_name = tk.StringVar()
@@ -95,6 +170,8 @@ class App(b.Window):
         self.var_how_found = tk.StringVar(value="Indicação")
         self.var_course_for = tk.StringVar(value="Próprio")
         self.var_attended_by = tk.StringVar()
+        self.var_followup_date = tk.StringVar()
+        self.var_followup_time = tk.StringVar()
 
         # Variáveis dos relatórios
         self.var_report_from = tk.StringVar()
@@ -127,7 +204,29 @@ class App(b.Window):
         self.notebook.add(self.tab_relatorios, text='  Relatórios  ')
 
         self.create_cadastro_tab_content()
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+
+    def _on_tab_changed(self, _event=None):
+        if self._is_closing:
+            return
+        if self.notebook.select() == str(self.tab_relatorios):
+            self.ensure_dashboard()
+
+    def ensure_dashboard(self):
+        """Monta a aba de Relatórios (matplotlib e pandas) na primeira vez em que ela é aberta."""
+        if self.chart_renderer is not None:
+            return
+        import matplotlib
+        matplotlib.use('TkAgg')
+        import matplotlib.pyplot as plt
+        from reports import ReportGenerator
+        from chart_renderer import ChartRenderer
+
+        plt.style.use('seaborn-v0_8-pastel')
+        self.report_generator = ReportGenerator()
+        self.chart_renderer = ChartRenderer(self.report_generator, self)
         self.create_relatorios_tab_content()
+        self.cb_report_att["values"] = self.cb_att["values"]
 
     def create_cadastro_tab_content(self):
         self.create_topbar(self.tab_cadastro)
@@ -137,8 +236,10 @@ class App(b.Window):
     def create_menu(self):
         menubar = b.Menu(self)
         filemenu = b.Menu(menubar, tearoff=0)
-        filemenu.add_command(label="Exportar CSV...", command=self.export_csv)
-        filemenu.add_command(label="Fazer Backup do Banco de Dados...", command=self.backup_database)
+        local_only = "disabled" if self.db_manager.is_remote else "normal"
+        filemenu.add_command(label="Importar Planilha (CSV/XLSX)...", command=self.import_spreadsheet, state=local_only)
+        filemenu.add_command(label="Exportar (CSV/Parquet)...", command=self.export_csv)
+        filemenu.add_command(label="Fazer Backup do Banco de Dados...", command=self.backup_database, state=local_only)
         filemenu.add_command(label="Verificar Contatos Duplicados...", command=self.check_duplicates)
         filemenu.add_separator()
         # Corrigido para usar o método de fechamento seguro
@@ -155,7 +256,7 @@ class App(b.Window):
         
         search_row = b.Frame(top)
         search_row.pack(fill=tk.X)
-        b.Label(search_row, text="Buscar por nome:").grid(row=0, column=0, sticky=tk.W, padx=(0, 6))
+        b.Label(search_row, text="Buscar (nome, email, observações):").grid(row=0, column=0, sticky=tk.W, padx=(0, 6))
         e_name = b.Entry(search_row, textvariable=self.var_search)
         e_name.grid(row=0, column=1, sticky="ew", padx=(0, 18))
         b.Label(search_row, text="Buscar por telefone:").grid(row=0, column=2, sticky=tk.W, padx=(0, 6))
@@ -194,6 +295,8 @@ class App(b.Window):
         e_to.grid(row=0, column=c, sticky=tk.W, padx=(0, 8)); c += 1
         b.Button(filt_row, text="Aplicar", command=self.refresh_table, bootstyle=PRIMARY).grid(row=0, column=c, padx=(0, 6)); c += 1
         b.Button(filt_row, text="Limpar", command=self.clear_filters, bootstyle="secondary-outline").grid(row=0, column=c, padx=(0, 6)); c += 1
+        self.btn_followups = b.Button(filt_row, text="Retornos", command=self.show_followup_queue, bootstyle="warning-outline")
+        self.btn_followups.grid(row=0, column=c, padx=(12, 6)); c += 1
         
         self.attach_date_autofmt(e_from, self.var_filter_from)
         self.attach_date_autofmt(e_to, self.var_filter_to)
@@ -234,7 +337,13 @@ class App(b.Window):
         b.Label(row_mid, text="Para quem é o curso").grid(row=0, column=1, sticky=tk.W)
         b.Combobox(row_mid, textvariable=self.var_course_for, values=COURSE_FOR_LIST, width=22, state="readonly").grid(row=1, column=1, padx=(0,12), sticky=tk.W)
         b.Label(row_mid, text="Atendido por").grid(row=0, column=2, sticky=tk.W)
-        b.Entry(row_mid, textvariable=self.var_attended_by, width=25).grid(row=1, column=2, padx=(0,0), sticky=tk.W)
+        b.Entry(row_mid, textvariable=self.var_attended_by, width=25).grid(row=1, column=2, padx=(0,12), sticky=tk.W)
+        b.Label(row_mid, text="Retornar em").grid(row=0, column=3, sticky=tk.W)
+        e_followup = b.Entry(row_mid, textvariable=self.var_followup_date, width=15)
+        e_followup.grid(row=1, column=3, padx=(0,12), sticky=tk.W)
+        self.attach_date_autofmt(e_followup, self.var_followup_date)
+        b.Label(row_mid, text="Hora").grid(row=0, column=4, sticky=tk.W)
+        b.Entry(row_mid, textvariable=self.var_followup_time, width=8).grid(row=1, column=4, sticky=tk.W)
 
         notes_block = b.LabelFrame(main_form_frame, text=" Observações ", padding=(10, 6), bootstyle=INFO)
         notes_block.pack(fill=tk.X, pady=(10,0))
@@ -263,11 +372,13 @@ class App(b.Window):
         self.tree = b.Treeview(table_frame, columns=cols, show="headings", selectmode="browse", bootstyle=PRIMARY)
         self.tree.grid(row=0, column=0, sticky="nsew")
 
-        vsb = b.Scrollbar(table_frame, orient="vertical", command=self.tree.yview, bootstyle="round-primary")
+        # A rolagem vertical é controlada pela tabela virtual (só as linhas visíveis existem no Treeview)
+        vsb = b.Scrollbar(table_frame, orient="vertical", bootstyle="round-primary")
         vsb.grid(row=0, column=1, sticky="ns")
         hsb = b.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview, bootstyle="round-primary")
         hsb.grid(row=1, column=0, sticky="ew")
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(xscrollcommand=hsb.set)
+        self.table = VirtualTreeview(self.tree, vsb)
 
         widths = {
             "id": 60, "name": 220, "phone": 130, "email": 220, "course": 160,
@@ -288,12 +399,8 @@ class App(b.Window):
         filters_frame.grid(row=0, column=0, sticky="ns", padx=(0, 10))
 
         b.Label(filters_frame, text="Selecione o período de análise:", justify=tk.LEFT).pack(anchor="w")
-        period_options = [
-            ("Últimos 7 dias", "7_days"), ("Últimos 15 dias", "15_days"),
-            ("Últimos 30 dias", "30_days"), ("Últimos 60 dias", "60_days"),
-            ("Últimos 90 dias", "90_days"), ("Este Mês", "this_month"),
-        ]
-        for text, val in period_options:
+        from reports import PERIOD_OPTIONS
+        for text, val in PERIOD_OPTIONS:
             rb = b.Radiobutton(filters_frame, text=text, variable=self.report_period, value=val, bootstyle="primary")
             rb.pack(anchor="w", pady=2, padx=5)
         
@@ -327,15 +434,60 @@ class App(b.Window):
         charts_frame = b.Frame(main_frame)
         charts_frame.grid(row=0, column=1, sticky="nsew")
         charts_frame.rowconfigure(1, weight=1)
+        charts_frame.rowconfigure(2, weight=1)
         charts_frame.columnconfigure(0, weight=1)
         charts_frame.columnconfigure(1, weight=1)
 
-        self.fig1, self.ax1 = self.create_plot_canvas(charts_frame, 0, 0)
-        self.fig2, self.ax2 = self.create_plot_canvas(charts_frame, 0, 1)
-        self.fig3, self.ax3 = self.create_plot_canvas(charts_frame, 1, 0)
-        self.fig4, self.ax4 = self.create_plot_canvas(charts_frame, 1, 1)
+        self.create_revenue_panel(charts_frame)
+        self.fig1, self.ax1 = self.create_plot_canvas(charts_frame, 1, 0)
+        self.fig2, self.ax2 = self.create_plot_canvas(charts_frame, 1, 1)
+        self.fig3, self.ax3 = self.create_plot_canvas(charts_frame, 2, 0)
+        self.fig4, self.ax4 = self.create_plot_canvas(charts_frame, 2, 1)
+
+    def create_revenue_panel(self, parent):
+        """Indicadores de receita das matrículas fechadas no período (calculados no SQLite)."""
+        panel = b.LabelFrame(parent, text=" Receita das Matrículas ", padding=8, bootstyle=PRIMARY)
+        panel.grid(row=0, column=0, columnspan=2, sticky="ew", padx=5, pady=(0, 5))
+        panel.columnconfigure(1, weight=1)
+        panel.columnconfigure(2, weight=1)
+
+        totals = b.Frame(panel)
+        totals.grid(row=0, column=0, sticky="nw", padx=(0, 15))
+        self.var_revenue_total = tk.StringVar(value="-")
+        self.var_revenue_count = tk.StringVar(value="-")
+        self.var_revenue_average = tk.StringVar(value="-")
+        for r, (label, var) in enumerate([
+            ("Receita mensal projetada:", self.var_revenue_total),
+            ("Matrículas com mensalidade:", self.var_revenue_count),
+            ("Ticket médio:", self.var_revenue_average),
+        ]):
+            b.Label(totals, text=label).grid(row=r, column=0, sticky="w", pady=2)
+            b.Label(totals, textvariable=var, font=('Helvetica', 11, 'bold')).grid(row=r, column=1, sticky="w", padx=(6, 0))
+
+        self.revenue_trees = {}
+        for c, (key, title) in enumerate([("by_attendant", "Atendente"), ("by_course", "Curso")], start=1):
+            tree = b.Treeview(panel, columns=("name", "count", "average", "total"), show="headings", height=4, bootstyle=PRIMARY)
+            for col, text, width, anchor in (("name", title, 140, "w"), ("count", "Matrículas", 80, "e"),
+                                             ("average", "Ticket médio", 100, "e"), ("total", "Receita", 100, "e")):
+                tree.heading(col, text=text)
+                tree.column(col, width=width, anchor=anchor)
+            tree.grid(row=0, column=c, sticky="nsew", padx=5)
+            self.revenue_trees[key] = tree
+
+    def update_revenue_panel(self, kpis):
+        self.var_revenue_total.set(f"R$ {format_cents(kpis['total_cents'])}")
+        self.var_revenue_count.set(str(kpis["enrollments"]))
+        average = kpis["average_cents"]
+        self.var_revenue_average.set(f"R$ {format_cents(average)}" if average is not None else "-")
+        for key, tree in self.revenue_trees.items():
+            tree.delete(*tree.get_children())
+            for name, count, avg, total in kpis[key]:
+                tree.insert("", "end", values=(name, count, format_cents(avg), format_cents(total)))
 
     def create_plot_canvas(self, parent, r, c):
+        from matplotlib.figure import Figure
+        from chart_renderer import LockedFigureCanvasTkAgg
+
         fig = Figure(figsize=(6, 4), dpi=100, constrained_layout=True)
         fig.set_facecolor("#f0f0f0") 
         ax = fig.add_subplot(111)
@@ -346,7 +498,7 @@ class App(b.Window):
         canvas_frame.rowconfigure(0, weight=1)
         canvas_frame.columnconfigure(0, weight=1)
 
-        canvas = FigureCanvasTkAgg(fig, master=canvas_frame)
+        canvas = LockedFigureCanvasTkAgg(fig, master=canvas_frame)
         canvas.draw()
         canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
         return fig, ax
@@ -359,86 +511,70 @@ class App(b.Window):
                 return
             self.refresh_table()
 
-        # Usando a função segura para todos os eventos que atualizam a tabela
-        self.var_search.trace_add("write", _safe_refresh_table)
-        self.var_filter_phone.trace_add("write", _safe_refresh_table)
+        # A digitação nas buscas passa pelo debounce; os comboboxes consultam na hora
+        def _safe_schedule_search(*args):
+            if self._is_closing:
+                return
+            self.search_pipeline.schedule()
+
+        self.var_search.trace_add("write", _safe_schedule_search)
+        self.var_filter_phone.trace_add("write", _safe_schedule_search)
         self.cb_att.bind("<<ComboboxSelected>>", _safe_refresh_table)
         self.cb_course.bind("<<ComboboxSelected>>", _safe_refresh_table)
         self.cb_status.bind("<<ComboboxSelected>>", _safe_refresh_table)
         
         self.tree.bind("<Double-1>", self.on_double_click)
+        # Janela de diagnóstico, sem item de menu (usada pelo suporte)
+        self.bind("<Control-Shift-D>", lambda e: self.show_diagnostics())
         
     def refresh_filter_options(self):
         att_list = ["Todos"] + self.db_manager.get_distinct_values("attended_by")
         self.cb_att["values"] = att_list
-        self.cb_report_att["values"] = att_list
+        if self.cb_report_att is not None:
+            self.cb_report_att["values"] = att_list
         
         self.cb_course["values"] = ["Todos"] + COURSES
         self.cb_status["values"] = ["Todos"] + self.db_manager.get_distinct_values("status")
 
+    def merge_filter_options(self, row):
+        """Acrescenta aos filtros um atendente/status novo, sem reconsultar o banco."""
+        attended_by, status = row[10], row[6]
+        if attended_by and attended_by not in self.cb_att["values"]:
+            att_list = ["Todos"] + sorted(set(self.cb_att["values"][1:]) | {attended_by})
+            self.cb_att["values"] = att_list
+            if self.cb_report_att is not None:
+                self.cb_report_att["values"] = att_list
+        if status and status not in self.cb_status["values"]:
+            self.cb_status["values"] = ["Todos"] + sorted(set(self.cb_status["values"][1:]) | {status})
+
     def ddmmyyyy_to_iso(self, s):
-        s = (s or "").strip()
-        if not s: return None
-        norm = format_ddmmyyyy_from_digits(s)
-        if norm: s = norm
-        try:
-            d = datetime.datetime.strptime(s, DATE_FMT).date()
-            return d.strftime("%Y-%m-%d")
-        except ValueError:
-            return None
+        return ddmmyyyy_to_iso(s)
+
+    def filter_criteria(self):
+        """Critérios da barra de filtros (chaves de database.FILTER_FIELDS)."""
+        return {
+            "text": self.var_search.get().strip(),
+            "phone": _only_digits(self.var_filter_phone.get()),
+            "attended_by": self.var_filter_att.get(),
+            "course": self.var_filter_course.get(),
+            "status": self.var_filter_status.get(),
+            "visit_from": self.ddmmyyyy_to_iso(self.var_filter_from.get()),
+            "visit_to": self.ddmmyyyy_to_iso(self.var_filter_to.get()),
+        }
 
     def build_filters(self):
-        where, params = [], []
-        q = self.var_search.get().strip()
-        if q:
-            where.append("name LIKE ?")
-            params.append(f"%{q}%")
-        
-        phone_q = _only_digits(self.var_filter_phone.get())
-        if phone_q:
-            phone_digits_expr = "replace(replace(replace(replace(replace(replace(phone,'(',''),')',''),'-',''),' ',''),'.',''),'+','')"
-            where.append(f"{phone_digits_expr} LIKE ?")
-            params.append(f"%{phone_q}%")
-        
-        if self.var_filter_att.get() and self.var_filter_att.get() != "Todos":
-            where.append("attended_by = ?")
-            params.append(self.var_filter_att.get())
-        if self.var_filter_course.get() and self.var_filter_course.get() != "Todos":
-            where.append("course = ?")
-            params.append(self.var_filter_course.get())
-        if self.var_filter_status.get() and self.var_filter_status.get() != "Todos":
-            where.append("status = ?")
-            params.append(self.var_filter_status.get())
-
-        vfrom_iso = self.ddmmyyyy_to_iso(self.var_filter_from.get())
-        vto_iso = self.ddmmyyyy_to_iso(self.var_filter_to.get())
-        visit_iso_expr = "(substr(visit_date,7,4)||'-'||substr(visit_date,4,2)||'-'||substr(visit_date,1,2))"
-        if vfrom_iso and vto_iso:
-            where.append(f"{visit_iso_expr} BETWEEN ? AND ?")
-            params.extend([vfrom_iso, vto_iso])
-        elif vfrom_iso:
-            where.append(f"{visit_iso_expr} >= ?")
-            params.append(vfrom_iso)
-        elif vto_iso:
-            where.append(f"{visit_iso_expr} <= ?")
-            params.append(vto_iso)
-            
-        clause = (" WHERE " + " AND ".join(where)) if where else ""
-        return {"clause": clause, "params": params}
+        return self.db_manager.build_filters(self.filter_criteria())
 
+    @timed("refresh_table")
     def refresh_table(self):
+        self.search_pipeline.run_now()
+
+    def _collect_table_filters(self):
         for label, v in [("Visita (De)", self.var_filter_from.get().strip()), ("Visita (Até)", self.var_filter_to.get().strip())]:
             if v and self.ddmmyyyy_to_iso(v) is None:
                 messagebox.showerror("Erro", "Data inválida. Use dd/mm/aaaa (8 dígitos aceitos).")
-                return
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        filters = self.build_filters()
-        rows = self.db_manager.get_contacts(filters)
-        for row in rows:
-            self.tree.insert("", tk.END, values=row)
+                return None
+        return self.build_filters(), self.table_order
 
     def _get_form_data(self):
         name = self.var_name.get().strip()
@@ -459,12 +595,29 @@ class App(b.Window):
             self.txt_notes.get("1.0", tk.END).strip(),
         )
 
+    def _get_form_followup(self):
+        """Retorno do formulário ("AAAA-MM-DD HH:MM" ou None); False se a data/hora é inválida."""
+        try:
+            return followup_from_form(self.var_followup_date.get(), self.var_followup_time.get())
+        except ValueError:
+            messagebox.showerror("Erro", "Data ou hora de retorno inválida. Use dd/mm/aaaa e HH:MM.")
+            return False
+
+    def _save_followup(self, contact_id, followup):
+        if followup != self.db_manager.get_followup(contact_id):
+            self.db_manager.set_followup(contact_id, followup)
+        self.followup_queue.refresh([contact_id])  # o status/atendente também pode ter mudado
+        self._refresh_followup_views()
+
     def save_contact(self):
         data = self._get_form_data()
-        if data:
-            self.db_manager.add_contact(data)
-            self.refresh_filter_options()
-            self.refresh_table()
+        followup = self._get_form_followup() if data else False
+        if data and followup is not False:
+            row = self.db_manager.add_contact(data)
+            if followup:
+                self._save_followup(row[0], followup)
+            self.merge_filter_options(row)
+            self.table.insert_row(row)
             self.clear_form()
             messagebox.showinfo("Sucesso", "Contato salvo com sucesso.")
     
@@ -475,11 +628,21 @@ class App(b.Window):
             return
 
         data = self._get_form_data()
-        if data:
+        followup = self._get_form_followup() if data else False
+        if data and followup is not False:
             data_with_id = data + (contact_id,)
-            self.db_manager.update_contact(data_with_id)
-            self.refresh_filter_options()
-            self.refresh_table()
+            row = self.db_manager.update_contact(data_with_id)
+            if row is None:
+                # Apagado em outra recepção (ou por outra janela) desde que foi selecionado
+                self.table.remove_rows([contact_id])
+                self.followup_queue.refresh([int(contact_id)])
+                self._refresh_followup_views()
+                self.clear_form()
+                messagebox.showwarning("Atenção", "Este contato não existe mais (foi apagado em outra recepção).")
+                return
+            self._save_followup(row[0], followup)
+            self.merge_filter_options(row)
+            self.table.update_row(row)
             messagebox.showinfo("Sucesso", "Contato atualizado com sucesso.")
 
     def delete_selected(self):
@@ -489,21 +652,24 @@ class App(b.Window):
             return
         if messagebox.askyesno("Confirmar", "Tem certeza que deseja apagar este contato?"):
             self.db_manager.delete_contact(contact_id)
-            self.refresh_filter_options()
-            self.refresh_table()
+            self.table.remove_rows([contact_id])
+            self.followup_queue.refresh([int(contact_id)])
+            self._refresh_followup_views()
             self.clear_form()
             messagebox.showinfo("Removido", "Contato apagado.")
     
     def on_double_click(self, event):
         item = self.tree.selection()
         if not item: return
-        vals = self.tree.item(item, "values")
-        (_id, name, phone, email, course, visit_date, status, monthly_fee, how_found, course_for, attended_by, notes) = vals
+        self._fill_form(self.tree.item(item, "values"))
+
+    def _fill_form(self, vals):
+        (contact_id, name, phone, email, course, visit_date, status, monthly_fee, how_found, course_for, attended_by, notes) = vals
         
-        self.var_name.set(name)
-        self.var_phone.set(phone)
-        self.var_email.set(email)
-        self.var_course.set(course)
+        self.var_name.set(name or "")
+        self.var_phone.set(phone or "")
+        self.var_email.set(email or "")
+        self.var_course.set(course or "")
         self.var_visit_date.set(visit_date or "")
         self.var_status.set(status or "Novo")
         self.var_monthly_fee.set(monthly_fee or "")
@@ -512,10 +678,12 @@ class App(b.Window):
         self.var_attended_by.set(attended_by or "")
         self.txt_notes.delete("1.0", tk.END)
         self.txt_notes.insert(tk.END, notes or "")
+        followup_date, followup_time = followup_to_form(self.db_manager.get_followup(int(contact_id)))
+        self.var_followup_date.set(followup_date)
+        self.var_followup_time.set(followup_time)
 
     def get_selected_id(self):
-        sel = self.tree.selection()
-        return self.tree.item(sel, "values")[0] if sel else None
+        return self.table.selected_id()
 
     def clear_form(self):
         self.var_name.set("")
@@ -528,11 +696,12 @@ class App(b.Window):
         self.var_how_found.set("Indicação")
         self.var_course_for.set("Próprio")
         self.var_attended_by.set("")
+        self.var_followup_date.set("")
+        self.var_followup_time.set("")
         if hasattr(self, "txt_notes"):
             self.txt_notes.delete("1.0", tk.END)
         
-        if self.tree.selection():
-            self.tree.selection_remove(self.tree.selection()[0])
+        self.table.clear_selection()
 
     def clear_filters(self):
         self.var_search.set("")
@@ -545,82 +714,158 @@ class App(b.Window):
         self.refresh_table()
 
     def sort_by(self, col, descending):
-        data = [(self.tree.set(child, col), child) for child in self.tree.get_children('')]
-        key_func = None
-        if col == "visit_date":
-            def key(v):
-                try: return datetime.datetime.strptime(v[0], DATE_FMT).date() if v[0] else datetime.date.min
-                except Exception: return datetime.date.min
-            key_func = key
-        elif col in ["id", "monthly_fee"]:
-            def key(v):
-                s = v[0]
-                if col == "monthly_fee": s = (s or "").replace(".", "").replace(",", ".")
-                try: return float(s)
-                except: return 0.0
-            key_func = key
-        else: key_func = lambda v: (v[0] or "").lower()
-        
-        data.sort(key=key_func, reverse=descending)
-        for index, (_, child) in enumerate(data):
-            self.tree.move(child, '', index)
+        self.table_order = (col, descending)
+        if isinstance(self.table.source, ContactsPageSource):
+            # Resultado grande, paginado no banco: o novo ORDER BY roda na thread de busca
+            self.refresh_table()
+        else:
+            # Ordena em memória pelo modelo da tabela (chaves calculadas uma vez por carga)
+            self.table.sort(col, descending)
         self.tree.heading(col, command=lambda: self.sort_by(col, not descending))
 
+    def _run_with_progress(self, title, text, work, on_done, cancellable=True):
+        """
+        Roda work(report, cancel) em uma thread, mostrando uma janela com
+        barra de progresso e botão Cancelar. report(fração, texto) pode ser
+        chamado pela thread; on_done(resultado, erro) roda na thread do Tk.
+        Sem cancellable a janela não tem o botão e bloqueia o restante da interface.
+        """
+        win = tk.Toplevel(self)
+        win.title(title)
+        win.geometry("460x150")
+        win.transient(self)
+        status = b.Label(win, text=text, wraplength=440)
+        status.pack(padx=10, pady=(12, 6), anchor='w')
+        bar = b.Progressbar(win, maximum=1.0, bootstyle=SUCCESS)
+        bar.pack(fill='x', padx=10)
+        cancel = threading.Event()
+        if cancellable:
+            b.Button(win, text="Cancelar", bootstyle=SECONDARY, command=cancel.set).pack(pady=10)
+            win.protocol("WM_DELETE_WINDOW", cancel.set)
+        else:
+            win.protocol("WM_DELETE_WINDOW", lambda: None)
+            win.grab_set()
+
+        latest = {"progress": None}
+        result = {}
+
+        def report(fraction, message):
+            latest["progress"] = (fraction, message)
+
+        def run():
+            try:
+                result["value"] = work(report, cancel)
+            except Exception as e:
+                result["error"] = e
+
+        def poll():
+            if latest["progress"] is not None:
+                fraction, message = latest["progress"]
+                bar.configure(value=fraction)
+                status.configure(text=message + (" - cancelando..." if cancel.is_set() else ""))
+            if worker.is_alive():
+                self.after(100, poll)
+                return
+            win.destroy()
+            on_done(result.get("value"), result.get("error"))
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        self.after(100, poll)
+
+    def import_spreadsheet(self):
+        from importer import ContactImporter, ImportFileError  # carregado só quando usado
+        path = filedialog.askopenfilename(
+            title="Importar contatos de planilha",
+            filetypes=[("Planilhas", "*.csv *.xlsx"), ("CSV", "*.csv"), ("Excel", "*.xlsx")]
+        )
+        if not path: return
+        importer = ContactImporter(self.db_manager, path)
+        checkpoint = self.db_manager.get_import_checkpoint(importer.source)
+        resume_note = f" (retomando da linha {checkpoint[0] + 1})" if checkpoint else ""
+
+        def work(report, cancel):
+            return importer.run(progress=lambda n, frac: report(frac, f"{n} linhas processadas"), cancel=cancel)
+
+        def done(summary, error):
+            self.refresh_filter_options()
+            self.refresh_table()
+            if error is not None:
+                detail = str(error) if isinstance(error, ImportFileError) else f"Falha na importação:\n{error}"
+                messagebox.showerror("Importação", detail)
+                return
+            text = (f"{summary['imported']} contatos importados, {summary['rejected']} linhas rejeitadas "
+                    f"({summary['rows_per_s']} linhas/s).")
+            if summary["rejects_path"]:
+                text += f"\n\nLinhas rejeitadas e motivos em:\n{summary['rejects_path']}"
+            if summary["cancelled"]:
+                text = "Importação interrompida. Importe o mesmo arquivo novamente para continuar.\n\n" + text
+            messagebox.showinfo("Importação", text)
+
+        self._run_with_progress("Importando contatos", f"Lendo {os.path.basename(path)}{resume_note}...", work, done)
+
     def export_csv(self):
-        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")], title="Salvar lista como CSV")
+        from exporter import ContactExporter, ExportFileError  # carregado só quando usado
+        path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("CSV compactado (gzip)", "*.csv.gz"), ("Parquet", "*.parquet")],
+            title="Salvar lista como CSV"
+        )
         if not path: return
-        filters = self.build_filters()
-        rows = self.db_manager.get_contacts(filters)
-        
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f, delimiter=";")
-            w.writerow([label for _, label in COLUMNS])
-            w.writerows(rows)
-        messagebox.showinfo("Exportado", f"Arquivo CSV salvo em:\n{path}")
+        # Mesmo filtro e mesma ordenação da tabela na tela
+        exporter = ContactExporter(self.db_manager, path, self.build_filters(), self.table_order)
+
+        def work(report, cancel):
+            return exporter.run(progress=lambda n, total: report(n / total if total else 1.0, f"{n} de {total} contatos exportados"), cancel=cancel)
+
+        def done(summary, error):
+            if error is not None:
+                detail = str(error) if isinstance(error, ExportFileError) else f"Falha na exportação:\n{error}"
+                messagebox.showerror("Exportação", detail)
+            elif summary["cancelled"]:
+                messagebox.showinfo("Exportação", "Exportação cancelada; nenhum arquivo foi gravado.")
+            else:
+                messagebox.showinfo("Exportado", f"{summary['rows']} contatos salvos em:\n{path}")
+
+        self._run_with_progress("Exportando contatos", "Exportando...", work, done)
     
     def backup_database(self):
         """
-        Cria uma cópia de segurança do arquivo do banco de dados em um local
-        escolhido pelo usuário.
+        Cria uma cópia de segurança do banco de dados em um local escolhido pelo
+        usuário, pela API de backup do SQLite e em segundo plano.
         """
-        try:
-            # Determina o caminho do executável para encontrar o contacts.db
-            if getattr(sys, 'frozen', False):
-                # Se estiver rodando como um executável (congelado pelo PyInstaller)
-                source_dir = os.path.dirname(sys.executable)
-            else:
-                # Se estiver rodando como um script .py normal
-                source_dir = os.path.dirname(os.path.abspath(__file__))
-
-            source_path = os.path.join(source_dir, DB_FILE)
-
-            if not os.path.exists(source_path):
-                messagebox.showerror("Erro", f"Arquivo do banco de dados não encontrado em:\n{source_path}")
-                return
+        # Gera um nome de arquivo de backup com data e hora
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H%M")
+        suggested_filename = f"backup_contacts_{timestamp}.db"
+
+        # Abre a janela "Salvar como..." para o usuário escolher o destino
+        destination_path = filedialog.asksaveasfilename(
+            title="Salvar backup do banco de dados como...",
+            initialfile=suggested_filename,
+            defaultextension=".db",
+            filetypes=[("Database files", "*.db"), ("Compactado (gzip)", "*.db.gz"), ("All files", "*.*")]
+        )
 
-            # Gera um nome de arquivo de backup com data e hora
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H%M")
-            suggested_filename = f"backup_contacts_{timestamp}.db"
+        # Se o usuário clicou em "Cancelar", o caminho estará vazio
+        if not destination_path:
+            return
 
-            # Abre a janela "Salvar como..." para o usuário escolher o destino
-            destination_path = filedialog.asksaveasfilename(
-                title="Salvar backup do banco de dados como...",
-                initialfile=suggested_filename,
-                defaultextension=".db",
-                filetypes=[("Database files", "*.db"), ("All files", "*.*")]
+        def work(report, cancel):
+            return self.backup_service.backup_to(
+                destination_path, compress=destination_path.lower().endswith(".gz"),
+                progress=lambda done, total: report(done / total if total else 1.0, f"{done} de {total} páginas copiadas"),
+                cancel=cancel,
             )
 
-            # Se o usuário clicou em "Cancelar", o caminho estará vazio
-            if not destination_path:
-                return
-
-            # Copia o arquivo do banco de dados para o destino escolhido
-            shutil.copy2(source_path, destination_path)
-            
-            messagebox.showinfo("Backup Concluído", f"Backup salvo com sucesso em:\n{destination_path}")
+        def done(result, error):
+            if isinstance(error, BackupCancelled):
+                messagebox.showinfo("Backup", "Backup cancelado; nenhum arquivo foi gravado.")
+            elif error is not None:
+                messagebox.showerror("Erro no Backup", f"Ocorreu um erro inesperado ao tentar criar o backup:\n{error}")
+            else:
+                messagebox.showinfo("Backup Concluído", f"Backup verificado e salvo com sucesso em:\n{destination_path}")
 
-        except Exception as e:
-            messagebox.showerror("Erro no Backup", f"Ocorreu um erro inesperado ao tentar criar o backup:\n{e}")
+        self._run_with_progress("Backup do banco de dados", "Copiando o banco de dados...", work, done)
         
     def show_about(self):
         messagebox.showinfo(
@@ -684,10 +929,54 @@ class App(b.Window):
         entry_widget.bind("<KeyRelease>", on_keyrelease)
         entry_widget.bind("<FocusOut>", on_focusout)
 
+    # --- FILA DE RETORNOS ---
+    def _update_followup_button(self):
+        due = self.followup_queue.due_count()
+        self.btn_followups.configure(text=f"Retornos ({due})" if due else "Retornos",
+                                     bootstyle=WARNING if due else "warning-outline")
+
+    def _refresh_followup_views(self):
+        self._update_followup_button()
+        if self.followup_window is not None:
+            self.followup_window.refresh()
+
+    def _on_followups_due(self, fired):
+        """Chamado pelo timer da fila: chegou a hora de algum retorno (ou virou o dia)."""
+        if self._is_closing:
+            return
+        self._refresh_followup_views()
+        if fired:
+            self.bell()
+
+    def show_followup_queue(self):
+        if self.followup_window is not None:
+            self.followup_window.win.lift()
+            return
+        self.followup_window = FollowupWindow(self)
+
+    def show_diagnostics(self):
+        if not diagnostics.enabled:
+            messagebox.showinfo("Diagnóstico", "O diagnóstico de lentidão está desligado. Para usá-lo, defina "
+                                "DIAGNOSTICS_ENABLED = True no config.py e abra o programa de novo.")
+            return
+        if self.diagnostics_window is not None:
+            self.diagnostics_window.win.lift()
+            return
+        self.diagnostics_window = DiagnosticsWindow(self)
+
+    def open_contact(self, contact_id):
+        """Mostra o contato no formulário e o seleciona na tabela, se ele estiver no resultado atual."""
+        with self.db_manager.pool.reader() as con:
+            row = self.db_manager.get_contact(con, contact_id)
+        if row is None:
+            return False
+        self._fill_form(row)
+        self.notebook.select(self.tab_cadastro)
+        return self.table.select_id(contact_id)
+
     # --- MÉTODOS DE RELATÓRIO E DUPLICADOS ---
+    @timed("update_all_reports")
     def update_all_reports(self):
-        df = self.db_manager.get_data_as_dataframe()
-        
         from_str = self.var_report_from.get()
         to_str = self.var_report_to.get()
         
@@ -699,60 +988,93 @@ class App(b.Window):
                 messagebox.showerror("Data Inválida", f"A data 'Até' ('{to_str}') é inválida. Use o formato DD/MM/AAAA.")
                 return
 
-        df_filtered = self.report_generator.get_filtered_data(
-            df, self.report_period.get(), from_str, to_str,
+        # Os gráficos são calculados a partir do resumo diário (custo proporcional ao número de dias)
+        start_date, end_date = self.report_generator.resolve_period(self.report_period.get(), from_str, to_str)
+        report_filters = (
+            start_date.strftime("%Y-%m-%d") if start_date is not None else None,
+            end_date.strftime("%Y-%m-%d") if end_date is not None else None,
+            self.var_report_att.get(), self.var_report_course.get()
+        )
+        self.update_revenue_panel(self.db_manager.get_revenue_kpis(*report_filters))
+        # Filtros já vistos (com o banco inalterado) vêm do cache, sem reler o resumo nem usar o pandas
+        inputs = self.report_generator.get_chart_inputs(
+            self.db_manager.get_rollup_dataframe, self.db_manager.data_version(),
+            self.report_period.get(), from_str, to_str,
             self.var_report_att.get(), self.var_report_course.get()
         )
-        
-        self.report_generator.update_visits_enrollments_chart(self.ax1, self.fig1, df_filtered)
-        self.report_generator.update_status_distribution_chart(self.ax2, self.fig2, df_filtered)
-        self.report_generator.update_lead_source_chart(self.ax3, self.fig3, df_filtered)
-        self.report_generator.update_top_courses_chart(self.ax4, self.fig4, df_filtered)
-
-    def check_duplicates(self):
-        df = self.db_manager.get_data_as_dataframe()
-        if df.empty:
-            messagebox.showinfo("Deduplicação", "Nenhum contato na base de dados.")
-            return
-
-        df['phone_digits'] = df['phone'].apply(_only_digits)
-        df_phone = df[df['phone_digits'] != '']
-        df_email = df[df['email'].str.strip() != ''].dropna(subset=['email'])
 
-        phone_dupes = df_phone[df_phone.duplicated(subset=['phone_digits'], keep=False)]
-        email_dupes = df_email[df_email.duplicated(subset=['email'], keep=False)]
+        # Atualiza os artistas no lugar e renderiza os quatro gráficos fora da thread do Tk
+        self.chart_renderer.render([
+            ("visits_enrollments", self.ax1, self.fig1),
+            ("status", self.ax2, self.fig2),
+            ("lead_source", self.ax3, self.fig3),
+            ("top_courses", self.ax4, self.fig4),
+        ], inputs)
 
-        all_dupes = pd.concat([phone_dupes, email_dupes]).drop_duplicates(subset=['id']).sort_values('phone_digits')
+    def check_duplicates(self):
+        from dedupe import DedupeEngine  # carregado só quando o verificador é aberto
+        engine = DedupeEngine()
+        result = {}
+
+        def work():
+            try:
+                result["clusters"] = engine.find_clusters(self.db_manager.get_dedupe_rows())
+            except Exception as e:
+                result["error"] = e
+
+        def poll():
+            if worker.is_alive():
+                self.after(100, poll)
+                return
+            self.configure(cursor="")
+            if "error" in result:
+                messagebox.showerror("Deduplicação", f"Falha ao procurar duplicados:\n{result['error']}")
+            elif engine.last_stats.get("contacts", 0) == 0:
+                messagebox.showinfo("Deduplicação", "Nenhum contato na base de dados.")
+            elif not result["clusters"]:
+                messagebox.showinfo("Deduplicação", "Nenhum contato duplicado encontrado.")
+            else:
+                self.show_duplicate_manager(result["clusters"])
 
-        if all_dupes.empty:
-            messagebox.showinfo("Deduplicação", "Nenhum contato duplicado encontrado.")
-            return
-        
-        self.show_duplicate_manager(all_dupes)
+        # A comparação roda em uma thread para não travar a janela em bases grandes
+        self.configure(cursor="watch")
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        self.after(100, poll)
 
-    def show_duplicate_manager(self, df_dupes):
+    def show_duplicate_manager(self, clusters):
         win = tk.Toplevel(self)
         win.title("Gerenciador de Contatos Duplicados")
-        win.geometry("800x600")
+        win.geometry("900x600")
 
-        b.Label(win, text="Foram encontrados os seguintes contatos duplicados. Selecione os que deseja apagar.", wraplength=780, justify='left').pack(padx=10, pady=10)
+        b.Label(win, text=f"Foram encontrados {len(clusters)} grupos de possíveis duplicados (score de 0 a 1, maior = mais parecido). Selecione os contatos que deseja apagar.", wraplength=880, justify='left').pack(padx=10, pady=10)
 
         tree_frame = b.Frame(win)
         tree_frame.pack(expand=True, fill='both', padx=10, pady=5)
         
-        cols_dupe = ["id", "name", "phone", "email"]
-        tree_dupe = b.Treeview(tree_frame, columns=cols_dupe, show='headings', bootstyle=PRIMARY)
+        cols_dupe = ["id", "name", "phone", "email", "score"]
+        tree_dupe = b.Treeview(tree_frame, columns=cols_dupe, show='tree headings', bootstyle=PRIMARY)
         tree_dupe.pack(side='left', expand=True, fill='both')
+        vsb = b.Scrollbar(tree_frame, orient="vertical", command=tree_dupe.yview)
+        vsb.pack(side='right', fill='y')
+        tree_dupe.configure(yscrollcommand=vsb.set)
 
+        tree_dupe.column("#0", width=120, stretch=False)
         for col in cols_dupe:
             tree_dupe.heading(col, text=col.capitalize())
             tree_dupe.column(col, width=150)
+        tree_dupe.column("id", width=70, stretch=False)
+        tree_dupe.column("score", width=70, stretch=False)
         
-        for index, row in df_dupes.iterrows():
-            tree_dupe.insert("", "end", values=(row['id'], row['name'], row['phone'], row['email']))
+        for n, cluster in enumerate(clusters, start=1):
+            group = tree_dupe.insert("", "end", text=f"Grupo {n}", open=True,
+                                     values=("", f"{len(cluster['members'])} contatos", "", "", f"{cluster['score']:.2f}"))
+            for contact_id, name, phone, email, score in cluster["members"]:
+                tree_dupe.insert(group, "end", values=(contact_id, name, phone, email, f"{score:.2f}"))
 
         def delete_selected_dupes():
-            selected_items = tree_dupe.selection()
+            # Só as linhas de contato (filhas de um grupo) podem ser apagadas
+            selected_items = [item for item in tree_dupe.selection() if tree_dupe.parent(item)]
             if not selected_items:
                 messagebox.showwarning("Atenção", "Nenhum item selecionado para apagar.", parent=win)
                 return
@@ -763,9 +1085,240 @@ class App(b.Window):
                 deleted_count = self.db_manager.delete_contacts_by_ids(ids_to_delete)
                 messagebox.showinfo("Sucesso", f"{deleted_count} contatos apagados.", parent=win)
                 win.destroy()
-                self.refresh_table()
+                self.table.remove_rows(ids_to_delete)
+                self.followup_queue.refresh(ids_to_delete)
+                self._refresh_followup_views()
         
         btn_frame = b.Frame(win)
         btn_frame.pack(pady=10)
         b.Button(btn_frame, text="Apagar Selecionados", command=delete_selected_dupes, bootstyle=DANGER).pack(side='left', padx=5)
-        b.Button(btn_frame, text="Fechar", command=win.destroy, bootstyle=SECONDARY).pack(side='left', padx=5)
\ No newline at end of file
+        b.Button(btn_frame, text="Fechar", command=win.destroy, bootstyle=SECONDARY).pack(side='left', padx=5)
+
+class FollowupWindow:
+    """
+    Painel da fila de retornos: atrasados e de hoje (ou todos os agendados),
+    por atendente. As linhas vêm da FollowupQueue em memória e são exibidas
+    pelo VirtualTreeview, então milhares de retornos abrem na hora.
+    """
+    COLUMNS = [("situation", "Situação", 90), ("when", "Retorno", 130), ("name", "Nome", 220),
+               ("phone", "Telefone", 130), ("status", "Status", 140), ("attended_by", "Atendente", 130)]
+
+    def __init__(self, app):
+        self.app = app
+        self.queue = app.followup_queue
+        self.win = tk.Toplevel(app)
+        self.win.title("Fila de Retornos")
+        self.win.geometry("900x560")
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.var_att = tk.StringVar(value="Todos")
+        self.var_only_due = tk.BooleanVar(value=True)
+        top = b.Frame(self.win, padding=(10, 10, 10, 0))
+        top.pack(fill=tk.X)
+        b.Label(top, text="Atendente:").pack(side=tk.LEFT)
+        self.cb_att = b.Combobox(top, textvariable=self.var_att, state="readonly", width=20)
+        self.cb_att.pack(side=tk.LEFT, padx=(4, 12))
+        self.cb_att.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+        b.Checkbutton(top, text="Só atrasados e de hoje", variable=self.var_only_due,
+                      command=self.refresh, bootstyle="round-toggle").pack(side=tk.LEFT)
+        self.lbl_count = b.Label(top, text="")
+        self.lbl_count.pack(side=tk.RIGHT)
+
+        frame = b.Frame(self.win, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        frame.rowconfigure(0, weight=1)
+        frame.columnconfigure(0, weight=1)
+        # O id (primeira coluna, usada como iid pelo VirtualTreeview) fica oculto
+        keys = [c for c, _, _ in self.COLUMNS]
+        self.tree = b.Treeview(frame, columns=["id"] + keys, displaycolumns=keys, show="headings",
+                               selectmode="browse", bootstyle=PRIMARY)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        vsb = b.Scrollbar(frame, orient="vertical", bootstyle="round-primary")
+        vsb.grid(row=0, column=1, sticky="ns")
+        for key, label, width in self.COLUMNS:
+            self.tree.heading(key, text=label)
+            self.tree.column(key, width=width, anchor=tk.W)
+        self.table = VirtualTreeview(self.tree, vsb)
+        self.tree.bind("<Double-1>", lambda e: self.open_selected())
+
+        btns = b.Frame(self.win, padding=(10, 0, 10, 10))
+        btns.pack(fill=tk.X)
+        b.Button(btns, text="Abrir Contato", command=self.open_selected, bootstyle=PRIMARY).pack(side=tk.LEFT)
+        b.Button(btns, text="Concluir Retorno", command=self.complete_selected, bootstyle=SUCCESS).pack(side=tk.LEFT, padx=6)
+        b.Button(btns, text="Adiar 1 Dia", command=self.postpone_selected, bootstyle="info-outline").pack(side=tk.LEFT)
+        b.Button(btns, text="Fechar", command=self.close, bootstyle=SECONDARY).pack(side=tk.RIGHT)
+        self.refresh()
+
+    def refresh(self):
+        self.cb_att["values"] = ["Todos"] + self.queue.attendants()
+        att = self.var_att.get()
+        rows = self.queue.rows(None if att == "Todos" else att, self.var_only_due.get())
+        self.table.set_source(FollowupListSource(rows), keep_position=True)
+        self.lbl_count.configure(text=f"{len(rows)} retorno(s)")
+
+    def _selected(self):
+        contact_id = self.table.selected_id()
+        if not contact_id:
+            messagebox.showwarning("Atenção", "Selecione um retorno na lista.", parent=self.win)
+            return None
+        return int(contact_id)
+
+    def open_selected(self):
+        contact_id = self._selected()
+        if contact_id is None:
+            return
+        if not self.app.open_contact(contact_id):
+            messagebox.showinfo("Retorno", "O contato foi carregado no formulário, mas não está no resultado "
+                                "atual da tabela. Limpe os filtros para selecioná-lo.", parent=self.win)
+
+    def complete_selected(self):
+        contact_id = self._selected()
+        if contact_id is not None:
+            self.app.db_manager.set_followup(contact_id, None)
+            self._changed(contact_id)
+
+    def postpone_selected(self):
+        contact_id = self._selected()
+        if contact_id is None:
+            return
+        when = self.app.db_manager.get_followup(contact_id)
+        # Um dia depois do retorno, ou de hoje (no mesmo horário) se ele já passou
+        moment = datetime.datetime.strptime(when, FOLLOWUP_FMT) if when else datetime.datetime.now()
+        today = datetime.datetime.now().replace(hour=moment.hour, minute=moment.minute, second=0, microsecond=0)
+        self.app.db_manager.set_followup(contact_id, (max(moment, today) + datetime.timedelta(days=1)).strftime(FOLLOWUP_FMT))
+        self._changed(contact_id)
+
+    def _changed(self, contact_id):
+        self.queue.refresh([contact_id])
+        self.app._refresh_followup_views()
+
+    def close(self):
+        self.app.followup_window = None
+        self.win.destroy()
+
+class DiagnosticsWindow:
+    """
+    Janela oculta (Ctrl+Shift+D) com o registro de diagnostics.py: resumo por
+    operação, últimos eventos e consultas lentas com o plano de execução.
+    "Exportar JSON" grava tudo, com as métricas da busca e dos gráficos, para
+    enviar ao suporte.
+    """
+    SHOWN_EVENTS = 1000
+
+    def __init__(self, app):
+        self.app = app
+        self.win = tk.Toplevel(app)
+        self.win.title("Diagnóstico de Desempenho")
+        self.win.geometry("1100x640")
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+        top = b.Frame(self.win, padding=(10, 10, 10, 0))
+        top.pack(fill=tk.X)
+        self.lbl_info = b.Label(top, text="")
+        self.lbl_info.pack(side=tk.LEFT)
+        b.Button(top, text="Exportar JSON...", command=self.export, bootstyle=PRIMARY).pack(side=tk.RIGHT)
+        b.Button(top, text="Limpar", command=self.clear, bootstyle="secondary-outline").pack(side=tk.RIGHT, padx=6)
+        b.Button(top, text="Atualizar", command=self.refresh, bootstyle="info-outline").pack(side=tk.RIGHT)
+
+        notebook = b.Notebook(self.win)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.tree_summary = self._tree(notebook, "  Resumo  ", [
+            ("kind", "Tipo", 50), ("name", "Operação", 340), ("count", "Vezes", 70), ("p50", "Mediana (ms)", 100),
+            ("p95", "p95 (ms)", 90), ("max", "Máximo (ms)", 100), ("total", "Total (ms)", 100)])
+        self.tree_events = self._tree(notebook, "  Eventos  ", [
+            ("at", "Hora", 100), ("kind", "Tipo", 50), ("name", "Operação", 240), ("ms", "ms", 80),
+            ("rows", "Linhas", 70), ("params", "Parâmetros", 160), ("sql", "SQL", 500)])
+
+        slow = b.Frame(notebook)
+        notebook.add(slow, text="  Consultas lentas  ")
+        self.tree_slow = self._tree(slow, None, [
+            ("at", "Hora", 100), ("ms", "ms", 80), ("rows", "Linhas", 70), ("name", "Operação", 220), ("sql", "SQL", 600)])
+        self.tree_slow.bind("<<TreeviewSelect>>", lambda e: self._show_plan())
+        self.txt_plan = tk.Text(slow, height=10, wrap="word", font=("Consolas", 9))
+        self.txt_plan.pack(fill=tk.X, pady=(6, 0))
+        self._slow = []
+
+        b.Button(self.win, text="Fechar", command=self.close, bootstyle=SECONDARY).pack(side=tk.RIGHT, padx=10, pady=(0, 10))
+        self.refresh()
+
+    def _tree(self, parent, tab_text, columns):
+        frame = b.Frame(parent)
+        if tab_text is not None:
+            parent.add(frame, text=tab_text)
+        else:
+            frame.pack(fill=tk.BOTH, expand=True)
+        tree = b.Treeview(frame, columns=[c for c, _, _ in columns], show="headings", bootstyle=PRIMARY)
+        vsb = b.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        for key, label, width in columns:
+            tree.heading(key, text=label)
+            tree.column(key, width=width, anchor=tk.W, stretch=key in ("name", "sql"))
+        return tree
+
+    def refresh(self):
+        for tree in (self.tree_summary, self.tree_events, self.tree_slow):
+            tree.delete(*tree.get_children())
+        summary = diagnostics.summary()
+        for g in summary:
+            self.tree_summary.insert("", "end", values=(g["kind"], g["name"], g["count"], g["p50_ms"],
+                                                        g["p95_ms"], g["max_ms"], g["total_ms"]))
+        events = list(diagnostics.events)
+        for e in reversed(events[-self.SHOWN_EVENTS:]):
+            self.tree_events.insert("", "end", values=(e["at"][11:], e["kind"], e["name"], e["ms"],
+                                                       "" if e.get("rows") is None else e["rows"],
+                                                       e.get("params", ""), e.get("sql", "")))
+        self._slow = list(reversed(diagnostics.slow_queries))
+        for i, e in enumerate(self._slow):
+            self.tree_slow.insert("", "end", iid=str(i), values=(e["at"][11:], e["ms"],
+                                                                 "" if e.get("rows") is None else e["rows"],
+                                                                 e["name"], e.get("sql", "")))
+        self.txt_plan.delete("1.0", tk.END)
+        self.lbl_info.configure(text=f"{len(events)} eventos em memória (máx. {diagnostics.events.maxlen}) · "
+                                     f"{len(self._slow)} consultas acima de {diagnostics.slow_ms} ms")
+
+    def _show_plan(self):
+        selected = self.tree_slow.selection()
+        if not selected:
+            return
+        e = self._slow[int(selected[0])]
+        self.txt_plan.delete("1.0", tk.END)
+        self.txt_plan.insert("1.0", f"{e.get('sql', '')}\n\nParâmetros: {e.get('params', '')}\n\n"
+                                    f"Plano (EXPLAIN QUERY PLAN):\n{e.get('plan') or '(não disponível)'}")
+
+    def _extra(self):
+        """Contexto do JSON exportado: banco em uso e métricas da busca e dos gráficos."""
+        db_manager = self.app.db_manager
+        extra = {
+            "database": {"remote": db_manager.is_remote,
+                         "location": db_manager.base_url if db_manager.is_remote else os.path.abspath(db_manager.db_file)},
+            "search": self.app.search_pipeline.stats(),
+            "charts": self.app.chart_renderer.last_timings if self.app.chart_renderer is not None else {},
+            "report_cache": self.app.report_generator.cache_stats() if self.app.report_generator is not None else {},
+        }
+        if db_manager.is_remote:
+            extra["database"].update(requests=db_manager.requests, not_modified=db_manager.not_modified)
+        return extra
+
+    def export(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.win, title="Exportar diagnóstico", defaultextension=".json",
+            filetypes=[("JSON", "*.json")],
+            initialfile=f"diagnostico_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+        if not path:
+            return
+        try:
+            diagnostics.export_json(path, self._extra())
+        except OSError as e:
+            messagebox.showerror("Erro", f"Falha ao gravar o diagnóstico:\n{e}", parent=self.win)
+            return
+        messagebox.showinfo("Diagnóstico", f"Diagnóstico gravado em:\n{path}", parent=self.win)
+
+    def clear(self):
+        diagnostics.clear()
+        self.refresh()
+
+    def close(self):
+        self.app.diagnostics_window = None
+        self.win.destroy()
@@ -4,8 +4,10 @@ import datetime
 import os
 import sys
 
+_NON_DIGITS = re.compile(r"\D")
+
 def _only_digits(s: str) -> str:
-    return re.sub(r"\D", "", s or "")
+    return _NON_DIGITS.sub("", s or "")
 
 def format_ddmmyyyy_from_digits(s: str) -> str | None:
     digits = _only_digits(s)
@@ -18,9 +20,18 @@ def format_ddmmyyyy_from_digits(s: str) -> str | None:
     except Exception:
         return None
 
+def ddmmyyyy_to_iso(s: str) -> str | None:
+    s = (s or "").strip()
+    if not s: return None
+    norm = format_ddmmyyyy_from_digits(s)
+    if norm: s = norm
+    try:
+        return datetime.datetime.strptime(s, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
 def format_br_phone_from_digits(s: str) -> str | None:
-    d = re.sub(r"\D", "", s or "")
-    d = d[:11]
+    d = _only_digits(s)[:11]
     if len(d) == 11: return f"({d[0:2]}) {d[2:7]}-{d[7:]}"
     if len(d) == 10: return f"({d[0:2]}) {d[2:6]}-{d[6:]}"
     if len(d) == 9: return f"{d[0:5]}-{d[5:]}"
@@ -36,6 +47,136 @@ def normalize_money(s: str) -> str:
     except (ValueError, TypeError):
         return ""
 
+def money_to_cents(s: str) -> int | None:
+    s = (s or "").strip().replace("R$", "").replace(".", "").replace(",", ".")
+    if not s: return None
+    try:
+        return int(round(float(s) * 100))
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+def format_cents(cents: int | None) -> str:
+    """Centavos no formato de normalize_money (123456 -> "1.234,56")."""
+    if cents is None: return ""
+    return f"{cents / 100:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+# --- Versões em lote (coluna inteira de uma vez) ---
+# Recebem uma pandas.Series (devolvem uma Series com o mesmo índice) ou uma
+# sequência/array NumPy (devolvem um array de objetos) e dão o mesmo resultado
+# das funções acima aplicadas valor a valor; valores ausentes (None/NaN) contam
+# como texto vazio. Telefones e datas são tratados como matrizes de códigos de
+# caracteres no NumPy; textos longos ou fora do ASCII (raros) seguem pela
+# função de um valor.
+
+_BATCH_TEXT_WIDTH = 32
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def _batch_texts(values):
+    """(array de objetos com os textos, função que devolve o resultado no tipo da entrada)."""
+    import numpy as np
+    import pandas as pd  # importado sob demanda para não pesar na abertura do app
+    if isinstance(values, pd.Series):
+        wrap = lambda out: pd.Series(out, index=values.index, name=values.name, dtype=object)
+    else:
+        wrap = lambda out: out
+    texts = np.asarray(values, dtype=object).ravel()
+    return np.where(pd.isna(texts), "", texts), wrap
+
+def _batch_digits(values, vector, scalar):
+    """
+    Roda vector(dígitos, quantidade) nos textos curtos em ASCII, onde dígitos é a
+    matriz de códigos dos dígitos de cada texto alinhados à esquerda, e scalar
+    nos demais.
+    """
+    import numpy as np
+    texts, wrap = _batch_texts(values)
+    out = np.empty(len(texts), dtype=object)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    fast = lengths <= _BATCH_TEXT_WIDTH
+    width = max(1, int(lengths[fast].max(initial=0)))
+    codes = np.asarray(texts[fast], dtype=f"U{width}").view(np.uint32).reshape(-1, width)
+    ascii_rows = (codes < 128).all(axis=1)
+    fast[fast] = ascii_rows  # \D do re também reconhece dígitos de outras escritas
+    codes = codes[ascii_rows]
+    is_digit = (codes >= 48) & (codes <= 57)
+    # Cada dígito vai para a coluna igual à quantidade de dígitos antes dele na linha
+    rows, cols = np.nonzero(is_digit)
+    digits = np.zeros_like(codes)
+    digits[rows, np.cumsum(is_digit, axis=1)[rows, cols] - 1] = codes[rows, cols]
+    out[fast] = vector(digits, is_digit.sum(axis=1))
+    out[~fast] = [scalar(t) for t in texts[~fast]]
+    return wrap(out)
+
+def _fill_template(digits, template):
+    """Monta textos a partir de um modelo: int = posição do dígito, str = caractere fixo."""
+    import numpy as np
+    out = np.zeros((len(digits), len(template)), dtype=np.uint32)
+    for k, part in enumerate(template):
+        out[:, k] = ord(part) if isinstance(part, str) else digits[:, part]
+    return out.view(f"U{len(template)}").ravel().astype(object)
+
+def _as_text(digits, _count):
+    return digits.view(f"U{digits.shape[1]}").ravel().astype(object)
+
+def only_digits_batch(values):
+    return _batch_digits(values, _as_text, _only_digits)
+
+# Modelos de format_br_phone_from_digits por quantidade de dígitos
+_PHONE_TEMPLATES = {
+    11: ("(", 0, 1, ")", " ", 2, 3, 4, 5, 6, "-", 7, 8, 9, 10),
+    10: ("(", 0, 1, ")", " ", 2, 3, 4, 5, "-", 6, 7, 8, 9),
+    9: (0, 1, 2, 3, 4, "-", 5, 6, 7, 8),
+    8: (0, 1, 2, 3, "-", 4, 5, 6, 7),
+}
+
+def _phones(digits, count):
+    import numpy as np
+    out = np.full(len(digits), None, dtype=object)
+    count = np.minimum(count, 11)
+    for size, template in _PHONE_TEMPLATES.items():
+        rows = count == size
+        if rows.any():
+            out[rows] = _fill_template(digits[rows], template)
+    return out
+
+def format_br_phone_batch(values):
+    return _batch_digits(values, _phones, format_br_phone_from_digits)
+
+def _dates(digits, count):
+    import numpy as np
+    out = np.full(len(digits), None, dtype=object)
+    rows = count == 8
+    if not rows.any():
+        return out
+    n = digits[rows, :8].astype(np.int64) - 48
+    d, m, y = n[:, 0] * 10 + n[:, 1], n[:, 2] * 10 + n[:, 3], n[:, 4] * 1000 + n[:, 5] * 100 + n[:, 6] * 10 + n[:, 7]
+    leap = (y % 4 == 0) & ((y % 100 != 0) | (y % 400 == 0))
+    last_day = np.asarray(_DAYS_IN_MONTH)[np.clip(m, 0, 12)] + ((m == 2) & leap)
+    valid = (y >= 1) & (m >= 1) & (m <= 12) & (d >= 1) & (d <= last_day)  # as mesmas regras do datetime
+    formatted = np.full(len(n), None, dtype=object)
+    formatted[valid] = _fill_template(digits[rows][valid], (0, 1, "/", 2, 3, "/", 4, 5, 6, 7))
+    out[rows] = formatted
+    return out
+
+def format_ddmmyyyy_batch(values):
+    return _batch_digits(values, _dates, format_ddmmyyyy_from_digits)
+
+def _batch_distinct(values, func):
+    """Aplica func uma vez por valor distinto (mensalidades se repetem muito)."""
+    import numpy as np
+    import pandas as pd
+    texts, wrap = _batch_texts(values)
+    codes, distinct = pd.factorize(texts)
+    results = np.empty(len(distinct), dtype=object)
+    results[:] = [func(v) for v in distinct]
+    return wrap(results[codes])
+
+def normalize_money_batch(values):
+    return _batch_distinct(values, normalize_money)
+
+def money_to_cents_batch(values):
+    return _batch_distinct(values, money_to_cents)
+
 def resource_path(relative_path: str) -> str:
     """ Retorna o caminho absoluto para o recurso, funciona para dev e para PyInstaller """
     try:
@@ -0,0 +1,201 @@
+# virtual_table.py
+import tkinter as tk
+
+class VirtualTreeview:
+    """
+    Exibe uma fonte de linhas grande em um Treeview sem materializar todas elas:
+    apenas as linhas visíveis viram itens do Treeview, e a barra de rolagem
+    vertical é controlada aqui a partir do total de linhas da fonte.
+
+    Cada item usa o id do contato como iid, e a seleção é preservada por id
+    enquanto o usuário rola a tabela.
+    """
+    def __init__(self, tree, vsb, rowheight=25):
+        self.tree = tree
+        self.vsb = vsb
+        self.rowheight = rowheight
+        self.source = None
+        self.top = 0
+        self.visible_rows = 1
+        self._selected_id = None
+        self._window_ids = []
+
+        self.vsb.configure(command=self.yview)
+        self.tree.bind("<Configure>", self._on_configure, add="+")
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self._on_page(-1))
+        self.tree.bind("<Next>", lambda e: self._on_page(1))
+
+    def set_source(self, source, keep_position=False):
+        self.source = source
+        if not keep_position:
+            self.top = 0
+        self.render()
+
+    def total(self):
+        return self.source.count() if self.source else 0
+
+    def selected_id(self):
+        self._sync_selection()
+        return self._selected_id
+
+    def clear_selection(self):
+        self._selected_id = None
+        if self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+    def render(self):
+        """Redesenha apenas a janela visível [top, top + visible_rows)."""
+        self._sync_selection()
+        total = self.total()
+        self.top = max(0, min(self.top, total - self.visible_rows))
+        rows = self.source.rows(self.top, self.top + self.visible_rows) if self.source else []
+
+        children = self.tree.get_children("")
+        if children:
+            self.tree.delete(*children)
+        self._window_ids = []
+        for row in rows:
+            iid = str(row[0])
+            self.tree.insert("", tk.END, iid=iid, values=row)
+            self._window_ids.append(iid)
+
+        if self._selected_id in self._window_ids:
+            self.tree.selection_set(self._selected_id)
+        self._update_scrollbar()
+
+    def sort(self, col, descending):
+        """Reordena a fonte em memória e volta ao topo, sem consultar o banco."""
+        if self.source is None:
+            return
+        self._sync_selection()
+        self.source.sort(col, descending)
+        self.top = 0
+        self.render()
+
+    def select_id(self, contact_id):
+        """Rola até o contato e o seleciona. Devolve False se ele não está na fonte."""
+        index = self.source.index_of(contact_id) if self.source else None
+        if index is None:
+            return False
+        if not self.top <= index < self.top + self.visible_rows:
+            self.top = max(0, index - self.visible_rows // 2)
+        self._selected_id = str(contact_id)
+        self.render()
+        self.tree.see(self._selected_id)
+        return True
+
+    # --- Atualizações incrementais: só a janela visível é redesenhada ---
+    def insert_row(self, row):
+        if self.source is None:
+            return
+        index = self.source.insert_row(row)
+        if index is None:
+            return
+        if index < self.top:
+            self.top += 1  # mantém as mesmas linhas na tela
+        self.render()
+
+    def update_row(self, row):
+        if self.source is None:
+            return
+        self._sync_selection()
+        iid = str(row[0])
+        old_index, new_index = self.source.update_row(row)
+        if old_index is not None and old_index == new_index:
+            if iid in self._window_ids:
+                self.tree.item(iid, values=row)
+            return
+        if old_index is not None:
+            # Mantém as mesmas linhas na tela quando a linha muda de posição acima delas
+            if old_index < self.top:
+                self.top -= 1
+            if new_index is not None and new_index < self.top:
+                self.top += 1
+        self.render()
+
+    def remove_rows(self, contact_ids):
+        if self.source is None:
+            return
+        self._sync_selection()
+        removed = {str(cid) for cid in contact_ids}
+        ids = [int(cid) for cid in contact_ids]
+        above = sum(1 for cid in ids if (i := self.source.index_of(cid)) is not None and i < self.top)
+        self.source.remove_rows(ids)
+        self.top -= above
+        if self._selected_id in removed:
+            self._selected_id = None
+        self.render()
+
+    def _sync_selection(self):
+        sel = self.tree.selection()
+        if sel:
+            self._selected_id = sel[0]
+        elif self._selected_id in self._window_ids:
+            # O item estava visível e não está mais selecionado: o usuário desmarcou.
+            self._selected_id = None
+
+    def _update_scrollbar(self):
+        total = self.total()
+        if total <= self.visible_rows:
+            self.vsb.set(0.0, 1.0)
+        else:
+            self.vsb.set(self.top / total, min(1.0, (self.top + self.visible_rows) / total))
+
+    def scroll(self, delta):
+        new_top = max(0, min(self.top + delta, self.total() - self.visible_rows))
+        if new_top != self.top:
+            self.top = new_top
+            self.render()
+        return "break"
+
+    def yview(self, *args):
+        """Comando da barra de rolagem vertical (moveto/scroll)."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * self.total())
+            self.render()
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll(amount * step)
+
+    def _on_configure(self, event):
+        header = 25
+        children = self.tree.get_children("")
+        if children:
+            bbox = self.tree.bbox(children[0])
+            if bbox:
+                header = bbox[1]
+        rows = max(1, (event.height - header) // self.rowheight)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
+
+    def _on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_arrow(self, direction):
+        sel = self.tree.selection()
+        if not sel or not self._window_ids:
+            return None
+        index = self._window_ids.index(sel[0]) if sel[0] in self._window_ids else -1
+        at_edge = (direction < 0 and index == 0) or (direction > 0 and index == len(self._window_ids) - 1)
+        if not at_edge:
+            return None  # navegação normal do Treeview dentro da janela
+        before = self.top
+        self.scroll(direction)
+        if self.top != before:
+            target = self._window_ids[0 if direction < 0 else -1]
+            self._selected_id = target
+            self.tree.selection_set(target)
+            self.tree.focus(target)
+        return "break"
+
+    def _on_page(self, direction):
+        return self.scroll(direction * self.visible_rows)